@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import AircraftType
+
+
+@admin.register(AircraftType)
+class AircraftTypeAdmin(admin.ModelAdmin):
+    list_display = ('icao_code', 'name', 'manufacturer', 'max_takeoff_weight', 'ceiling_fl', 'performance_version', 'is_active')
+    list_filter = ('manufacturer', 'wake_category', 'is_active')
+    search_fields = ('icao_code', 'name', 'manufacturer')
+    readonly_fields = ('performance_version', 'updated_at')
@@ -0,0 +1,49 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from aircraft.models import AircraftType
+from aircraft.performance import table_from_rows, performance_directory, PerformanceTable
+
+
+class Command(BaseCommand):
+    help = 'Import a cruise performance grid for an aircraft type from CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aircraft_type', type=str, help='ICAO type designator (e.g. A320)')
+        parser.add_argument(
+            'csv_file',
+            type=str,
+            help='CSV with weight_kg, flight_level, mach, fuel_flow_kg_h and optional isa_dev, tas_kt'
+        )
+
+    def handle(self, *args, **options):
+        code = options['aircraft_type'].upper()
+        aircraft = AircraftType.objects.filter(icao_code=code).first()
+        if not aircraft:
+            raise CommandError(f'Aircraft type {code} not found; create it in the admin first')
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8') as f:
+                table = table_from_rows(code, csv.DictReader(f))
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["csv_file"]}: {e}')
+        except ValueError as e:
+            raise CommandError(f'Invalid performance data: {e}')
+
+        self.stdout.write(
+            '📊 Grid: ' + ' x '.join(f'{len(axis)} {name}' for name, axis in table.axes.items())
+        )
+
+        directory = performance_directory(code, table.version)
+        table.save(directory)
+        # Re-open memory-mapped to make sure the files round-trip before switching
+        PerformanceTable.open(directory)
+
+        if aircraft.performance_version == table.version:
+            self.stdout.write(self.style.SUCCESS(f'✅ {code} performance unchanged (version {table.version})'))
+            return
+
+        aircraft.performance_version = table.version
+        aircraft.save(update_fields=['performance_version', 'updated_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {code} performance version {table.version} saved to {directory}'
+        ))
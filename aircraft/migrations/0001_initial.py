@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AircraftType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('icao_code', models.CharField(max_length=4, unique=True, verbose_name='ICAO Type Designator')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('manufacturer', models.CharField(blank=True, max_length=100, verbose_name='Manufacturer')),
+                ('wake_category', models.CharField(choices=[('L', 'Light'), ('M', 'Medium'), ('H', 'Heavy'), ('J', 'Super')], default='M', max_length=1, verbose_name='Wake Category')),
+                ('operating_empty_weight', models.FloatField(verbose_name='Operating Empty Weight (kg)')),
+                ('max_zero_fuel_weight', models.FloatField(verbose_name='Max Zero Fuel Weight (kg)')),
+                ('max_takeoff_weight', models.FloatField(verbose_name='Max Takeoff Weight (kg)')),
+                ('max_landing_weight', models.FloatField(verbose_name='Max Landing Weight (kg)')),
+                ('max_fuel_capacity', models.FloatField(verbose_name='Max Fuel Capacity (kg)')),
+                ('ceiling_fl', models.IntegerField(default=410, verbose_name='Service Ceiling (FL)')),
+                ('default_mach', models.FloatField(default=0.78, verbose_name='Default Cruise Mach')),
+                ('performance_version', models.CharField(blank=True, default='', help_text='Set by import_performance; empty means no performance grid is loaded', max_length=40, verbose_name='Performance Data Version')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Aircraft Type',
+                'verbose_name_plural': 'Aircraft Types',
+                'db_table': 'aircraft_types',
+                'ordering': ['icao_code'],
+            },
+        ),
+    ]
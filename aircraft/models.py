@@ -0,0 +1,51 @@
+from django.contrib.gis.db import models
+
+
+class AircraftType(models.Model):
+    """
+    Aircraft type with weight limits and a link to its performance grid
+    """
+    WAKE_CATEGORIES = [
+        ('L', 'Light'),
+        ('M', 'Medium'),
+        ('H', 'Heavy'),
+        ('J', 'Super'),
+    ]
+    
+    icao_code = models.CharField(max_length=4, unique=True, verbose_name='ICAO Type Designator')
+    name = models.CharField(max_length=100, verbose_name='Name')
+    manufacturer = models.CharField(max_length=100, blank=True, verbose_name='Manufacturer')
+    wake_category = models.CharField(max_length=1, choices=WAKE_CATEGORIES, default='M', verbose_name='Wake Category')
+    
+    operating_empty_weight = models.FloatField(verbose_name='Operating Empty Weight (kg)')
+    max_zero_fuel_weight = models.FloatField(verbose_name='Max Zero Fuel Weight (kg)')
+    max_takeoff_weight = models.FloatField(verbose_name='Max Takeoff Weight (kg)')
+    max_landing_weight = models.FloatField(verbose_name='Max Landing Weight (kg)')
+    max_fuel_capacity = models.FloatField(verbose_name='Max Fuel Capacity (kg)')
+    
+    ceiling_fl = models.IntegerField(default=410, verbose_name='Service Ceiling (FL)')
+    default_mach = models.FloatField(default=0.78, verbose_name='Default Cruise Mach')
+    
+    performance_version = models.CharField(
+        max_length=40,
+        blank=True,
+        default='',
+        verbose_name='Performance Data Version',
+        help_text='Set by import_performance; empty means no performance grid is loaded'
+    )
+    
+    is_active = models.BooleanField(default=True, verbose_name='Active')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        db_table = 'aircraft_types'
+        verbose_name = 'Aircraft Type'
+        verbose_name_plural = 'Aircraft Types'
+        ordering = ['icao_code']
+    
+    def __str__(self):
+        return f"{self.icao_code} - {self.name}"
+    
+    @property
+    def has_performance(self):
+        return bool(self.performance_version)
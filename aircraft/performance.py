@@ -0,0 +1,285 @@
+"""
+Aircraft performance grids
+
+Each aircraft type's cruise performance is a regular grid over
+(weight, flight level, ISA deviation, Mach) holding fuel flow (kg/h) and
+true airspeed (kt). Grids are stored on disk as plain NumPy files:
+
+    <PERFORMANCE_DATA_DIR>/<TYPE>/<version>/axes.json
+    <PERFORMANCE_DATA_DIR>/<TYPE>/<version>/grid.npy   shape (..., 2)
+
+and opened memory-mapped, so every worker process shares the same pages.
+A new import writes a new version directory, so workers that still have
+the previous grid mapped are never affected.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+AXES = ('weight', 'flight_level', 'isa_deviation', 'mach')
+OUTPUTS = ('fuel_flow', 'tas')
+
+SPEED_OF_SOUND_COEFF = 38.967854  # kt per sqrt(K)
+
+
+def isa_temperature_k(flight_level, isa_deviation=0.0):
+    """ISA temperature (K) at a flight level, tropopause at 36,089 ft"""
+    altitude_ft = np.asarray(flight_level, dtype=float) * 100.0
+    return np.where(altitude_ft < 36089.0, 288.15 - 0.0019812 * altitude_ft, 216.65) + isa_deviation
+
+
+def mach_to_tas(mach, flight_level, isa_deviation=0.0):
+    """True airspeed (kt) for a Mach number at a flight level"""
+    return np.asarray(mach, dtype=float) * SPEED_OF_SOUND_COEFF * np.sqrt(isa_temperature_k(flight_level, isa_deviation))
+
+
+class GridInterpolator:
+    """
+    Vectorized multilinear interpolation on a regular N-d grid
+
+    values has shape (len(axis_0), ..., len(axis_n-1), k) and may be a
+    read-only memmap; calling the interpolator with n coordinate arrays
+    returns an (m, k) array. Points outside the grid are clamped to its edges.
+    """
+
+    def __init__(self, axes, values):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.dims = len(self.axes)
+        self.width = values.shape[-1]
+        self.flat = values.reshape(-1, self.width)
+
+        shape = values.shape[:-1]
+        if shape != tuple(len(a) for a in self.axes):
+            raise ValueError(f'Grid shape {shape} does not match axes')
+
+        self.strides = np.cumprod((1,) + shape[::-1])[:-1][::-1]
+        # Corners enumerated with the first axis varying slowest; degenerate
+        # (single value) axes never step to an upper neighbour
+        bits = np.indices((2,) * self.dims).reshape(self.dims, -1).T
+        steppable = np.array([len(a) > 1 for a in self.axes])
+        self.corner_offsets = (bits * steppable * self.strides).sum(axis=1)
+
+    def __call__(self, *coords):
+        base = 0
+        weights = None
+        for dim, (axis, values) in enumerate(zip(self.axes, coords)):
+            values = np.asarray(values, dtype=float).ravel()
+            if len(axis) > 1:
+                # Searching the interior knots yields cell indices 0..len-2 directly
+                i = np.searchsorted(axis[1:-1], values, side='right')
+                lower = axis.take(i)
+                frac = (values - lower) / (axis.take(i + 1) - lower)
+                np.clip(frac, 0.0, 1.0, out=frac)
+            else:
+                i = np.zeros(values.shape, dtype=np.int64)
+                frac = np.zeros(values.shape)
+            base = base + i * self.strides[dim]
+            pair = np.empty((len(frac), 2))
+            pair[:, 0] = 1.0 - frac
+            pair[:, 1] = frac
+            weights = pair if weights is None else (weights[:, :, None] * pair[:, None, :]).reshape(len(frac), -1)
+
+        corners = self.flat.take(base[:, None] + self.corner_offsets, axis=0)
+        return np.einsum('mc,mck->mk', weights, corners)
+
+
+class PerformanceTable:
+    """
+    Fuel flow (kg/h) and TAS (kt) for one aircraft type on a
+    weight x flight level x ISA deviation x Mach grid
+    """
+
+    def __init__(self, aircraft_type, axes, values, version=''):
+        self.aircraft_type = aircraft_type
+        self.version = version
+        self.axes = {name: np.asarray(axes[name], dtype=float) for name in AXES}
+        for name, axis in self.axes.items():
+            if len(axis) > 1 and np.any(np.diff(axis) <= 0):
+                raise ValueError(f'Axis {name} must be strictly increasing')
+        self.values = values
+        self.interpolator = GridInterpolator([self.axes[name] for name in AXES], values)
+
+    @classmethod
+    def from_arrays(cls, aircraft_type, weights, flight_levels, machs, fuel_flow,
+                    tas=None, isa_deviations=(0.0,), version=''):
+        """
+        Build a table from in-memory arrays; fuel_flow/tas have shape
+        (weights, flight_levels, isa_deviations, machs). TAS defaults to the
+        ISA value for each Mach.
+        """
+        axes = {
+            'weight': weights,
+            'flight_level': flight_levels,
+            'isa_deviation': isa_deviations,
+            'mach': machs,
+        }
+        shape = tuple(len(axes[name]) for name in AXES)
+        fuel_flow = np.asarray(fuel_flow, dtype=float).reshape(shape)
+        if tas is None:
+            _, fl_grid, isa_grid, mach_grid = np.meshgrid(*(np.asarray(axes[n], dtype=float) for n in AXES), indexing='ij')
+            tas = mach_to_tas(mach_grid, fl_grid, isa_grid)
+        tas = np.asarray(tas, dtype=float).reshape(shape)
+        return cls(aircraft_type, axes, np.stack((fuel_flow, tas), axis=-1), version)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        """Open a saved table (memory-mapped by default)"""
+        with open(os.path.join(directory, 'axes.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        values = np.load(os.path.join(directory, 'grid.npy'), mmap_mode='r' if mmap else None)
+        return cls(meta['aircraft_type'], meta['axes'], values, meta.get('version', ''))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'grid.npy'), np.ascontiguousarray(self.values, dtype=np.float64))
+        with open(os.path.join(directory, 'axes.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'aircraft_type': self.aircraft_type,
+                'version': self.version,
+                'axes': {name: self.axes[name].tolist() for name in AXES},
+                'outputs': list(OUTPUTS),
+            }, f)
+
+    def lookup(self, weight, flight_level, mach, isa_deviation=0.0):
+        """
+        (fuel_flow, tas) for arrays of points, evaluated in one call
+        """
+        points = np.broadcast_arrays(
+            np.asarray(weight, dtype=float),
+            np.asarray(flight_level, dtype=float),
+            np.asarray(isa_deviation, dtype=float),
+            np.asarray(mach, dtype=float)
+        )
+        result = self.interpolator(*points)
+        shape = points[0].shape
+        return result[:, 0].reshape(shape), result[:, 1].reshape(shape)
+
+    @property
+    def flight_levels(self):
+        return self.axes['flight_level']
+
+
+def table_from_rows(aircraft_type, rows):
+    """
+    Build a table from tabular rows (dicts with weight_kg, flight_level,
+    mach, fuel_flow_kg_h and optional isa_dev, tas_kt). The rows must cover
+    every combination of the distinct axis values.
+    """
+    columns = {key: [] for key in ('weight_kg', 'flight_level', 'isa_dev', 'mach', 'fuel_flow_kg_h', 'tas_kt')}
+    for row in rows:
+        for key in columns:
+            value = row.get(key)
+            if value in (None, ''):
+                value = 0.0 if key == 'isa_dev' else np.nan
+            columns[key].append(float(value))
+
+    data = {key: np.asarray(values, dtype=float) for key, values in columns.items()}
+    if not len(data['weight_kg']):
+        raise ValueError('No performance rows')
+    if np.isnan(data['weight_kg']).any() or np.isnan(data['flight_level']).any() \
+            or np.isnan(data['mach']).any() or np.isnan(data['fuel_flow_kg_h']).any():
+        raise ValueError('weight_kg, flight_level, mach and fuel_flow_kg_h are required in every row')
+
+    missing_tas = np.isnan(data['tas_kt'])
+    data['tas_kt'][missing_tas] = mach_to_tas(data['mach'][missing_tas], data['flight_level'][missing_tas], data['isa_dev'][missing_tas])
+
+    keys = ('weight_kg', 'flight_level', 'isa_dev', 'mach')
+    axes = []
+    positions = []
+    for key in keys:
+        axis, inverse = np.unique(data[key], return_inverse=True)
+        axes.append(axis)
+        positions.append(inverse)
+
+    shape = tuple(len(a) for a in axes)
+    expected = int(np.prod(shape))
+    flat_index = np.ravel_multi_index(positions, shape)
+    if len(np.unique(flat_index)) != len(flat_index):
+        raise ValueError('Duplicate grid points in performance data')
+    if len(flat_index) != expected:
+        raise ValueError(f'Incomplete grid: {len(flat_index)} rows for {expected} grid points {shape}')
+
+    values = np.empty((expected, 2))
+    values[flat_index, 0] = data['fuel_flow_kg_h']
+    values[flat_index, 1] = data['tas_kt']
+    version = hashlib.sha1(values.tobytes() + b''.join(a.tobytes() for a in axes)).hexdigest()[:16]
+
+    return PerformanceTable(
+        aircraft_type,
+        dict(zip(AXES, axes)),
+        values.reshape(shape + (2,)),
+        version
+    )
+
+
+def generic_narrowbody_table():
+    """
+    Generic A320/B737-class cruise table for when no type data is loaded
+    """
+    weights = np.array([45000, 55000, 65000, 75000, 80000], dtype=float)
+    flight_levels = np.array([250, 290, 330, 370, 410], dtype=float)
+    isa_deviations = np.array([-10.0, 0.0, 10.0, 20.0])
+    machs = np.array([0.70, 0.74, 0.78, 0.82], dtype=float)
+
+    w, fl, isa, m = np.meshgrid(weights, flight_levels, isa_deviations, machs, indexing='ij')
+    # Burn rises with weight, speed and temperature, falls with altitude up to the optimum
+    fuel_flow = (
+        2450.0
+        * (w / 65000.0) ** 0.9
+        * (1.0 + 2.2 * (m - 0.78) ** 2 + 0.6 * (m - 0.78))
+        * (1.0 + 0.12 * ((350.0 - fl) / 100.0) + 0.08 * ((fl - 350.0) / 100.0) ** 2 * (w / 65000.0))
+        * (1.0 + 0.003 * isa)
+    )
+    return PerformanceTable.from_arrays(
+        'GENERIC', weights, flight_levels, machs, fuel_flow,
+        isa_deviations=isa_deviations, version='builtin'
+    )
+
+
+def performance_directory(aircraft_type, version):
+    root = getattr(settings, 'PERFORMANCE_DATA_DIR', os.path.join(settings.BASE_DIR, 'data', 'performance'))
+    return os.path.join(str(root), aircraft_type.upper(), version)
+
+
+_builtin_tables = {}
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_performance_table(aircraft_type='GENERIC'):
+    """
+    Performance table for an aircraft type
+
+    Imported grids are opened memory-mapped once per (type, version) and
+    kept for the life of the process; GENERIC is built in. Raises KeyError
+    for unknown types or types without imported performance data.
+    """
+    code = (aircraft_type or 'GENERIC').upper()
+    if code == 'GENERIC':
+        if code not in _builtin_tables:
+            _builtin_tables[code] = generic_narrowbody_table()
+        return _builtin_tables[code]
+
+    from .models import AircraftType
+
+    version = AircraftType.objects.filter(
+        icao_code=code, is_active=True
+    ).exclude(performance_version='').values_list('performance_version', flat=True).first()
+    if not version:
+        raise KeyError(code)
+
+    key = (code, version)
+    table = _tables.get(key)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = PerformanceTable.open(performance_directory(code, version))
+                for stale in [k for k in _tables if k[0] == code]:
+                    del _tables[stale]
+                _tables[key] = table
+    return table
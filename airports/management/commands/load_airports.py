@@ -1,56 +1,142 @@
-import requests
 import csv
+import time
+
+import requests
 from django.contrib.gis.geos import Point
 from django.core.management.base import BaseCommand
 from airports.models import Airport
 
+DEFAULT_SOURCE = "https://davidmegginson.github.io/ourairports-data/airports.csv"
+AIRPORT_TYPES = {'large_airport', 'medium_airport', 'small_airport'}
+# updated_at (auto_now) هم به‌روز می‌شود تا نسخه دیکشنری فرودگاه‌ها در
+# همه workerها (routes.airport_codes) تغییر ردیف‌های موجود را هم ببیند
+UPDATE_FIELDS = [
+    'name', 'icao_code', 'location', 'altitude', 'airport_type', 'country', 'city', 'runway_length',
+    'updated_at'
+]
+COMPARED_FIELDS = [field for field in UPDATE_FIELDS if field != 'updated_at']
+
+
+def airport_from_row(row):
+    """
+    Airport (ذخیره نشده) برای یک ردیف CSV فرودگاه‌های OurAirports، یا None
+    برای فرودگاه‌های بدون کد IATA، بدون پرواز برنامه‌ریزی شده یا ردیف‌های نامعتبر
+    """
+    # فقط فرودگاه‌های فعال و دارای کد IATA
+    if (row.get('type') not in AIRPORT_TYPES or
+            not row.get('iata_code') or
+            row.get('scheduled_service') != 'yes'):
+        return None
+    try:
+        location = Point(float(row['longitude_deg']), float(row['latitude_deg']), srid=4326)
+        altitude = float(row['elevation_ft']) * 0.3048 if row.get('elevation_ft') else 0
+        runway_length = float(row['length_ft']) * 0.3048 if row.get('length_ft') else None
+    except (TypeError, ValueError):
+        return None
+
+    return Airport(
+        name=row['name'][:200],
+        iata_code=row['iata_code'].strip().upper()[:3],
+        # محدود کردن icao_code به ۴ کاراکتر
+        icao_code=(row.get('ident') or '')[:4],
+        location=location,
+        altitude=altitude,
+        airport_type=row['type'],
+        country=row.get('iso_country') or '',
+        city=(row.get('municipality') or '')[:100],
+        runway_length=runway_length,
+    )
+
+
 class Command(BaseCommand):
-    help = 'بارگذاری فرودگاه‌های جهانی از OurAirports'
-    
+    help = 'بارگذاری فرودگاه‌های جهانی از OurAirports (فایل محلی یا URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', nargs='?', default=DEFAULT_SOURCE,
+            help='مسیر فایل CSV محلی یا URL (پیش‌فرض: OurAirports)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def open_lines(self, source):
+        """
+        خطوط CSV به صورت جریانی: فایل محلی خط به خط و URL با stream=True،
+        بدون نگه داشتن کل فایل در حافظه
+        """
+        if source.startswith(('http://', 'https://')):
+            response = requests.get(source, stream=True, timeout=60)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            return response, response.iter_lines(decode_unicode=True)
+        handle = open(source, encoding='utf-8', newline='')
+        return handle, handle
+
+    def upsert(self, batch):
+        """
+        درج یا به‌روزرسانی یک دسته با یک INSERT ... ON CONFLICT (iata_code)؛
+        فقط ردیف‌های جدید یا تغییرکرده نوشته می‌شوند تا updated_at (و نسخه
+        دیکشنری فرودگاه‌ها) با بارگذاری دوباره همان فایل عوض نشود
+        خروجی: (تعداد جدید، تعداد به‌روزرسانی شده)
+        """
+        existing = {
+            row[0]: row[1:] for row in Airport.objects.filter(
+                iata_code__in=list(batch)
+            ).values_list('iata_code', *COMPARED_FIELDS)
+        }
+        changed = [
+            airport for code, airport in batch.items()
+            if code not in existing
+            or existing[code] != tuple(getattr(airport, field) for field in COMPARED_FIELDS)
+        ]
+        if changed:
+            Airport.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['iata_code'],
+                update_fields=UPDATE_FIELDS,
+            )
+        new = len(batch) - len(existing)
+        return new, len(changed) - new
+
     def handle(self, *args, **options):
-        url = "https://davidmegginson.github.io/ourairports-data/airports.csv"
-        
+        source = options['source']
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        rows_read = created = updated = 0
+
         try:
-            response = requests.get(url)
-            response.encoding = 'utf-8'
-            
-            reader = csv.DictReader(response.text.splitlines())
-            
-            airports_created = 0
-            for row in reader:
-                # فقط فرودگاه‌های فعال و دارای کد IATA
-                if (row['type'] in ['large_airport', 'medium_airport', 'small_airport'] and 
-                    row['iata_code'] and 
-                    row['scheduled_service'] == 'yes'):
-                    
-                    # بررسی وجود فرودگاه
-                    if Airport.objects.filter(iata_code=row['iata_code']).exists():
+            stream, lines = self.open_lines(source)
+            try:
+                batch = {}  # iata_code -> Airport؛ هر کد فقط یک بار در هر دسته
+                for row in csv.DictReader(lines):
+                    rows_read += 1
+                    airport = airport_from_row(row)
+                    if airport is None:
                         continue
-                    
-                    # محدود کردن icao_code به ۴ کاراکتر
-                    icao_code = row['ident'][:4] if row['ident'] else ''
-                    
-                    airport = Airport(
-                        name=row['name'],
-                        iata_code=row['iata_code'],
-                        icao_code=icao_code,
-                        location=Point(float(row['longitude_deg']), float(row['latitude_deg'])),
-                        altitude=float(row['elevation_ft']) * 0.3048 if row['elevation_ft'] else 0,
-                        airport_type=row['type'],
-                        country=row['iso_country'],
-                        city=row['municipality'] or '',
-                        runway_length=float(row['length_ft']) * 0.3048 if row.get('length_ft') else None
-                    )
-                    airport.save()
-                    airports_created += 1
-                    
-                    if airports_created % 100 == 0:
-                        self.stdout.write(f'{airports_created} فرودگاه بارگذاری شد...')
-            
+                    batch[airport.iata_code] = airport
+
+                    if len(batch) >= batch_size:
+                        new, changed = self.upsert(batch)
+                        created += new
+                        updated += changed
+                        batch = {}
+                        self.stdout.write(f'{created + updated} فرودگاه بارگذاری شد...')
+                if batch:
+                    new, changed = self.upsert(batch)
+                    created += new
+                    updated += changed
+            finally:
+                stream.close()
+
+            elapsed = time.perf_counter() - started
+            rate = rows_read / elapsed if elapsed > 0 else 0
             self.stdout.write(
-                self.style.SUCCESS(f'تعداد {airports_created} فرودگاه بارگذاری شد')
+                self.style.SUCCESS(
+                    f'تعداد {created} فرودگاه جدید و {updated} فرودگاه به‌روزرسانی شد '
+                    f'({rows_read} ردیف در {elapsed:.1f} ثانیه، {rate:.0f} ردیف/ثانیه)'
+                )
             )
-            
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'خطا در بارگذاری: {str(e)}')
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0002_alter_airport_options_alter_airport_airport_type_and_more'),
+        ('routes', '0020_trigram_extension_route_name_gin'),  # creates the pg_trgm extension
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airport',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name', 'city'], name='airports_name_d8441e_gin', opclasses=['gin_trgm_ops', 'gin_trgm_ops']),
+        ),
+    ]
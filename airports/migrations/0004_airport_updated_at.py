@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0003_airport_airports_name_d8441e_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated At'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0004_airport_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(fields=['icao_code'], name='airports_icao_code_like', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
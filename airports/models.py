@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
 
 class Airport(models.Model):
     AIRPORT_TYPES = [
@@ -28,6 +29,7 @@ class Airport(models.Model):
         blank=True, 
         verbose_name='Runway Length (m)'
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     objects = models.Manager()
     
@@ -35,6 +37,11 @@ class Airport(models.Model):
         db_table = 'airports'
         verbose_name = 'Airport'
         verbose_name_plural = 'Airports'
+        indexes = [
+            GinIndex(fields=['name', 'city'], name='airports_name_d8441e_gin', opclasses=['gin_trgm_ops', 'gin_trgm_ops']),
+            # prefix search (LIKE 'OI%'); iata_code gets Django's _like index from unique=True
+            models.Index(fields=['icao_code'], name='airports_icao_code_like', opclasses=['varchar_pattern_ops']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.iata_code})"
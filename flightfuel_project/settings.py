@@ -25,9 +25,11 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'rest_framework', 
     'airports',
     'routes',
+    'aircraft',
 ]
 
 MIDDLEWARE = [
@@ -118,5 +120,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Precomputed FIR cell index (manage.py build_fir_cells)
+FIR_CELL_INDEX_DIR = BASE_DIR / 'data' / 'fir_cells'
+
+# Memory-mapped aircraft performance grids (manage.py import_performance)
+PERFORMANCE_DATA_DIR = BASE_DIR / 'data' / 'performance'
+
+# Memory-mapped upper-air wind/temperature forecasts (manage.py ingest_wind_grid)
+WIND_DATA_DIR = BASE_DIR / 'data' / 'wind'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.gis import admin as gis_admin
 from django.utils.html import format_html
-from .models import Waypoint, Airway, AirwaySegment, Route, FlightInformationRegion
+from .models import (
+    Waypoint, Airway, AirwaySegment, Route, FlightInformationRegion,
+    RestrictedArea, RestrictedAreaActivation, AirwayClosure
+)
 
 
 @admin.register(Waypoint)
@@ -41,7 +44,7 @@ class WaypointAdmin(gis_admin.GISModelAdmin):
 class AirwaySegmentInline(admin.TabularInline):
     model = AirwaySegment
     extra = 1
-    fields = ('sequence', 'from_waypoint', 'to_waypoint', 'distance', 'base_altitude')
+    fields = ('sequence', 'from_waypoint', 'to_waypoint', 'distance', 'base_altitude', 'direction')
     ordering = ('sequence',)
 
 
@@ -156,4 +159,49 @@ class FlightInformationRegionAdmin(gis_admin.GISModelAdmin):
     area_display.short_description = 'مساحت'
 
 
+class RestrictedAreaActivationInline(admin.TabularInline):
+    model = RestrictedAreaActivation
+    extra = 1
+
+
+@admin.register(RestrictedArea)
+class RestrictedAreaAdmin(gis_admin.GISModelAdmin):
+    list_display = ('identifier', 'name', 'type', 'lower_limit_fl', 'upper_limit_fl', 'window_count', 'is_active')
+    list_filter = ('type', 'is_active', 'country')
+    search_fields = ('identifier', 'name', 'country')
+    inlines = [RestrictedAreaActivationInline]
+    
+    fieldsets = (
+        ('اطلاعات شناسایی', {'fields': ('identifier', 'name', 'type', 'country')}),
+        ('مرز هوایی', {'fields': ('boundary',)}),
+        ('محدودیت‌های عمودی', {'fields': ('lower_limit_fl', 'upper_limit_fl')}),
+        ('وضعیت و یادداشت‌ها', {'fields': ('is_active', 'notes'), 'classes': ('collapse',)}),
+    )
+    
+    def window_count(self, obj):
+        count = obj.activations.count()
+        return count if count else 'دائمی'
+    window_count.short_description = 'بازه‌های فعال‌سازی'
+
+
+@admin.register(AirwayClosure)
+class AirwayClosureAdmin(admin.ModelAdmin):
+    list_display = ('target_display', 'notam', 'starts_at', 'ends_at', 'lower_limit_fl', 'upper_limit_fl')
+    list_filter = ('airway',)
+    search_fields = ('notam', 'airway__identifier', 'reason')
+    raw_id_fields = ('segment',)
+    date_hierarchy = 'starts_at'
+    
+    fieldsets = (
+        ('مسیر بسته‌شده', {'fields': ('airway', 'segment')}),
+        ('بازه زمانی', {'fields': ('starts_at', 'ends_at')}),
+        ('محدودیت‌های عمودی', {'fields': ('lower_limit_fl', 'upper_limit_fl')}),
+        ('NOTAM', {'fields': ('notam', 'reason')}),
+    )
+    
+    def target_display(self, obj):
+        return str(obj.segment) if obj.segment_id else obj.airway.identifier
+    target_display.short_description = 'Airway / Segment'
+
+
 admin.site.register(AirwaySegment)
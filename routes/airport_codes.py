@@ -0,0 +1,152 @@
+"""
+In-process airport code dictionary
+
+All airports (about 10k rows) are loaded once per process into
+dictionaries keyed by IATA and ICAO code, holding a short summary of each
+airport. Code resolution (IATA to ICAO, validation, names and positions
+for display and routing) is then a dictionary lookup. The dictionary is
+reloaded when the airport dataset version changes: a fingerprint of the
+row count, highest id and latest updated_at read from the database, so
+edits made by any process (admin, shell, load_airports) reach every worker.
+"""
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from airports.models import Airport
+
+AIRPORT_VERSION_CACHE_KEY = 'routes:airport_dataset_version'
+AIRPORT_VERSION_TIMEOUT = 60  # seconds
+
+
+def airport_dataset_version():
+    """
+    Short fingerprint of the airport table, cached for AIRPORT_VERSION_TIMEOUT seconds
+    """
+    version = cache.get(AIRPORT_VERSION_CACHE_KEY)
+    if version is None:
+        stats = Airport.objects.aggregate(count=Count('id'), max_id=Max('id'), last_update=Max('updated_at'))
+        raw = f"{stats['count']}:{stats['max_id']}:{stats['last_update']}"
+        version = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        cache.set(AIRPORT_VERSION_CACHE_KEY, version, AIRPORT_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_airport_dataset_version():
+    """Drop the cached airport version so the next lookup recomputes it"""
+    cache.delete(AIRPORT_VERSION_CACHE_KEY)
+
+
+class AirportDirectory:
+    """
+    Airport summaries by IATA and ICAO code for one airport dataset version
+    """
+
+    def __init__(self, version, rows):
+        """
+        rows: (iata, icao, name, city, country, airport type, lon, lat)
+        """
+        self.version = version
+        self.by_iata = {}
+        self.by_icao = {}
+        self.points = {}  # IATA or ICAO code -> (ICAO code, lon, lat)
+        for iata, icao, name, city, country, airport_type, lon, lat in rows:
+            iata = (iata or '').upper()
+            icao = (icao or '').upper()
+            summary = {
+                'iata': iata,
+                'icao': icao,
+                'name': name,
+                'city': city,
+                'country': country,
+                'type': airport_type,
+                'location': [lon, lat],
+            }
+            point = (icao or iata, lon, lat)
+            if iata:
+                self.by_iata[iata] = summary
+                self.points.setdefault(iata, point)
+            if icao:
+                self.by_icao.setdefault(icao, summary)
+                self.points[icao] = point
+
+    @classmethod
+    def load(cls, version=None):
+        """Build the dictionary from one values_list query"""
+        rows = Airport.objects.order_by('id').values_list(
+            'iata_code', 'icao_code', 'name', 'city', 'country', 'airport_type', 'location'
+        )
+        return cls(version or airport_dataset_version(), (
+            (iata, icao, name, city, country, airport_type, location.x, location.y)
+            for iata, icao, name, city, country, airport_type, location in rows
+        ))
+
+    def __len__(self):
+        return len(self.by_iata) + len(self.by_icao)
+
+    def get(self, code):
+        """Summary of the airport with this ICAO or IATA code, or None"""
+        if not code:
+            return None
+        code = code.upper().strip()
+        if len(code) == 4:
+            return self.by_icao.get(code)
+        if len(code) == 3:
+            return self.by_iata.get(code)
+        return None
+
+    def icao_for(self, code, return_original_if_not_found=True):
+        """
+        ICAO code for an IATA or ICAO code
+
+        Unknown 4-letter codes are returned as they are (they may be valid
+        ICAO codes missing from the dataset); unknown 3-letter and other
+        codes only when return_original_if_not_found is set.
+        """
+        if not code:
+            return None
+        code = code.upper().strip()
+        airport = self.get(code) if code.isalpha() else None
+        if airport is not None and airport['icao']:
+            return airport['icao']
+        if len(code) == 4 and code.isalpha():
+            return code
+        return code if return_original_if_not_found else None
+
+    def codes_for(self, code):
+        """
+        Every code the airport is known by (input, IATA and ICAO), upper-cased
+        """
+        if not code:
+            return []
+        code = code.upper().strip()
+        codes = [code]
+        airport = self.get(code)
+        if airport is not None:
+            codes += [c for c in (airport['icao'], airport['iata']) if c and c != code]
+        return codes
+
+    def position(self, code):
+        """(lon, lat) of the airport with this code, or None"""
+        airport = self.get(code)
+        return tuple(airport['location']) if airport is not None else None
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_airport_directory():
+    """
+    Process-wide AirportDirectory, reloaded when the airport dataset
+    version changes
+    """
+    global _directory
+    version = airport_dataset_version()
+    if _directory is None or _directory.version != version:
+        with _directory_lock:
+            if _directory is None or _directory.version != version:
+                _directory = AirportDirectory.load(version)
+    return _directory
@@ -0,0 +1,276 @@
+"""
+Restricted airspace for routing
+
+Restricted areas are loaded once per process (per restriction dataset and
+airway network version) together with the airway edges each of them
+crosses, found with a single STRtree query. When the router is patched in
+place, only the edges it appended are tested against the areas. Which
+areas are active depends on the time and flight level; for every distinct
+active set the union of their crossed edges is kept as a packed bitmask,
+so routing around restrictions is a masked search on the cached airway
+graph with no geometry tests per query. Shapely is imported where the
+geometries are built, so the signal handlers can import this module
+without it.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import RestrictedArea, RestrictedAreaActivation
+from .weather import to_epoch
+
+RESTRICTION_VERSION_CACHE_KEY = 'routes:restriction_dataset_version'
+RESTRICTION_VERSION_TIMEOUT = 60  # seconds
+MASK_CACHE_SIZE = 128  # active sets whose edge masks are kept
+
+
+def restriction_dataset_version():
+    """
+    Short fingerprint of restricted areas and their activation windows
+    """
+    version = cache.get(RESTRICTION_VERSION_CACHE_KEY)
+    if version is None:
+        areas = RestrictedArea.objects.aggregate(
+            count=Count('id'), max_id=Max('id'), last_update=Max('updated_at')
+        )
+        windows = RestrictedAreaActivation.objects.aggregate(
+            count=Count('id'), max_id=Max('id'), last_update=Max('updated_at')
+        )
+        raw = (
+            f"{areas['count']}:{areas['max_id']}:{areas['last_update']}:"
+            f"{windows['count']}:{windows['max_id']}:{windows['last_update']}"
+        )
+        version = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        cache.set(RESTRICTION_VERSION_CACHE_KEY, version, RESTRICTION_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_restriction_dataset_version():
+    """Drop the cached restriction version so the next lookup recomputes it"""
+    cache.delete(RESTRICTION_VERSION_CACHE_KEY)
+
+
+class RestrictionIndex:
+    """
+    Active restricted areas and their blocked airway edges for one
+    restriction dataset version and one airway router
+    """
+
+    def __init__(self, version, router, areas, geometries, windows):
+        import shapely
+
+        self.version = version
+        self.router = router
+        self.revision = router.revision
+        self.edge_count = router.edge_count
+        self.areas = list(areas)
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.lower = np.array([a['lower_limit_fl'] for a in self.areas], dtype=float)
+        self.upper = np.array([a['upper_limit_fl'] for a in self.areas], dtype=float)
+
+        # Activation windows as flat arrays: (area position, start, end) epochs
+        self.window_area = np.array([w[0] for w in windows], dtype=np.int64)
+        self.window_start = np.array([w[1] for w in windows], dtype=float)
+        self.window_end = np.array([w[2] for w in windows], dtype=float)
+        self.scheduled = np.zeros(len(self.areas), dtype=bool)
+        self.scheduled[self.window_area] = True
+
+        # Crossed undirected edges per area, CSR style
+        area_hits = np.zeros(0, dtype=np.int64)
+        edge_hits = np.zeros(0, dtype=np.int64)
+        if len(self.areas) and self.edge_count:
+            tree = shapely.STRtree(router.edge_lines())
+            area_hits, edge_hits = tree.query(self.geometries, predicate='intersects')
+            order = np.argsort(area_hits, kind='stable')
+            area_hits, edge_hits = area_hits[order], edge_hits[order]
+        self.area_edges = edge_hits
+        self.area_offsets = np.searchsorted(area_hits, np.arange(len(self.areas) + 1))
+        self.area_tree = None  # STRtree of the areas, built on the first patch
+
+        self.masks = OrderedDict()
+        self.lock = threading.Lock()
+
+    def patch(self, router):
+        """
+        Catch up with a router patched in place
+
+        Edge indices are append-only and an edge's end points never move
+        (moving a waypoint rebuilds the router), so only the edges appended
+        since this index was built are tested against the areas.
+        """
+        import shapely
+
+        revision, edge_count = router.revision, router.edge_count
+        added = np.arange(self.edge_count, edge_count)
+        area_hits = np.repeat(np.arange(len(self.areas)), np.diff(self.area_offsets))
+        edge_hits = self.area_edges
+        if len(self.areas) and len(added):
+            if self.area_tree is None:
+                self.area_tree = shapely.STRtree(self.geometries)
+            lines = shapely.linestrings(router.positions[router.edge_endpoints[added]])
+            line_hits, new_areas = self.area_tree.query(lines, predicate='intersects')
+            area_hits = np.concatenate((area_hits, new_areas))
+            edge_hits = np.concatenate((edge_hits, added[line_hits]))
+            order = np.argsort(area_hits, kind='stable')
+            area_hits, edge_hits = area_hits[order], edge_hits[order]
+        with self.lock:
+            self.area_edges = edge_hits
+            self.area_offsets = np.searchsorted(area_hits, np.arange(len(self.areas) + 1))
+            self.edge_count = max(self.edge_count, edge_count)
+            self.revision = revision
+            self.masks.clear()
+
+    @classmethod
+    def load(cls, router, version=None):
+        """
+        Load active areas and their activation windows in two queries
+        """
+        import shapely
+
+        rows = RestrictedArea.objects.filter(is_active=True).order_by('identifier').values_list(
+            'id', 'identifier', 'name', 'type', 'lower_limit_fl', 'upper_limit_fl', 'boundary'
+        )
+        areas, geometries, position = [], [], {}
+        for pk, identifier, name, area_type, lower, upper, boundary in rows:
+            if not boundary:
+                continue
+            geometry = shapely.from_wkb(bytes(boundary.wkb))
+            if not geometry.is_valid:
+                geometry = shapely.make_valid(geometry)
+            position[pk] = len(areas)
+            areas.append({
+                'identifier': identifier,
+                'name': name,
+                'type': area_type,
+                'lower_limit_fl': lower,
+                'upper_limit_fl': upper,
+            })
+            geometries.append(geometry)
+
+        windows = [
+            (position[area_id], starts_at.timestamp(), ends_at.timestamp())
+            for area_id, starts_at, ends_at in RestrictedAreaActivation.objects.filter(
+                area_id__in=list(position)
+            ).values_list('area_id', 'starts_at', 'ends_at')
+        ]
+        return cls(version or restriction_dataset_version(), router, areas, geometries, windows)
+
+    def __len__(self):
+        return len(self.areas)
+
+    def active(self, when=None, flight_level=None):
+        """
+        Boolean array over areas: active at `when` (default now) and, if
+        flight_level is given, covering that level
+        """
+        epoch = to_epoch(when if when is not None else timezone.now())
+        in_window = np.zeros(len(self.areas), dtype=bool)
+        open_now = (self.window_start <= epoch) & (epoch < self.window_end)
+        in_window[self.window_area[open_now]] = True
+        active = ~self.scheduled | in_window
+        if flight_level is not None:
+            active &= (self.lower <= flight_level) & (flight_level <= self.upper)
+        return active
+
+    def blocked_edges(self, active):
+        """
+        Boolean mask over undirected airway edges crossed by the active areas
+
+        Masks are stored bit-packed per active set, so repeated queries at
+        other times with the same active areas reuse them.
+        """
+        key = tuple(np.flatnonzero(active).tolist())
+        with self.lock:
+            packed = self.masks.get(key)
+            if packed is not None:
+                self.masks.move_to_end(key)
+            revision, edge_count = self.revision, self.edge_count
+            area_edges, area_offsets = self.area_edges, self.area_offsets
+        if packed is None:
+            mask = np.zeros(edge_count, dtype=bool)
+            for area in key:
+                mask[area_edges[area_offsets[area]:area_offsets[area + 1]]] = True
+            packed = np.packbits(mask)
+            with self.lock:
+                if revision == self.revision:
+                    self.masks[key] = packed
+                    while len(self.masks) > MASK_CACHE_SIZE:
+                        self.masks.popitem(last=False)
+        return np.unpackbits(packed, count=edge_count).astype(bool)
+
+    def describe(self, active, include_geometry=False):
+        """
+        Area dicts for the active areas with their blocked edge counts and,
+        optionally, their boundaries as GeoJSON
+        """
+        import shapely
+
+        edge_counts = np.diff(self.area_offsets)
+        results = []
+        for i in np.flatnonzero(active):
+            area = dict(self.areas[i], blocked_edges=int(edge_counts[i]))
+            if include_geometry:
+                area['geometry'] = json.loads(shapely.to_geojson(self.geometries[i]))
+            results.append(area)
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_restriction_index(router=None):
+    """
+    Process-wide RestrictionIndex for the shared airway router, rebuilt when
+    the restriction dataset changes or the router is rebuilt or compacted
+    (edge indices belong to one router) and patched when the router is
+    patched in place
+    """
+    global _index
+    if router is None:
+        from .routing import get_airway_router
+        router = get_airway_router()
+    version = restriction_dataset_version()
+
+    def stale():
+        return _index is None or _index.version != version or _index.router is not router
+
+    if stale() or _index.revision != router.revision:
+        with _index_lock:
+            if stale():
+                _index = RestrictionIndex.load(router, version)
+            elif _index.revision != router.revision:
+                _index.patch(router)
+    return _index
+
+
+def unavailable_edges(router, when=None, flight_level=None, restrictions=True):
+    """
+    Airway edges that cannot be used at `when` (default now) and flight_level:
+    NOTAM closures plus, unless restrictions is False, edges crossing active
+    restricted areas
+
+    Returns (boolean mask over undirected edges or None, identifiers of the
+    restricted areas avoided, ids of the closures applied).
+    """
+    from .closures import get_closure_overlay
+
+    closures = get_closure_overlay(router)
+    mask = closures.blocked_edges(when, flight_level)
+    closed = list(closures.active(when, flight_level)) if mask is not None else []
+
+    avoided = []
+    if restrictions:
+        index = get_restriction_index(router)
+        active = index.active(when, flight_level)
+        if active.any():
+            blocked = index.blocked_edges(active)
+            mask = blocked if mask is None else mask | blocked
+            avoided = [area['identifier'] for area in index.describe(active)]
+    return mask, avoided, closed
@@ -0,0 +1,150 @@
+"""
+Sequence-ordered airway index
+
+For every airway the fixes are kept in segment sequence order, together
+with per-leg direction flags and a sorted copy of the fix identifiers, so
+"airway X from fix A to fix B" is two binary searches and a slice. Airway
+identifiers are not unique (the same designator can be published in
+several regions), so each identifier maps to one chain per airway row. The
+index also knows the position of every fix on an airway, which lets route
+text be parsed and validated without a query per token. It is rebuilt
+with a single query when the airway network version changes.
+"""
+import threading
+
+import numpy as np
+
+from .models import AirwaySegment
+from .routing import airway_network_version
+
+
+class AirwayExpansionError(ValueError):
+    """An airway token cannot be expanded between the given fixes"""
+
+
+class AirwayIndex:
+    """
+    Ordered fixes of every airway for one airway network version
+    """
+
+    def __init__(self, version, rows):
+        """
+        rows: (airway, airway pk, sequence, from fix, to fix, direction,
+        from [lon, lat], to [lon, lat]) ordered by airway, airway pk and sequence
+        """
+        self.version = version
+        self.positions = {}
+        self.airways = {}  # identifier -> [(fixes, legs, sorted fixes, order)] per airway row
+
+        chains = {}
+        for airway, airway_pk, _, from_id, to_id, direction, from_position, to_position in rows:
+            fixes, legs = chains.setdefault((airway, airway_pk), ([], []))
+            if not fixes or fixes[-1] != from_id:
+                if fixes:
+                    legs.append('-')  # gap between two fixes that are not a segment
+                fixes.append(from_id)
+            fixes.append(to_id)
+            legs.append(direction)
+            self.positions[from_id] = from_position
+            self.positions[to_id] = to_position
+
+        for (airway, _), (fixes, legs) in chains.items():
+            fixes = np.asarray(fixes, dtype=object)
+            order = np.argsort(fixes.astype(str), kind='stable')
+            self.airways.setdefault(airway, []).append((
+                fixes,
+                np.asarray(legs, dtype='<U1'),
+                fixes[order].astype(str),
+                order,
+            ))
+
+    @classmethod
+    def load(cls, version=None):
+        """Build the index from one ordered values_list query"""
+        rows = AirwaySegment.objects.order_by('airway__identifier', 'airway_id', 'sequence').values_list(
+            'airway__identifier', 'airway_id', 'sequence',
+            'from_waypoint__identifier', 'to_waypoint__identifier', 'direction',
+            'from_waypoint__location', 'to_waypoint__location'
+        )
+        return cls(version or airway_network_version(), (
+            (airway, airway_pk, sequence, from_id, to_id, direction,
+             (from_location.x, from_location.y), (to_location.x, to_location.y))
+            for airway, airway_pk, sequence, from_id, to_id, direction, from_location, to_location in rows
+        ))
+
+    def __contains__(self, airway):
+        return airway in self.airways
+
+    def fixes(self, airway):
+        """Fix identifiers of each airway with this identifier, in sequence order"""
+        return [list(chain[0]) for chain in self.airways[airway]]
+
+    @staticmethod
+    def position_of(chain, fix):
+        """Index of a fix along one airway chain (binary search), or None"""
+        _, _, sorted_fixes, order = chain
+        i = int(np.searchsorted(sorted_fixes, fix))
+        if i < len(sorted_fixes) and sorted_fixes[i] == fix:
+            return int(order[i])
+        return None
+
+    def expand(self, airway, from_fix, to_fix):
+        """
+        Fixes flown on `airway` from from_fix to to_fix, both included
+
+        Every airway published under the identifier is tried in turn.
+        Raises AirwayExpansionError for an unknown airway, fixes that are
+        not on it, a gap in the airway between them, or travel against a
+        one-way segment.
+        """
+        if airway not in self.airways:
+            raise AirwayExpansionError(f'Unknown airway {airway}')
+        error = None
+        for chain in self.airways[airway]:
+            start = self.position_of(chain, from_fix)
+            end = self.position_of(chain, to_fix)
+            if start is None or end is None:
+                if error is None:
+                    missing = from_fix if start is None else to_fix
+                    error = AirwayExpansionError(f'{missing} is not on airway {airway}')
+                continue
+            try:
+                return self._expand_chain(chain, airway, from_fix, to_fix, start, end)
+            except AirwayExpansionError as e:
+                error = e  # a chain with both fixes explains the failure better
+        raise error
+
+    @staticmethod
+    def _expand_chain(chain, airway, from_fix, to_fix, start, end):
+        fixes, legs, _, _ = chain
+        if start == end:
+            return [from_fix]
+
+        if start < end:
+            flown = legs[start:end]
+            path = fixes[start:end + 1]
+        else:
+            flown = legs[end:start]
+            path = fixes[end:start + 1][::-1]
+            if (flown == 'F').any():
+                raise AirwayExpansionError(f'{airway} is one-way and cannot be flown from {from_fix} to {to_fix}')
+        if (flown == '-').any():
+            raise AirwayExpansionError(f'{airway} is not continuous between {from_fix} and {to_fix}')
+        return list(path)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_airway_index():
+    """
+    Process-wide AirwayIndex, rebuilt when the airway network version changes
+    """
+    global _index
+    version = airway_network_version()
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = AirwayIndex.load(version)
+    return _index
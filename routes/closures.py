@@ -0,0 +1,190 @@
+"""
+Time-windowed airway closures (NOTAM) as an overlay on the cached router
+
+Closures never touch the airway graph. Each closure is resolved once to
+the undirected edges it closes (one edge for a segment, the airway's edges
+for a whole airway), and a query at a given time and flight level only
+combines the edges of the closures active then. When the closure table
+changes, the overlay re-reads the closure rows and re-resolves only the
+closures that were added or edited, so the work is proportional to the
+affected edges; the graph itself is never rebuilt. When the router is
+patched in place, only the closures on the segments and airways the patch
+touched are re-resolved.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import AirwayClosure
+from .weather import to_epoch
+
+CLOSURE_VERSION_CACHE_KEY = 'routes:airway_closure_version'
+CLOSURE_VERSION_TIMEOUT = 10  # seconds
+MASK_CACHE_SIZE = 128  # active closure sets whose edge masks are kept
+
+
+def airway_closure_version():
+    """
+    Short fingerprint of the closure table, cached for CLOSURE_VERSION_TIMEOUT seconds
+    """
+    version = cache.get(CLOSURE_VERSION_CACHE_KEY)
+    if version is None:
+        stats = AirwayClosure.objects.aggregate(
+            count=Count('id'), max_id=Max('id'), last_update=Max('updated_at')
+        )
+        raw = f"{stats['count']}:{stats['max_id']}:{stats['last_update']}"
+        version = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        cache.set(CLOSURE_VERSION_CACHE_KEY, version, CLOSURE_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_airway_closure_version():
+    """Drop the cached closure version so the next lookup recomputes it"""
+    cache.delete(CLOSURE_VERSION_CACHE_KEY)
+
+
+class ClosureOverlay:
+    """
+    Closed airway edges by time and flight level for one airway router
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self.revision = router.revision
+        self.version = None
+        self.closures = {}  # id -> (updated_at, start, end, lower, upper, airway_id, segment_id, edges)
+        self.masks = OrderedDict()
+        self.lock = threading.Lock()
+
+    def edges_for(self, airway_id=None, segment_id=None):
+        """Undirected edge indices closed by a segment or airway closure"""
+        if segment_id is not None:
+            edge = self.router.segment_edge.get(segment_id)
+            return np.array([] if edge is None else [edge], dtype=np.int64)
+        return self.router.airway_edges.get(airway_id, np.zeros(0, dtype=np.int64))
+
+    def add(self, closure_id, airway_id, segment_id, starts_at, ends_at,
+            lower_limit_fl=0, upper_limit_fl=999, updated_at=None):
+        """Add or replace one closure; costs O(edges it closes)"""
+        edges = self.edges_for(airway_id, segment_id)
+        with self.lock:
+            self.closures[closure_id] = (
+                updated_at, to_epoch(starts_at), to_epoch(ends_at),
+                float(lower_limit_fl), float(upper_limit_fl), airway_id, segment_id, edges
+            )
+            self.masks.clear()
+
+    def remove(self, closure_id):
+        with self.lock:
+            if self.closures.pop(closure_id, None) is not None:
+                self.masks.clear()
+
+    def patch(self):
+        """
+        Catch up with the router's in-place patches since this overlay was
+        resolved; False when the router no longer remembers them
+        """
+        changes = self.router.changes_since(self.revision)
+        if changes is None:
+            return False
+        revision, segments, airways = changes
+        with self.lock:
+            items = list(self.closures.items())
+        for closure_id, (*_, airway_id, segment_id, _) in items:
+            touched = segment_id in segments if segment_id is not None else airway_id in airways
+            if touched:
+                edges = self.edges_for(airway_id, segment_id)
+                with self.lock:
+                    if closure_id in self.closures:
+                        self.closures[closure_id] = self.closures[closure_id][:-1] + (edges,)
+                        self.masks.clear()
+        self.revision = revision
+        return True
+
+    def sync(self, version=None):
+        """
+        Bring the overlay up to date with the closure table
+
+        Closures that have already ended are not loaded. Only closures that
+        are new or whose updated_at changed are resolved to edges again.
+        """
+        version = airway_closure_version() if version is None else version
+        if version == self.version:
+            return
+        rows = AirwayClosure.objects.filter(ends_at__gt=timezone.now()).values_list(
+            'id', 'airway_id', 'segment_id', 'starts_at', 'ends_at',
+            'lower_limit_fl', 'upper_limit_fl', 'updated_at'
+        )
+        seen = set()
+        for row in rows:
+            closure_id, updated_at = row[0], row[-1]
+            seen.add(closure_id)
+            known = self.closures.get(closure_id)
+            if known is None or known[0] != updated_at:
+                self.add(*row)
+        for closure_id in set(self.closures) - seen:
+            self.remove(closure_id)
+        self.version = version
+
+    def active(self, when=None, flight_level=None):
+        """
+        Ids of closures active at `when` (default now) and, if given,
+        covering the flight level
+        """
+        epoch = to_epoch(when if when is not None else timezone.now())
+        with self.lock:
+            items = list(self.closures.items())
+        return tuple(sorted(
+            closure_id for closure_id, (_, start, end, lower, upper, *_) in items
+            if start <= epoch < end and (flight_level is None or lower <= flight_level <= upper)
+        ))
+
+    def blocked_edges(self, when=None, flight_level=None):
+        """
+        Boolean mask over undirected airway edges closed at `when` and
+        flight_level, or None when nothing is closed
+        """
+        key = self.active(when, flight_level)
+        if not key:
+            return None
+        with self.lock:
+            mask = self.masks.get(key)
+            if mask is not None:
+                self.masks.move_to_end(key)
+                return mask
+            mask = np.zeros(self.router.edge_count, dtype=bool)
+            for closure_id in key:
+                mask[self.closures[closure_id][-1]] = True
+            self.masks[key] = mask
+            while len(self.masks) > MASK_CACHE_SIZE:
+                self.masks.popitem(last=False)
+        return mask
+
+
+_overlay = None
+_overlay_lock = threading.Lock()
+
+
+def get_closure_overlay(router=None):
+    """
+    Process-wide ClosureOverlay for the shared airway router, synced with
+    the closure table on every call (a cache read when nothing changed);
+    closures on segments or airways a router patch touched are re-resolved
+    """
+    global _overlay
+    if router is None:
+        from .routing import get_airway_router
+        router = get_airway_router()
+    with _overlay_lock:
+        if _overlay is None or _overlay.router is not router:
+            _overlay = ClosureOverlay(router)
+        elif _overlay.revision != router.revision and not _overlay.patch():
+            _overlay = ClosureOverlay(router)
+        overlay = _overlay
+    overlay.sync()
+    return overlay
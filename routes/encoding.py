@@ -0,0 +1,183 @@
+"""
+Compact coordinate encodings for route payloads
+
+Two optional renderers, chosen with the Accept header or ?format=:
+
+- polyline (application/vnd.flightfuel.polyline+json): JSON where every
+  coordinate list is a Google encoded polyline string at ?precision=
+  (default 5) decimal places.
+- msgpack (application/msgpack): MessagePack where every coordinate list
+  is raw little-endian float32 [lon, lat, lon, lat, ...] bytes, readable
+  directly as a Float32Array.
+
+Both drop coordinates_geojson, which repeats coordinates. The payload
+marks the encoding used in "coordinates_encoding". Polyline encoding is
+vectorized with NumPy over a whole coordinate list. MessagePack needs the
+optional msgpack package; without it the msgpack renderer is not offered:
+Accept: application/msgpack gets 406 Not Acceptable (or JSON when the
+header also accepts it) and ?format=msgpack gets DRF's 404 for an unknown
+format.
+"""
+import datetime
+import decimal
+import re
+import uuid
+
+import numpy as np
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # optional: the msgpack renderer is left out
+    msgpack = None
+
+COORDINATE_KEYS = ('coordinates',)
+DROPPED_KEYS = ('coordinates_geojson',)
+DEFAULT_PRECISION = 5
+MAX_PRECISION = 7
+LINESTRING_WKT = re.compile(r'^(?:SRID=\d+;)?LINESTRING\s*\(([^()]*)\)$', re.IGNORECASE)
+
+
+def encode_polyline(coordinates, precision=DEFAULT_PRECISION):
+    """
+    Google encoded polyline of [lon, lat] pairs (encoded in lat, lon order)
+    """
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    if not len(coords):
+        return ''
+    scaled = np.round(coords[:, ::-1] * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    # Zigzag, then split into 5-bit chunks, least significant first
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    shifts = np.arange(0, 35, 5)
+    chunks = (values[:, None] >> shifts) & 0x1f
+    used = 1 + (values[:, None] >= (1 << shifts[1:])).sum(axis=1)
+    position = np.arange(len(shifts))
+    keep = position[None, :] < used[:, None]
+    more = position[None, :] < (used - 1)[:, None]
+    chars = (chunks | np.where(more, 0x20, 0)) + 63
+    return chars[keep].astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode_polyline(text, precision=DEFAULT_PRECISION):
+    """[lon, lat] pairs of a Google encoded polyline"""
+    values, value, shift = [], 0, 0
+    for char in text.encode('ascii'):
+        chunk = char - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    coords = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coords[:, ::-1].tolist()
+
+
+def coordinate_array(value):
+    """
+    (n, 2) float array for a list of [lon, lat] pairs, a GEOS line or its
+    (E)WKT text as produced by model serializers, else None
+    """
+    if hasattr(value, 'coords'):
+        value = value.coords
+    elif isinstance(value, str):
+        match = LINESTRING_WKT.match(value)
+        if not match:
+            return None
+        try:
+            return np.array([point.split()[:2] for point in match.group(1).split(',')], dtype=float)
+        except ValueError:
+            return None
+    if not isinstance(value, (list, tuple)) or not value:
+        return None
+    first = value[0]
+    if not isinstance(first, (list, tuple)) or len(first) < 2:
+        return None
+    try:
+        return np.asarray([point[:2] for point in value], dtype=float)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_coordinates(data, encoder):
+    """
+    Copy of data (dicts and lists) with every coordinate list passed
+    through encoder and coordinates_geojson dropped
+    """
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if key in DROPPED_KEYS:
+                continue
+            if key in COORDINATE_KEYS:
+                coords = coordinate_array(value)
+                if coords is not None:
+                    result[key] = encoder(coords)
+                    continue
+            result[key] = encode_coordinates(value, encoder)
+        return result
+    if isinstance(data, (list, tuple)):
+        return [encode_coordinates(item, encoder) for item in data]
+    return data
+
+
+def requested_precision(renderer_context):
+    request = (renderer_context or {}).get('request')
+    try:
+        precision = int(request.query_params.get('precision', DEFAULT_PRECISION)) if request else DEFAULT_PRECISION
+    except ValueError:
+        precision = DEFAULT_PRECISION
+    return min(max(precision, 0), MAX_PRECISION)
+
+
+class PolylineJSONRenderer(renderers.JSONRenderer):
+    """JSON with coordinate lists as encoded polylines"""
+    media_type = 'application/vnd.flightfuel.polyline+json'
+    format = 'polyline'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        precision = requested_precision(renderer_context)
+        if isinstance(data, dict):
+            data = dict(
+                encode_coordinates(data, lambda coords: encode_polyline(coords, precision)),
+                coordinates_encoding=f'polyline{precision}'
+            )
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'coords'):
+        return [list(point) for point in value.coords]
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """MessagePack with coordinate lists as float32 bytes"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = dict(
+                encode_coordinates(data, lambda coords: coords.astype('<f4').tobytes()),
+                coordinates_encoding='float32'
+            )
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+COMPACT_RENDERERS = [PolylineJSONRenderer] + ([MessagePackRenderer] if msgpack is not None else [])
+ROUTE_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + COMPACT_RENDERERS
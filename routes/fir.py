@@ -0,0 +1,124 @@
+"""
+FIR intersection lookups for routes
+
+Intersections are computed once per distinct route geometry and stored in
+FIRIntersectionCache, keyed by geometry hash plus FIR dataset version, so
+detail views and batch reports share the same result.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.contrib.gis.geos import LineString
+from django.db.models import Count, Max
+
+from .models import FlightInformationRegion, FIRIntersectionCache
+
+FIR_VERSION_CACHE_KEY = 'routes:fir_dataset_version'
+FIR_VERSION_TIMEOUT = 60  # seconds
+
+# Fields returned for each FIR (boundary is never loaded)
+FIR_FIELDS = ('identifier', 'name', 'country', 'country_code', 'icao_region')
+
+
+def fir_dataset_version():
+    """
+    Short fingerprint of the FIR table, cached for FIR_VERSION_TIMEOUT seconds
+    """
+    version = cache.get(FIR_VERSION_CACHE_KEY)
+    if version is None:
+        stats = FlightInformationRegion.objects.aggregate(
+            count=Count('id'),
+            max_id=Max('id'),
+            last_update=Max('updated_at')
+        )
+        raw = f"{stats['count']}:{stats['max_id']}:{stats['last_update']}"
+        version = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        cache.set(FIR_VERSION_CACHE_KEY, version, FIR_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_fir_dataset_version():
+    """Drop the cached FIR version so the next lookup recomputes it"""
+    cache.delete(FIR_VERSION_CACHE_KEY)
+
+
+def route_geometry_hash(coordinates):
+    """
+    Stable hash of a route geometry ([lon, lat] pairs rounded to 1e-6 deg)
+    Returns None for geometries with fewer than 2 points
+    """
+    if not coordinates or len(coordinates) < 2:
+        return None
+
+    text = ';'.join(f"{float(c[0]):.6f},{float(c[1]):.6f}" for c in coordinates)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def query_firs_for_line(coordinates):
+    """
+    Single spatial query for the FIRs a route line intersects
+    """
+    route_line = LineString([(float(c[0]), float(c[1])) for c in coordinates], srid=4326)
+    return list(
+        FlightInformationRegion.objects.filter(
+            boundary__intersects=route_line
+        ).order_by('identifier').values(*FIR_FIELDS)
+    )
+
+
+def firs_for_routes(coordinate_lists):
+    """
+    FIR lists for many route geometries
+
+    Cached geometries are fetched in one query; each miss costs one spatial
+    query and all misses are stored with a single bulk insert.
+    """
+    version = fir_dataset_version()
+    hashes = [route_geometry_hash(coords) for coords in coordinate_lists]
+
+    wanted = {h for h in hashes if h}
+    known = {}
+    if wanted:
+        known = dict(
+            FIRIntersectionCache.objects.filter(
+                fir_version=version,
+                geometry_hash__in=wanted
+            ).values_list('geometry_hash', 'firs')
+        )
+
+    computed = {}
+    results = []
+    for coords, geometry_hash in zip(coordinate_lists, hashes):
+        if not geometry_hash:
+            results.append([])
+            continue
+
+        if geometry_hash not in known:
+            known[geometry_hash] = query_firs_for_line(coords)
+            computed[geometry_hash] = known[geometry_hash]
+
+        results.append(known[geometry_hash])
+
+    if computed:
+        FIRIntersectionCache.objects.bulk_create(
+            [
+                FIRIntersectionCache(geometry_hash=h, fir_version=version, firs=firs)
+                for h, firs in computed.items()
+            ],
+            ignore_conflicts=True
+        )
+
+    return results
+
+
+def firs_for_route(coordinates):
+    """FIR list for a single route geometry"""
+    return firs_for_routes([coordinates])[0]
+
+
+def prune_fir_cache():
+    """Delete cached intersections computed against older FIR datasets"""
+    deleted, _ = FIRIntersectionCache.objects.exclude(
+        fir_version=fir_dataset_version()
+    ).delete()
+    return deleted
@@ -0,0 +1,218 @@
+"""
+Hierarchical lat/lon cell index for O(1) point-to-FIR lookups
+
+The globe is split quadtree-style (level k has 2^(k+1) x 2^k cells). While
+building, a cell that lies fully inside one FIR is resolved at the coarsest
+level possible and its whole block in the finest grid is filled with that FIR;
+a cell outside every FIR is marked OUTSIDE; only cells on a boundary are split
+further and, at the finest level, left as BOUNDARY for an exact test.
+
+The finest grid is stored as a .npy file next to a JSON manifest and loaded
+memory-mapped, so every worker shares the same pages. Lookups are a NumPy
+gather; only points that fall in BOUNDARY cells go to the STRtree index.
+locate_firs uses the grid when it matches the current FIR dataset and the
+STRtree index otherwise.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .fir import fir_dataset_version
+
+OUTSIDE = -1
+BOUNDARY = -2
+
+DEFAULT_LEVEL = 10  # 2048 x 1024 cells, ~0.18 deg
+GRID_FILE = 'fir_cells.npy'
+MANIFEST_FILE = 'fir_cells.json'
+
+
+def cell_size_deg(level):
+    return 180.0 / (2 ** level)
+
+
+def cell_coordinates(lon, lat, level):
+    """Row/column of the finest-level cell containing each point"""
+    size = cell_size_deg(level)
+    lon = np.asarray(lon, dtype=float).ravel()
+    lat = np.asarray(lat, dtype=float).ravel()
+    cols = np.clip(((lon + 180.0) // size).astype(np.int64), 0, 2 ** (level + 1) - 1)
+    rows = np.clip(((lat + 90.0) // size).astype(np.int64), 0, 2 ** level - 1)
+    return rows, cols
+
+
+def build_cell_grid(fir_index, level=DEFAULT_LEVEL, start_level=2):
+    """
+    Classify cells level by level against a FIRIndex
+
+    Returns the finest grid (int16 FIR index, OUTSIDE or BOUNDARY) and the
+    number of cells tested at each level.
+    """
+    import shapely
+
+    if len(fir_index) >= np.iinfo(np.int16).max:
+        raise ValueError('Too many FIRs for an int16 cell grid')
+
+    grid = np.full((2 ** level, 2 ** (level + 1)), OUTSIDE, dtype=np.int16)
+    rows, cols = np.meshgrid(np.arange(2 ** start_level), np.arange(2 ** (start_level + 1)), indexing='ij')
+    pending_rows, pending_cols = rows.ravel(), cols.ravel()
+    tested = {}
+
+    for current in range(start_level, level + 1):
+        if not len(pending_rows):
+            break
+        tested[current] = len(pending_rows)
+
+        size = cell_size_deg(current)
+        west = pending_cols * size - 180.0
+        south = pending_rows * size - 90.0
+        boxes = shapely.box(west, south, west + size, south + size)
+
+        n = len(boxes)
+        lowest_hit = np.full(n, len(fir_index), dtype=np.int64)
+        box_idx, fir_idx = fir_index.tree.query(boxes, predicate='intersects')
+        np.minimum.at(lowest_hit, box_idx, fir_idx)
+
+        inside = np.zeros(n, dtype=bool)
+        within_box, within_fir = fir_index.tree.query(boxes, predicate='within')
+        inside[within_box[within_fir == lowest_hit[within_box]]] = True
+
+        outside = lowest_hit == len(fir_index)
+        block = 2 ** (level - current)
+        for r, c, value in zip(pending_rows[inside], pending_cols[inside], lowest_hit[inside]):
+            grid[r * block:(r + 1) * block, c * block:(c + 1) * block] = value
+
+        split = ~(inside | outside)
+        if current == level:
+            grid[pending_rows[split], pending_cols[split]] = BOUNDARY
+            break
+
+        # Each undecided cell becomes four children at the next level
+        r = pending_rows[split] * 2
+        c = pending_cols[split] * 2
+        pending_rows = np.concatenate([r, r, r + 1, r + 1])
+        pending_cols = np.concatenate([c, c + 1, c, c + 1])
+
+    return grid, tested
+
+
+def index_directory():
+    return str(getattr(settings, 'FIR_CELL_INDEX_DIR', os.path.join(settings.BASE_DIR, 'data', 'fir_cells')))
+
+
+def save_cell_index(directory, grid, level, fir_version, identifiers):
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, GRID_FILE), grid)
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'level': level,
+            'fir_version': fir_version,
+            'identifiers': list(identifiers),
+        }, f)
+
+
+class FIRCellIndex:
+    """
+    Memory-mapped cell grid for one FIR dataset version
+    """
+
+    def __init__(self, grid, level, fir_version, identifiers):
+        self.grid = grid
+        self.level = level
+        self.fir_version = fir_version
+        self.identifiers = np.asarray(list(identifiers) + [None], dtype=object)  # [-1] -> None
+
+    @classmethod
+    def open(cls, directory=None):
+        directory = directory or index_directory()
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        return cls(
+            np.load(os.path.join(directory, GRID_FILE), mmap_mode='r'),
+            manifest['level'],
+            manifest['fir_version'],
+            manifest['identifiers'],
+        )
+
+    def locate_points(self, lon, lat, fir_index=None):
+        """
+        FIR index for each point (-1 when outside every FIR)
+
+        Points in BOUNDARY cells are resolved with fir_index (exact test);
+        without one they are returned as BOUNDARY.
+        """
+        lon = np.asarray(lon, dtype=float).ravel()
+        lat = np.asarray(lat, dtype=float).ravel()
+        rows, cols = cell_coordinates(lon, lat, self.level)
+        result = self.grid[rows, cols].astype(np.int64)
+
+        boundary = result == BOUNDARY
+        if fir_index is not None and boundary.any():
+            result[boundary] = fir_index.locate_points(lon[boundary], lat[boundary])
+        return result
+
+    def firs_at(self, lon, lat, fir_index=None):
+        """FIR identifier for each point as a NumPy object array"""
+        return self.identifiers[self.locate_points(lon, lat, fir_index)]
+
+
+_cell_index = None
+_cell_index_miss = None  # (FIR version, manifest mtime) of the last failed open
+_cell_index_lock = threading.Lock()
+
+
+def _manifest_mtime():
+    try:
+        return os.path.getmtime(os.path.join(index_directory(), MANIFEST_FILE))
+    except OSError:
+        return None
+
+
+def get_fir_cell_index():
+    """
+    Process-wide FIRCellIndex, or None when the index on disk is missing or
+    was built from an older FIR dataset (run build_fir_cells again)
+
+    A miss is remembered for the FIR version and manifest modification
+    time, so until either changes a call costs one stat, not a reload.
+    """
+    global _cell_index, _cell_index_miss
+    version = fir_dataset_version()
+    if _cell_index is not None and _cell_index.fir_version == version:
+        return _cell_index
+
+    with _cell_index_lock:
+        if _cell_index is not None and _cell_index.fir_version == version:
+            return _cell_index
+        key = (version, _manifest_mtime())
+        if key == _cell_index_miss:
+            return None
+        try:
+            candidate = FIRCellIndex.open()
+        except (OSError, ValueError, KeyError):
+            candidate = None
+        if candidate is None or candidate.fir_version != version:
+            _cell_index_miss = key
+            return None
+        _cell_index = candidate
+    return _cell_index
+
+
+def locate_firs(lon, lat, fir_index=None):
+    """
+    FIR identifier for each point (None outside every FIR) as a NumPy
+    object array: cell index when fresh, STRtree otherwise
+    """
+    from .fir_index import get_fir_index
+
+    if fir_index is None:
+        fir_index = get_fir_index()
+    cell_index = get_fir_cell_index()
+    if cell_index is not None and list(cell_index.identifiers[:-1]) == fir_index.identifiers:
+        return cell_index.firs_at(lon, lat, fir_index)
+
+    identifiers = np.asarray(fir_index.identifiers + [None], dtype=object)
+    return identifiers[fir_index.locate_points(lon, lat)]
@@ -0,0 +1,226 @@
+"""
+In-memory FIR geometry engine
+
+FIR boundaries are loaded once per process into prepared Shapely geometries
+indexed by an STRtree, and reloaded only when the FIR dataset version
+changes. Point and route questions (which FIR contains a point, which FIRs
+a route crosses, ordered traversal with entry/exit points) are then answered
+without a database round trip per route.
+"""
+import threading
+
+import numpy as np
+
+from .models import FlightInformationRegion
+from .fir import fir_dataset_version
+from .geo import cumulative_distance_nm
+
+DEFAULT_GROUND_SPEED_KT = 450  # Same assumption as Route.calculate_flight_time
+
+
+class FIRIndex:
+    """
+    Prepared FIR geometries for one FIR dataset version
+    """
+
+    def __init__(self, version, identifiers, names, country_codes, geometries):
+        import shapely
+
+        self.version = version
+        self.identifiers = list(identifiers)
+        self.names = list(names)
+        self.country_codes = list(country_codes)
+        self.geometries = np.asarray(geometries, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def load(cls, version=None):
+        """
+        Load all active FIR boundaries in a single query
+        """
+        import shapely
+
+        rows = FlightInformationRegion.objects.filter(
+            is_active=True
+        ).order_by('identifier').values_list('identifier', 'name', 'country_code', 'boundary')
+
+        identifiers, names, codes, geometries = [], [], [], []
+        for identifier, name, code, boundary in rows:
+            if not boundary:
+                continue
+            geometry = shapely.from_wkb(bytes(boundary.wkb))
+            if not geometry.is_valid:
+                geometry = shapely.make_valid(geometry)
+            identifiers.append(identifier)
+            names.append(name)
+            codes.append(code)
+            geometries.append(geometry)
+
+        return cls(version or fir_dataset_version(), identifiers, names, codes, geometries)
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def candidates_for_line(self, line):
+        """Indices of FIRs intersecting a Shapely line"""
+        if not len(self):
+            return np.zeros(0, dtype=int)
+        return np.sort(self.tree.query(line, predicate='intersects'))
+
+    def locate_points(self, lon, lat):
+        """
+        FIR index for each point (-1 when outside every FIR)
+
+        Batched point-in-polygon: one STRtree bulk query for all points.
+        Points in overlapping FIRs resolve to the lowest index (identifier order).
+        """
+        import shapely
+
+        lon = np.asarray(lon, dtype=float).ravel()
+        lat = np.asarray(lat, dtype=float).ravel()
+        result = np.full(len(lon), len(self), dtype=np.int64)
+        if len(self) and len(lon):
+            point_idx, fir_idx = self.tree.query(shapely.points(lon, lat), predicate='intersects')
+            np.minimum.at(result, point_idx, fir_idx)
+        result[result == len(self)] = -1
+        return result
+
+    def firs_at(self, lon, lat):
+        """FIR identifier for each point (None when outside every FIR)"""
+        return [self.identifiers[i] if i >= 0 else None for i in self.locate_points(lon, lat)]
+
+    def intersecting_firs(self, coordinates):
+        """Identifiers of the FIRs a [lon, lat] polyline intersects"""
+        import shapely
+
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if len(coords) < 2:
+            return []
+        return [self.identifiers[i] for i in self.candidates_for_line(shapely.linestrings(coords))]
+
+    def classify_routes(self, coordinate_lists):
+        """
+        FIR identifiers crossed by each route, for many routes in one bulk query
+        """
+        import shapely
+
+        lines = []
+        positions = []
+        for position, coords in enumerate(coordinate_lists):
+            coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+            if len(coords) >= 2:
+                lines.append(shapely.linestrings(coords))
+                positions.append(position)
+
+        results = [[] for _ in coordinate_lists]
+        if not lines or not len(self):
+            return results
+
+        line_idx, fir_idx = self.tree.query(np.asarray(lines, dtype=object), predicate='intersects')
+        order = np.lexsort((fir_idx, line_idx))
+        for li, fi in zip(line_idx[order], fir_idx[order]):
+            results[positions[li]].append(self.identifiers[fi])
+        return results
+
+    def traverse(self, coordinates, ground_speed_kt=DEFAULT_GROUND_SPEED_KT):
+        """
+        Ordered FIR penetrations along a route
+
+        coordinates: [[lon, lat], ...] route polyline
+        Returns a list of dicts in flying order with entry/exit points,
+        along-track distances (NM) and elapsed times (minutes).
+        """
+        import shapely
+
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if len(coords) < 2:
+            return []
+
+        line = shapely.linestrings(coords)
+        cum_nm = cumulative_distance_nm(coords)
+        cum_deg = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(coords, axis=0).T))))
+
+        pieces = []
+        for fir_idx in self.candidates_for_line(line):
+            overlap = shapely.line_merge(shapely.intersection(self.geometries[fir_idx], line))
+            for part in shapely.get_parts(overlap):
+                if shapely.get_type_id(part) != 1 or part.length == 0:  # LineStrings only
+                    continue
+                part_coords = shapely.get_coordinates(part)
+                pieces.append((fir_idx, part_coords[0], part_coords[-1]))
+
+        if not pieces:
+            return []
+
+        # Locate every entry/exit point on the route in one vectorized call
+        ends = np.array([[p[1], p[2]] for p in pieces]).reshape(-1, 2)
+        along_deg = shapely.line_locate_point(line, shapely.points(ends))
+        along_nm = self._planar_to_geodesic(along_deg, cum_deg, cum_nm).reshape(-1, 2)
+        along_nm.sort(axis=1)
+
+        order = np.argsort(along_nm[:, 0], kind='stable')
+        traversal = []
+        for i in order:
+            fir_idx, start, end = pieces[i]
+            entry_nm, exit_nm = along_nm[i]
+            if along_deg[2 * i] > along_deg[2 * i + 1]:
+                start, end = end, start
+
+            previous = traversal[-1] if traversal else None
+            if previous and previous['_fir'] == fir_idx and entry_nm - previous['exit_distance_nm'] < 0.1:
+                previous['exit_distance_nm'] = exit_nm
+                previous['exit_point'] = [float(end[0]), float(end[1])]
+                continue
+
+            traversal.append({
+                '_fir': fir_idx,
+                'identifier': self.identifiers[fir_idx],
+                'name': self.names[fir_idx],
+                'country_code': self.country_codes[fir_idx],
+                'entry_point': [float(start[0]), float(start[1])],
+                'exit_point': [float(end[0]), float(end[1])],
+                'entry_distance_nm': entry_nm,
+                'exit_distance_nm': exit_nm,
+            })
+
+        for sequence, item in enumerate(traversal, 1):
+            del item['_fir']
+            distance = item['exit_distance_nm'] - item['entry_distance_nm']
+            item['sequence'] = sequence
+            item['entry_distance_nm'] = round(float(item['entry_distance_nm']), 1)
+            item['exit_distance_nm'] = round(float(item['exit_distance_nm']), 1)
+            item['distance_nm'] = round(float(distance), 1)
+            item['entry_time_min'] = round(float(item['entry_distance_nm']) / ground_speed_kt * 60, 1)
+            item['time_min'] = round(float(distance) / ground_speed_kt * 60, 1)
+
+        return traversal
+
+    def traverse_many(self, coordinate_lists, ground_speed_kt=DEFAULT_GROUND_SPEED_KT):
+        """Ordered FIR traversal for many routes (no database access)"""
+        return [self.traverse(coords, ground_speed_kt) for coords in coordinate_lists]
+
+    @staticmethod
+    def _planar_to_geodesic(along_deg, cum_deg, cum_nm):
+        """Map planar along-line positions to great-circle along-track NM"""
+        segment = np.clip(np.searchsorted(cum_deg, along_deg, side='right') - 1, 0, len(cum_deg) - 2)
+        seg_len = cum_deg[segment + 1] - cum_deg[segment]
+        frac = np.divide(along_deg - cum_deg[segment], seg_len, out=np.zeros_like(along_deg), where=seg_len > 0)
+        return cum_nm[segment] + frac * (cum_nm[segment + 1] - cum_nm[segment])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fir_index():
+    """
+    Process-wide FIRIndex, reloaded when the FIR dataset version changes
+    """
+    global _index
+    version = fir_dataset_version()
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = FIRIndex.load(version)
+    return _index
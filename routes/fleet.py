@@ -0,0 +1,180 @@
+"""
+Fleet x route fuel matrix
+
+Stored routes are read in batches, their legs laid back to back, and each
+batch is evaluated for every aircraft type at once with fuel.fuel_matrix.
+Rows are yielded as they are computed so CSV/NDJSON output can be streamed.
+"""
+import csv
+import json
+
+import numpy as np
+
+from aircraft.models import AircraftType
+from aircraft.performance import get_performance_table
+from .fuel import (
+    fuel_matrix, DEFAULT_FLIGHT_LEVEL, DEFAULT_CONTINGENCY_PCT, DEFAULT_FINAL_RESERVE_MIN
+)
+from .geo import haversine_nm
+from .models import Route
+
+DEFAULT_BATCH_SIZE = 500
+
+MATRIX_FIELDS = [
+    'route_id', 'route_name', 'departure', 'arrival', 'aircraft_type',
+    'distance_nm', 'flight_time_min', 'trip_fuel_kg', 'contingency_fuel_kg',
+    'final_reserve_fuel_kg', 'block_fuel_kg', 'takeoff_weight_kg',
+    'landing_weight_kg', 'within_limits',
+]
+
+
+def load_fleet(codes=None, payload_kg=None, flight_level=DEFAULT_FLIGHT_LEVEL, mach=None):
+    """
+    Aircraft types with a performance grid, ready for fuel_matrix
+
+    The zero fuel weight is OEW + payload capped at MZFW (MZFW when no
+    payload is given), the cruise level is capped at the type's ceiling and
+    Mach defaults to the type's cruise Mach. Returns (fleet, skipped codes).
+    """
+    types = AircraftType.objects.filter(is_active=True).order_by('icao_code')
+    if codes:
+        types = types.filter(icao_code__in=[c.upper() for c in codes])
+
+    fleet = []
+    skipped = []
+    for aircraft in types:
+        try:
+            table = get_performance_table(aircraft.icao_code)
+        except (KeyError, OSError, ValueError):
+            skipped.append(aircraft.icao_code)
+            continue
+
+        if payload_kg is None:
+            zero_fuel_weight = aircraft.max_zero_fuel_weight
+        else:
+            zero_fuel_weight = min(aircraft.operating_empty_weight + payload_kg, aircraft.max_zero_fuel_weight)
+
+        fleet.append({
+            'code': aircraft.icao_code,
+            'table': table,
+            'zero_fuel_weight': zero_fuel_weight,
+            'flight_level': min(flight_level, aircraft.ceiling_fl),
+            'mach': mach or aircraft.default_mach,
+            'max_takeoff_weight': aircraft.max_takeoff_weight,
+            'max_fuel_capacity': aircraft.max_fuel_capacity,
+        })
+
+    if codes:
+        found = {a['code'] for a in fleet} | set(skipped)
+        skipped.extend(c.upper() for c in codes if c.upper() not in found)
+    return fleet, skipped
+
+
+def route_leg_batches(routes, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield (route info, leg_nm, route_starts) per batch of routes
+
+    Leg distances for the whole batch come from one haversine call over
+    the concatenated vertices; legs spanning two routes are dropped.
+    """
+    rows = routes.exclude(coordinates=None).values_list(
+        'id', 'name', 'departure', 'arrival', 'coordinates'
+    ).order_by('id')
+
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        if row[4] is not None and row[4].num_points >= 2:
+            batch.append(row)
+        if len(batch) == batch_size:
+            yield _legs_for_batch(batch)
+            batch = []
+    if batch:
+        yield _legs_for_batch(batch)
+
+
+def _legs_for_batch(batch):
+    vertices = [np.asarray(row[4].coords, dtype=float).reshape(-1, 2) for row in batch]
+    counts = np.array([len(v) for v in vertices])
+    coords = np.concatenate(vertices)
+
+    distances = haversine_nm(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+    # The pair (last vertex of a route, first vertex of the next) is not a leg
+    keep = np.ones(len(distances), dtype=bool)
+    keep[np.cumsum(counts)[:-1] - 1] = False
+
+    leg_counts = counts - 1
+    starts = np.concatenate(([0], np.cumsum(leg_counts)[:-1]))
+    info = [row[:4] for row in batch]
+    return info, distances[keep], starts
+
+
+def iter_fuel_matrix(routes, fleet, wind_kt=0.0, isa_deviation=0.0,
+                     contingency_pct=DEFAULT_CONTINGENCY_PCT,
+                     final_reserve_min=DEFAULT_FINAL_RESERVE_MIN,
+                     batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield one dict per (route, aircraft type), in MATRIX_FIELDS order
+    """
+    if not fleet:
+        return
+
+    tables = [a['table'] for a in fleet]
+    zero_fuel_weights = np.array([a['zero_fuel_weight'] for a in fleet])
+    flight_levels = np.array([a['flight_level'] for a in fleet], dtype=float)
+    machs = np.array([a['mach'] for a in fleet])
+    max_takeoff = np.array([a['max_takeoff_weight'] for a in fleet])[:, None]
+    max_fuel = np.array([a['max_fuel_capacity'] for a in fleet])[:, None]
+    codes = [a['code'] for a in fleet]
+
+    numeric = MATRIX_FIELDS[5:-1]
+    for info, leg_nm, starts in route_leg_batches(routes, batch_size):
+        result = fuel_matrix(
+            leg_nm, starts, tables, zero_fuel_weights,
+            flight_levels=flight_levels, machs=machs, wind_kt=wind_kt,
+            isa_deviation=isa_deviation, contingency_pct=contingency_pct,
+            final_reserve_min=final_reserve_min
+        )
+        within = ((result['takeoff_weight_kg'] <= max_takeoff) & (result['block_fuel_kg'] <= max_fuel)).tolist()
+        columns = [np.round(result[key], 1).tolist() for key in numeric]
+
+        for r, (route_id, name, departure, arrival) in enumerate(info):
+            for t, code in enumerate(codes):
+                row = {
+                    'route_id': route_id,
+                    'route_name': name,
+                    'departure': departure,
+                    'arrival': arrival,
+                    'aircraft_type': code,
+                }
+                for key, column in zip(numeric, columns):
+                    row[key] = column[t][r]
+                row['within_limits'] = within[t][r]
+                yield row
+
+
+class _Echo:
+    """File-like object whose write() returns the value (for streaming csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def matrix_csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(MATRIX_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[key] for key in MATRIX_FIELDS])
+
+
+def matrix_ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def matrix_routes(route_ids=None, include_deleted=False):
+    routes = Route.objects.all()
+    if route_ids:
+        routes = routes.filter(id__in=route_ids)
+    if not include_deleted:
+        routes = routes.filter(is_active=True)
+    return routes
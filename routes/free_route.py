@@ -0,0 +1,248 @@
+"""
+Free-route (off-airway) trajectory optimizer
+
+Candidate points form a lattice aligned with the great circle from origin
+to destination: layers evenly spaced along the great circle, each with
+points spread perpendicular to it (widest mid-route, tapering towards the
+ends). The minimum-time path is found layer by layer (the lattice is a
+DAG); every transition between two layers is costed in one vectorized
+call, with winds taken at the transition midpoint and estimated time over.
+Excluded airspace removes lattice points and transitions through an
+STRtree query per layer.
+"""
+import math
+
+import numpy as np
+
+from .fuel import MIN_GROUND_SPEED_KT
+from .geo import haversine_nm, initial_bearing_deg, intermediate_points, destination_point
+
+DEFAULT_LAYER_SPACING_NM = 100.0
+DEFAULT_LATERAL_POINTS = 21
+DEFAULT_MAX_DEVIATION_NM = 300.0
+DEFAULT_MAX_LATERAL_STEP = 2   # lattice columns a single leg may shift sideways
+DEFAULT_BUDGET = 200000        # transition evaluations per query
+
+# Server-side limits for client-supplied lattice parameters
+MAX_BUDGET = 2000000
+MAX_LATERAL_POINTS = 201
+MIN_LAYER_SPACING_NM = 10.0
+MAX_DEVIATION_NM = 1000.0
+
+
+def lattice_shape(total_nm, budget=DEFAULT_BUDGET, layer_spacing_nm=DEFAULT_LAYER_SPACING_NM,
+                  lateral_points=DEFAULT_LATERAL_POINTS, max_lateral_step=DEFAULT_MAX_LATERAL_STEP):
+    """
+    (layers, lateral points) fitting the evaluation budget; lateral
+    resolution is reduced first, then the number of layers
+    """
+    layers = max(int(math.ceil(total_nm / layer_spacing_nm)) - 1, 1)
+    columns = max(int(lateral_points) | 1, 1)  # odd, so the great circle is a column
+
+    def evaluations(layers, columns):
+        return layers * columns * min(2 * max_lateral_step + 1, columns) + 2 * columns
+
+    while evaluations(layers, columns) > budget:
+        if columns > 5:
+            columns -= 2
+        elif layers > 1:
+            layers = max(layers * 3 // 4, 1)
+        else:
+            break
+    return layers, columns
+
+
+def build_lattice(origin, destination, layers, columns, max_deviation_nm=DEFAULT_MAX_DEVIATION_NM):
+    """
+    Lattice point coordinates, each of shape (layers, columns)
+    """
+    fractions = np.arange(1, layers + 1) / (layers + 1)
+    centre_lon, centre_lat = intermediate_points(*origin, *destination, fractions)
+    track = initial_bearing_deg(centre_lon, centre_lat, destination[0], destination[1])
+    offsets = np.linspace(-1.0, 1.0, columns) if columns > 1 else np.zeros(1)
+    deviation = max_deviation_nm * np.sin(np.pi * fractions)[:, None] * offsets[None, :]
+    return destination_point(
+        centre_lon[:, None], centre_lat[:, None], (track + 90.0)[:, None], deviation
+    )
+
+
+class FreeRouteOptimizer:
+    """
+    Minimum-time lattice search for one aircraft speed and flight level
+    """
+
+    def __init__(self, true_airspeed_kt, flight_level=350, wind_grid=None, departure_time=None,
+                 excluded_areas=None, budget=DEFAULT_BUDGET,
+                 layer_spacing_nm=DEFAULT_LAYER_SPACING_NM, lateral_points=DEFAULT_LATERAL_POINTS,
+                 max_deviation_nm=DEFAULT_MAX_DEVIATION_NM, max_lateral_step=DEFAULT_MAX_LATERAL_STEP):
+        import shapely
+
+        self.true_airspeed = float(true_airspeed_kt)
+        self.flight_level = float(flight_level)
+        self.wind_grid = wind_grid
+        self.budget = min(max(int(budget), 1), MAX_BUDGET)
+        self.layer_spacing = max(float(layer_spacing_nm), MIN_LAYER_SPACING_NM)
+        self.lateral_points = min(max(int(lateral_points), 1), MAX_LATERAL_POINTS)
+        self.max_deviation = min(max(float(max_deviation_nm), 0.0), MAX_DEVIATION_NM)
+        self.max_lateral_step = max_lateral_step
+
+        self.start_epoch = None
+        if wind_grid is not None:
+            from .weather import to_epoch
+            self.start_epoch = to_epoch(departure_time) if departure_time is not None else float(wind_grid.times[0])
+
+        areas = [a for a in (excluded_areas or []) if a is not None and not a.is_empty]
+        self.excluded = np.asarray(areas, dtype=object)
+        self.tree = shapely.STRtree(self.excluded) if len(areas) else None
+        self.evaluations = 0
+        self.blocked = 0
+
+    def _blocked_points(self, lon, lat):
+        import shapely
+
+        if self.tree is None:
+            return np.zeros(lon.shape, dtype=bool)
+        hit = np.zeros(lon.size, dtype=bool)
+        hit[self.tree.query(shapely.points(lon.ravel(), lat.ravel()), predicate='intersects')[0]] = True
+        return hit.reshape(lon.shape)
+
+    def _blocked_legs(self, from_lon, from_lat, to_lon, to_lat):
+        import shapely
+
+        if self.tree is None or not len(from_lon):
+            return np.zeros(len(from_lon), dtype=bool)
+        coords = np.stack([np.stack([from_lon, from_lat], -1), np.stack([to_lon, to_lat], -1)], axis=1)
+        hit = np.zeros(len(from_lon), dtype=bool)
+        hit[self.tree.query(shapely.linestrings(coords), predicate='intersects')[0]] = True
+        return hit
+
+    def leg_times(self, from_lon, from_lat, to_lon, to_lat, elapsed_min):
+        """Time (minutes) and along-track wind (kt) for arrays of legs"""
+        distance = haversine_nm(from_lon, from_lat, to_lon, to_lat)
+        self.evaluations += len(distance)
+        if self.wind_grid is None:
+            tailwind = np.zeros_like(distance)
+        else:
+            mid_lon = from_lon + ((to_lon - from_lon + 180.0) % 360.0 - 180.0) / 2.0
+            mid_lat = (from_lat + to_lat) / 2.0
+            track = initial_bearing_deg(from_lon, from_lat, to_lon, to_lat)
+            when = self.start_epoch + (elapsed_min + distance / self.true_airspeed * 30.0) * 60.0
+            tailwind, _, _ = self.wind_grid.components(mid_lon, mid_lat, self.flight_level, when, track)
+        ground_speed = np.maximum(self.true_airspeed + tailwind, MIN_GROUND_SPEED_KT)
+        return distance / ground_speed * 60.0, tailwind
+
+    def optimize(self, origin, destination):
+        """
+        Minimum-time path from origin to destination ([lon, lat] each)
+
+        Returns a dict with the path coordinates, its distance and time, and
+        the time of the direct great circle for comparison (None when the
+        great circle crosses excluded airspace). Raises ValueError when the
+        excluded airspace leaves no path through the lattice.
+        """
+        origin = (float(origin[0]), float(origin[1]))
+        destination = (float(destination[0]), float(destination[1]))
+        total_nm = float(haversine_nm(*origin, *destination))
+        if total_nm < 1.0:
+            raise ValueError('Origin and destination are the same point')
+
+        layers, columns = lattice_shape(
+            total_nm, self.budget, self.layer_spacing, self.lateral_points, self.max_lateral_step
+        )
+        lattice_lon, lattice_lat = build_lattice(origin, destination, layers, columns, self.max_deviation)
+        blocked_points = self._blocked_points(lattice_lon, lattice_lat)
+
+        # Layer 0 is the origin; each step costs all allowed (from, to) pairs at once
+        best = np.zeros(1)
+        from_lon, from_lat = np.array([origin[0]]), np.array([origin[1]])
+        back = []
+        for layer in range(layers + 1):
+            if layer < layers:
+                to_lon, to_lat = lattice_lon[layer], lattice_lat[layer]
+                to_blocked = blocked_points[layer]
+            else:
+                to_lon, to_lat = np.array([destination[0]]), np.array([destination[1]])
+                to_blocked = np.zeros(1, dtype=bool)
+
+            i, j = self._transitions(len(from_lon), len(to_lon), 0 < layer < layers)
+            allowed = np.isfinite(best)[i] & ~to_blocked[j]
+            i, j = i[allowed], j[allowed]
+
+            crossing = self._blocked_legs(from_lon[i], from_lat[i], to_lon[j], to_lat[j])
+            self.blocked += int(crossing.sum())
+            i, j = i[~crossing], j[~crossing]
+
+            time_min, _ = self.leg_times(from_lon[i], from_lat[i], to_lon[j], to_lat[j], best[i])
+            arrival = best[i] + time_min
+
+            # Cheapest predecessor for every node of the next layer
+            next_best = np.full(len(to_lon), np.inf)
+            np.minimum.at(next_best, j, arrival)
+            winner = np.full(len(to_lon), -1, dtype=np.int64)
+            is_best = arrival == next_best[j]
+            winner[j[is_best]] = i[is_best]
+            back.append(winner)
+
+            best = next_best
+            from_lon, from_lat = to_lon, to_lat
+
+        if not np.isfinite(best[0]):
+            raise ValueError('Excluded airspace leaves no path through the lattice')
+
+        # Backtrack column indices, then assemble the path
+        columns_used = []
+        node = 0
+        for layer in range(layers, 0, -1):
+            node = int(back[layer][node])
+            columns_used.append(node)
+        columns_used.reverse()
+
+        path_lon = np.concatenate(([origin[0]], lattice_lon[np.arange(layers), columns_used], [destination[0]]))
+        path_lat = np.concatenate(([origin[1]], lattice_lat[np.arange(layers), columns_used], [destination[1]]))
+        distance = haversine_nm(path_lon[:-1], path_lat[:-1], path_lon[1:], path_lat[1:])
+        total_time = float(best[0])
+
+        return {
+            'coordinates': np.stack([path_lon, path_lat], axis=-1).round(6).tolist(),
+            'total_distance_nm': round(float(distance.sum()), 1),
+            'flight_time_min': round(total_time, 1),
+            'mean_wind_component_kt': round(float(distance.sum()) / total_time * 60.0 - self.true_airspeed, 1),
+            'great_circle_distance_nm': round(total_nm, 1),
+            'great_circle_time_min': self._great_circle_time(
+                origin, destination, lattice_lon[:, columns // 2], lattice_lat[:, columns // 2]
+            ),
+            'lattice': {
+                'layers': layers,
+                'lateral_points': columns,
+                'evaluations': self.evaluations,
+                'blocked_transitions': self.blocked,
+                'blocked_points': int(blocked_points.sum()),
+            },
+            'wind_cycle': self.wind_grid.cycle if self.wind_grid is not None else None,
+        }
+
+    def _transitions(self, from_count, to_count, banded):
+        """
+        (from, to) column pairs between two layers, ordered by from then to;
+        between lattice layers only the band within max_lateral_step is
+        built, so memory grows with columns, not columns squared
+        """
+        if not banded:
+            i, j = np.meshgrid(np.arange(from_count), np.arange(to_count), indexing='ij')
+            return i.ravel(), j.ravel()
+        steps = np.arange(-self.max_lateral_step, self.max_lateral_step + 1)
+        i = np.repeat(np.arange(from_count), len(steps))
+        j = i + np.tile(steps, from_count)
+        inside = (j >= 0) & (j < to_count)
+        return i[inside], j[inside]
+
+    def _great_circle_time(self, origin, destination, centre_lon, centre_lat):
+        lon = np.concatenate(([origin[0]], centre_lon, [destination[0]]))
+        lat = np.concatenate(([origin[1]], centre_lat, [destination[1]]))
+        if self._blocked_legs(lon[:-1], lat[:-1], lon[1:], lat[1:]).any():
+            return None
+        elapsed = 0.0
+        for k in range(len(lon) - 1):
+            time_min, _ = self.leg_times(lon[k:k + 1], lat[k:k + 1], lon[k + 1:k + 2], lat[k + 1:k + 2], elapsed)
+            elapsed += float(time_min[0])
+        return round(elapsed, 1)
@@ -0,0 +1,224 @@
+"""
+Server-side fuel calculation engine
+
+Fuel burn is integrated leg by leg from an aircraft performance table
+(fuel flow and true airspeed on a weight x flight level x ISA deviation
+x Mach grid, see aircraft.performance).
+All per-leg quantities are NumPy arrays; the weight dependency between
+legs is resolved with a few fixed-point passes instead of a Python loop
+over legs.
+"""
+import numpy as np
+
+from aircraft.performance import get_performance_table
+from .geo import leg_distances_nm
+
+DEFAULT_FLIGHT_LEVEL = 350
+DEFAULT_MACH = 0.78
+DEFAULT_CONTINGENCY_PCT = 5.0
+DEFAULT_FINAL_RESERVE_MIN = 30.0
+FIXED_POINT_PASSES = 3
+MIN_GROUND_SPEED_KT = 50.0
+
+
+def integrate_legs(table, leg_nm, takeoff_weight=None, flight_level=DEFAULT_FLIGHT_LEVEL,
+                   mach=DEFAULT_MACH, wind_kt=0.0, zero_fuel_weight=None,
+                   contingency_pct=DEFAULT_CONTINGENCY_PCT,
+                   final_reserve_min=DEFAULT_FINAL_RESERVE_MIN, isa_deviation=0.0):
+    """
+    Integrate burn over legs
+
+    Weights are anchored at takeoff (takeoff_weight) or at landing
+    (zero_fuel_weight + contingency + final reserve, carried unburned).
+    leg_nm, flight_level, mach, wind_kt (tailwind positive) and
+    isa_deviation (deg C) may be scalars or per-leg arrays. Returns per-leg
+    arrays as a dict.
+    """
+    leg_nm = np.asarray(leg_nm, dtype=float)
+    levels = np.broadcast_to(np.asarray(flight_level, dtype=float), leg_nm.shape)
+    machs = np.broadcast_to(np.asarray(mach, dtype=float), leg_nm.shape)
+    wind = np.broadcast_to(np.asarray(wind_kt, dtype=float), leg_nm.shape)
+    isa = np.broadcast_to(np.asarray(isa_deviation, dtype=float), leg_nm.shape)
+
+    burn = np.zeros_like(leg_nm)
+    fuel_flow = np.zeros_like(leg_nm)
+    passes = FIXED_POINT_PASSES if takeoff_weight is not None else FIXED_POINT_PASSES + 1
+    for _ in range(passes):
+        burned_before = np.cumsum(burn) - burn
+        if takeoff_weight is not None:
+            start_weight = takeoff_weight - burned_before
+        else:
+            trip = burn.sum()
+            reserves = trip * contingency_pct / 100.0 + fuel_flow[-1] * final_reserve_min / 60.0
+            start_weight = zero_fuel_weight + reserves + trip - burned_before
+
+        fuel_flow, tas = table.lookup(start_weight - burn / 2.0, levels, machs, isa)
+        ground_speed = np.maximum(tas + wind, MIN_GROUND_SPEED_KT)
+        time_h = leg_nm / ground_speed
+        burn = fuel_flow * time_h
+
+    return {
+        'distance_nm': leg_nm,
+        'flight_level': levels,
+        'tas_kt': tas,
+        'ground_speed_kt': ground_speed,
+        'time_min': time_h * 60.0,
+        'fuel_flow_kg_h': fuel_flow,
+        'fuel_kg': burn,
+        'start_weight_kg': start_weight,
+    }
+
+
+def calculate_route_fuel(coordinates=None, leg_nm=None, aircraft_type='GENERIC',
+                         takeoff_weight=None, zero_fuel_weight=None,
+                         flight_level=DEFAULT_FLIGHT_LEVEL, mach=DEFAULT_MACH, wind_kt=0.0,
+                         contingency_pct=DEFAULT_CONTINGENCY_PCT,
+                         final_reserve_min=DEFAULT_FINAL_RESERVE_MIN, isa_deviation=0.0,
+                         table=None):
+    """
+    Trip, reserve and block fuel for a route
+
+    Give either takeoff_weight, or zero_fuel_weight (the takeoff weight is
+    then whatever carries the trip and reserve fuel it burns).
+    """
+    if leg_nm is None:
+        leg_nm = leg_distances_nm(coordinates)
+    leg_nm = np.asarray(leg_nm, dtype=float)
+    if not len(leg_nm):
+        raise ValueError('Route needs at least one leg')
+    if takeoff_weight is None and zero_fuel_weight is None:
+        raise ValueError('takeoff_weight or zero_fuel_weight is required')
+
+    table = table or get_performance_table(aircraft_type)
+    legs = integrate_legs(
+        table, leg_nm,
+        takeoff_weight=float(takeoff_weight) if takeoff_weight is not None else None,
+        flight_level=flight_level, mach=mach, wind_kt=wind_kt,
+        zero_fuel_weight=float(zero_fuel_weight) if zero_fuel_weight is not None else None,
+        contingency_pct=contingency_pct, final_reserve_min=final_reserve_min,
+        isa_deviation=isa_deviation
+    )
+
+    trip_fuel = float(legs['fuel_kg'].sum())
+    contingency = trip_fuel * contingency_pct / 100.0
+    final_reserve = float(legs['fuel_flow_kg_h'][-1]) * final_reserve_min / 60.0
+    takeoff_weight = float(legs['start_weight_kg'][0])
+    total_time = float(legs['time_min'].sum())
+
+    return {
+        'aircraft_type': table.aircraft_type,
+        'leg_count': int(len(leg_nm)),
+        'total_distance_nm': round(float(leg_nm.sum()), 1),
+        'flight_time_min': round(total_time, 1),
+        'flight_time': f"{int(total_time // 60):02d}:{int(total_time % 60):02d}",
+        'takeoff_weight_kg': round(takeoff_weight, 0),
+        'landing_weight_kg': round(takeoff_weight - trip_fuel, 0),
+        'trip_fuel_kg': round(trip_fuel, 1),
+        'contingency_fuel_kg': round(contingency, 1),
+        'final_reserve_fuel_kg': round(final_reserve, 1),
+        'block_fuel_kg': round(trip_fuel + contingency + final_reserve, 1),
+        'legs': legs,
+    }
+
+
+def weight_profile(table, flight_level, mach, isa_deviation=0.0):
+    """
+    Fuel flow and TAS at the table's weight knots for a fixed level, Mach
+    and ISA deviation. The grid is linear in weight between knots, so
+    np.interp over this profile reproduces table.lookup exactly.
+    """
+    weights = table.axes['weight']
+    fuel_flow, tas = table.lookup(weights, flight_level, mach, isa_deviation)
+    return weights, fuel_flow, tas
+
+
+def fuel_matrix(leg_nm, route_starts, tables, zero_fuel_weights,
+                flight_levels=DEFAULT_FLIGHT_LEVEL, machs=DEFAULT_MACH,
+                wind_kt=0.0, isa_deviation=0.0,
+                contingency_pct=DEFAULT_CONTINGENCY_PCT,
+                final_reserve_min=DEFAULT_FINAL_RESERVE_MIN):
+    """
+    Fuel for every (aircraft type, route) pair in one set of array passes
+
+    leg_nm holds the legs of all routes back to back and route_starts the
+    index of each route's first leg (every route needs at least one leg).
+    tables, zero_fuel_weights, flight_levels and machs describe the types;
+    weights are anchored at landing as in integrate_legs. Each type's table
+    is reduced to a weight profile and all profiles are stacked on one
+    axis, so a pass is a single np.interp over types x legs.
+
+    Returns (types, routes) arrays as a dict.
+    """
+    leg_nm = np.asarray(leg_nm, dtype=float)
+    starts = np.asarray(route_starts, dtype=np.int64)
+    if not len(starts) or not len(tables):
+        empty = np.zeros((len(tables), len(starts)))
+        return {key: empty for key in (
+            'distance_nm', 'flight_time_min', 'trip_fuel_kg', 'contingency_fuel_kg',
+            'final_reserve_fuel_kg', 'block_fuel_kg', 'takeoff_weight_kg', 'landing_weight_kg')}
+
+    type_count = len(tables)
+    zfw = np.broadcast_to(np.asarray(zero_fuel_weights, dtype=float), (type_count,))
+    levels = np.broadcast_to(np.asarray(flight_levels, dtype=float), (type_count,))
+    speeds = np.broadcast_to(np.asarray(machs, dtype=float), (type_count,))
+
+    # Type t occupies [t, t + 0.5] on the stacked axis
+    xp, ff_knots, tas_knots, lower, upper = [], [], [], [], []
+    for t, table in enumerate(tables):
+        weights, fuel_flow, tas = weight_profile(table, levels[t], speeds[t], isa_deviation)
+        lower.append(weights[0])
+        upper.append(weights[-1])
+        xp.append(t + (weights - weights[0]) / max(weights[-1] - weights[0], 1.0) * 0.5)
+        ff_knots.append(fuel_flow)
+        tas_knots.append(tas)
+    xp = np.concatenate(xp)
+    ff_knots = np.concatenate(ff_knots)
+    tas_knots = np.concatenate(tas_knots)
+    lower = np.asarray(lower)[:, None]
+    upper = np.asarray(upper)[:, None]
+    offset = np.arange(type_count, dtype=float)[:, None]
+    scale = 0.5 / np.maximum(upper - lower, 1.0)
+
+    leg_count = len(leg_nm)
+    ends = np.append(starts[1:], leg_count)
+    last = ends - 1
+    counts = ends - starts
+
+    burn = np.zeros((type_count, leg_count))
+    fuel_flow = np.zeros((type_count, leg_count))
+    for _ in range(FIXED_POINT_PASSES + 1):
+        cumulative = np.cumsum(burn, axis=1)
+        trip = np.add.reduceat(burn, starts, axis=1)
+        reserves = trip * contingency_pct / 100.0 + fuel_flow[:, last] * final_reserve_min / 60.0
+        # Landing weight + trip, less what earlier routes in the batch burned
+        anchor = zfw[:, None] + reserves + trip + cumulative[:, starts] - burn[:, starts]
+        start_weight = np.repeat(anchor, counts, axis=1) - cumulative + burn
+
+        x = offset + (np.clip(start_weight - burn / 2.0, lower, upper) - lower) * scale
+        fuel_flow = np.interp(x, xp, ff_knots)
+        ground_speed = np.maximum(np.interp(x, xp, tas_knots) + wind_kt, MIN_GROUND_SPEED_KT)
+        time_h = leg_nm / ground_speed
+        burn = fuel_flow * time_h
+
+    trip = np.add.reduceat(burn, starts, axis=1)
+    contingency = trip * contingency_pct / 100.0
+    final_reserve = fuel_flow[:, last] * final_reserve_min / 60.0
+    takeoff_weight = zfw[:, None] + contingency + final_reserve + trip
+
+    return {
+        'distance_nm': np.broadcast_to(np.add.reduceat(leg_nm, starts), trip.shape),
+        'flight_time_min': np.add.reduceat(time_h, starts, axis=1) * 60.0,
+        'trip_fuel_kg': trip,
+        'contingency_fuel_kg': contingency,
+        'final_reserve_fuel_kg': final_reserve,
+        'block_fuel_kg': trip + contingency + final_reserve,
+        'takeoff_weight_kg': takeoff_weight,
+        'landing_weight_kg': takeoff_weight - trip,
+    }
+
+
+def legs_to_list(legs, decimals=1):
+    """Per-leg arrays -> list of dicts for JSON responses"""
+    keys = list(legs)
+    columns = [np.round(np.asarray(legs[k], dtype=float), decimals).tolist() for k in keys]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
@@ -0,0 +1,77 @@
+"""
+Vectorized geodesy helpers (NumPy) shared by the routing engines
+"""
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def haversine_nm(lon1, lat1, lon2, lat2):
+    """
+    Great-circle distance in nautical miles, element-wise over arrays
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=float)) for v in (lon1, lat1, lon2, lat2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def leg_distances_nm(coordinates):
+    """
+    Distance of each leg of a [lon, lat] polyline
+    """
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    if len(coords) < 2:
+        return np.zeros(0)
+    return haversine_nm(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+
+def cumulative_distance_nm(coordinates):
+    """
+    Along-track distance at every vertex (first vertex is 0)
+    """
+    legs = leg_distances_nm(coordinates)
+    return np.concatenate(([0.0], np.cumsum(legs)))
+
+
+def initial_bearing_deg(lon1, lat1, lon2, lat2):
+    """
+    True course at the start of each great-circle leg (0-360)
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=float)) for v in (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def intermediate_points(lon1, lat1, lon2, lat2, fractions):
+    """
+    Points at the given fractions (0..1) along the great circle between two points
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(float(v)) for v in (lon1, lat1, lon2, lat2))
+    f = np.asarray(fractions, dtype=float)
+    a = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    b = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    angle = np.arccos(np.clip(a @ b, -1.0, 1.0))
+    if angle < 1e-12:
+        return np.full(f.shape, np.degrees(lon1)), np.full(f.shape, np.degrees(lat1))
+    wa = np.sin((1 - f) * angle) / np.sin(angle)
+    wb = np.sin(f * angle) / np.sin(angle)
+    x, y, z = (wa[..., None] * a + wb[..., None] * b).T
+    return np.degrees(np.arctan2(y, x)), np.degrees(np.arctan2(z, np.hypot(x, y)))
+
+
+def destination_point(lon, lat, bearing_deg, distance_nm):
+    """
+    Point reached from (lon, lat) on an initial bearing after distance_nm, element-wise
+    """
+    lon, lat, bearing = (np.radians(np.asarray(v, dtype=float)) for v in (lon, lat, bearing_deg))
+    delta = np.asarray(distance_nm, dtype=float) / EARTH_RADIUS_NM
+    lat2 = np.arcsin(np.sin(lat) * np.cos(delta) + np.cos(lat) * np.sin(delta) * np.cos(bearing))
+    lon2 = lon + np.arctan2(
+        np.sin(bearing) * np.sin(delta) * np.cos(lat),
+        np.cos(delta) - np.sin(lat) * np.sin(lat2)
+    )
+    return (np.degrees(lon2) + 540.0) % 360.0 - 180.0, np.degrees(lat2)
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from routes.fir_index import FIRIndex
+from routes.fir import fir_dataset_version
+from routes.fir_cells import (
+    DEFAULT_LEVEL, BOUNDARY, build_cell_grid, save_cell_index, index_directory, cell_size_deg
+)
+
+
+class Command(BaseCommand):
+    help = 'Build the hierarchical FIR cell index (run after import_firs)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--level',
+            type=int,
+            default=DEFAULT_LEVEL,
+            help='Finest quadtree level (cell size = 180 / 2^level degrees)'
+        )
+        parser.add_argument('--output-dir', type=str, help='Directory for the index files')
+    
+    def handle(self, *args, **options):
+        level = options['level']
+        directory = options['output_dir'] or index_directory()
+        started = time.perf_counter()
+        
+        version = fir_dataset_version()
+        fir_index = FIRIndex.load(version)
+        self.stdout.write(f'📂 Loaded {len(fir_index)} FIRs (version {version})')
+        
+        grid, tested = build_cell_grid(fir_index, level)
+        for current, count in tested.items():
+            self.stdout.write(f'  📊 Level {current}: {count} cells tested')
+        
+        save_cell_index(directory, grid, level, version, fir_index.identifiers)
+        
+        boundary_share = float((grid == BOUNDARY).mean()) * 100
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Cell index saved to {directory}: {grid.shape[1]}x{grid.shape[0]} cells '
+            f'of {cell_size_deg(level):.3f}°, {boundary_share:.2f}% boundary, '
+            f'{time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,58 @@
+import csv
+import sys
+from django.core.management.base import BaseCommand
+from routes.models import Route
+from routes.fir_index import get_fir_index, DEFAULT_GROUND_SPEED_KT
+
+
+class Command(BaseCommand):
+    help = 'Export ordered FIR traversal (entry/exit, distance, time) for stored routes as CSV'
+    
+    FIELDS = [
+        'route_id', 'route_name', 'sequence', 'fir', 'fir_name',
+        'entry_lon', 'entry_lat', 'exit_lon', 'exit_lat',
+        'entry_distance_nm', 'exit_distance_nm', 'distance_nm',
+        'entry_time_min', 'time_min',
+    ]
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help='CSV file path (default: stdout)')
+        parser.add_argument(
+            '--ground-speed',
+            type=float,
+            default=DEFAULT_GROUND_SPEED_KT,
+            help='Ground speed (kt) used for elapsed times'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--include-deleted', action='store_true')
+    
+    def handle(self, *args, **options):
+        index = get_fir_index()
+        routes = Route.objects.exclude(coordinates=None).only('id', 'name', 'coordinates').order_by('id')
+        if not options['include_deleted']:
+            routes = routes.filter(is_active=True)
+        
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        writer = csv.writer(out)
+        writer.writerow(self.FIELDS)
+        
+        route_count = 0
+        row_count = 0
+        try:
+            for route in routes.iterator(chunk_size=options['batch_size']):
+                for item in index.traverse(list(route.coordinates.coords), options['ground_speed']):
+                    writer.writerow([
+                        route.id, route.name, item['sequence'], item['identifier'], item['name'],
+                        *item['entry_point'], *item['exit_point'],
+                        item['entry_distance_nm'], item['exit_distance_nm'], item['distance_nm'],
+                        item['entry_time_min'], item['time_min'],
+                    ])
+                    row_count += 1
+                route_count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        
+        self.stderr.write(
+            self.style.SUCCESS(f'{row_count} FIR penetrations for {route_count} routes (FIR version {index.version})')
+        )
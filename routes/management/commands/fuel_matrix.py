@@ -0,0 +1,67 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from routes.fleet import (
+    load_fleet, matrix_routes, iter_fuel_matrix, matrix_csv_lines, matrix_ndjson_lines,
+    DEFAULT_BATCH_SIZE
+)
+from routes.fuel import DEFAULT_FLIGHT_LEVEL, DEFAULT_CONTINGENCY_PCT, DEFAULT_FINAL_RESERVE_MIN
+
+
+class Command(BaseCommand):
+    help = 'Compute the fleet x route fuel matrix for stored routes (CSV or NDJSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', type=str, help='Comma-separated ICAO type codes (default: all with performance data)')
+        parser.add_argument('--routes', type=str, help='Comma-separated route IDs (default: all active routes)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--output', type=str, help='Output file path (default: stdout)')
+        parser.add_argument('--payload', type=float, help='Payload (kg); default loads each type to MZFW')
+        parser.add_argument('--flight-level', type=float, default=DEFAULT_FLIGHT_LEVEL)
+        parser.add_argument('--mach', type=float, help='Cruise Mach (default: per type)')
+        parser.add_argument('--wind', type=float, default=0.0, help='Mean tailwind component (kt)')
+        parser.add_argument('--isa', type=float, default=0.0, help='ISA deviation (deg C)')
+        parser.add_argument('--contingency', type=float, default=DEFAULT_CONTINGENCY_PCT)
+        parser.add_argument('--final-reserve', type=float, default=DEFAULT_FINAL_RESERVE_MIN)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--include-deleted', action='store_true')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        codes = options['types'].split(',') if options['types'] else None
+        route_ids = [int(i) for i in options['routes'].split(',')] if options['routes'] else None
+
+        fleet, skipped = load_fleet(
+            codes=codes,
+            payload_kg=options['payload'],
+            flight_level=options['flight_level'],
+            mach=options['mach']
+        )
+        if skipped:
+            self.stderr.write(f'⚠️ Skipped (no performance data): {", ".join(skipped)}')
+        if not fleet:
+            raise CommandError('No aircraft types with performance data')
+
+        rows = iter_fuel_matrix(
+            matrix_routes(route_ids, options['include_deleted']), fleet,
+            wind_kt=options['wind'], isa_deviation=options['isa'],
+            contingency_pct=options['contingency'], final_reserve_min=options['final_reserve'],
+            batch_size=options['batch_size']
+        )
+        lines = matrix_csv_lines(rows) if options['format'] == 'csv' else matrix_ndjson_lines(rows)
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        count = 0
+        try:
+            for line in lines:
+                out.write(line)
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if options['format'] == 'csv':
+            count -= 1  # header
+        self.stderr.write(self.style.SUCCESS(
+            f'✅ {count} route/type pairs for {len(fleet)} aircraft types in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,55 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from routes.route_import import import_routes, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Bulk import route strings from a text (one route per line) or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Input file, or - for stdin')
+        parser.add_argument('--format', choices=['text', 'ndjson'], help='Input format (default: detect)')
+        parser.add_argument('--user', type=str, help='Username recorded as creator (default: first user)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--strict', action='store_true', help='Reject routes with unknown points or airways')
+        parser.add_argument('--dry-run', action='store_true', help='Compile and check only, insert nothing')
+        parser.add_argument('--report', type=str, help='Write the per-row error report (JSON) to this file')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'User {options["user"]} does not exist')
+        else:
+            user = User.objects.order_by('id').first()
+            if user is None:
+                raise CommandError('No users exist; create one or pass --user')
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            report = import_routes(
+                source, user, fmt=options['format'], batch_size=options['batch_size'],
+                strict=options['strict'], dry_run=options['dry_run']
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f'  line {error["line"]}: {error["error"]}')
+        if report['failed'] > 20:
+            self.stderr.write(f'  ... and {report["failed"] - 20} more')
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(f'Report written to {options["report"]}')
+
+        verb = 'checked' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["imported"]}/{report["total"]} routes {verb}, {report["failed"]} failed '
+            f'({report["routes_per_second"]} routes/s)'
+        ))
@@ -0,0 +1,63 @@
+import csv
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from routes.weather import (
+    grid_from_rows, grid_from_dataset, wind_directory, activate_cycle, WindGrid
+)
+
+
+class Command(BaseCommand):
+    help = 'Ingest a gridded upper-air wind/temperature forecast from a local CSV or NetCDF file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=str,
+            help='CSV (valid_time, pressure_hpa, lat, lon, u, v, temperature_k) or NetCDF file'
+        )
+        parser.add_argument('--cycle', type=str, help='Forecast cycle name (default: first valid time)')
+        parser.add_argument('--wind-units', choices=['ms', 'kt'], default='ms')
+        parser.add_argument('--u-var', type=str, default='u', help='NetCDF eastward wind variable')
+        parser.add_argument('--v-var', type=str, default='v', help='NetCDF northward wind variable')
+        parser.add_argument('--t-var', type=str, default='t', help='NetCDF temperature variable')
+        parser.add_argument('--no-activate', action='store_true', help='Save the cycle without making it current')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        started = time.perf_counter()
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        cycle = options['cycle'] or 'pending'
+        try:
+            if path.lower().endswith('.csv'):
+                with open(path, newline='', encoding='utf-8') as f:
+                    grid = grid_from_rows(cycle, csv.DictReader(f), options['wind_units'])
+            else:
+                grid = grid_from_dataset(
+                    cycle, path, u=options['u_var'], v=options['v_var'],
+                    temperature=options['t_var'], wind_units=options['wind_units']
+                )
+        except ImportError as e:
+            raise CommandError(str(e))
+        except (KeyError, ValueError) as e:
+            raise CommandError(f'Invalid forecast data: {e}')
+
+        if not options['cycle']:
+            grid.cycle = time.strftime('%Y%m%d%H', time.gmtime(grid.times[0]))
+
+        directory = os.path.join(wind_directory(), grid.cycle)
+        grid.save(directory)
+        WindGrid.open(directory)
+        self.stdout.write(
+            f'📊 {len(grid.times)} times x {len(grid.flight_levels)} levels x '
+            f'{len(grid.lats)} lats x {len(grid.lons)} lons saved to {directory}'
+        )
+
+        if not options['no_activate']:
+            activate_cycle(grid.cycle)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Cycle {grid.cycle} ingested in {time.perf_counter() - started:.1f}s'
+            + ('' if options['no_activate'] else ' and activated')
+        ))
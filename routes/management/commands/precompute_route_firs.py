@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from routes.models import Route
+from routes.fir import firs_for_routes, fir_dataset_version, prune_fir_cache
+
+
+class Command(BaseCommand):
+    help = 'Precompute FIR intersections for stored routes (reused by detail views and reports)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of routes resolved per cache lookup'
+        )
+        parser.add_argument(
+            '--include-deleted',
+            action='store_true',
+            help='Also precompute soft-deleted routes'
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete cache rows computed against older FIR datasets'
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        routes = Route.objects.exclude(coordinates=None).only('id', 'coordinates')
+        if not options['include_deleted']:
+            routes = routes.filter(is_active=True)
+        
+        self.stdout.write(f'FIR dataset version: {fir_dataset_version()}')
+        
+        processed = 0
+        batch = []
+        for route in routes.iterator(chunk_size=batch_size):
+            batch.append(list(route.coordinates.coords))
+            if len(batch) >= batch_size:
+                firs_for_routes(batch)
+                processed += len(batch)
+                batch = []
+                self.stdout.write(f'  {processed} routes processed...')
+        
+        if batch:
+            firs_for_routes(batch)
+            processed += len(batch)
+        
+        if options['prune']:
+            deleted = prune_fir_cache()
+            self.stdout.write(self.style.WARNING(f'Pruned {deleted} stale cache rows'))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'FIR intersections ready for {processed} routes')
+        )
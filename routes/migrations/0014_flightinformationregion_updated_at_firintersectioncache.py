@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0013_route_is_active_route_routes_is_acti_9ece4b_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightinformationregion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated At'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='FIRIntersectionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometry_hash', models.CharField(max_length=40, verbose_name='Geometry Hash')),
+                ('fir_version', models.CharField(max_length=40, verbose_name='FIR Dataset Version')),
+                ('firs', models.JSONField(default=list, verbose_name='FIRs')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Computed At')),
+            ],
+            options={
+                'verbose_name': 'FIR Intersection Cache',
+                'verbose_name_plural': 'FIR Intersection Cache',
+                'db_table': 'fir_intersection_cache',
+                'constraints': [models.UniqueConstraint(fields=('geometry_hash', 'fir_version'), name='unique_fir_intersection')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:02
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0014_flightinformationregion_updated_at_firintersectioncache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestrictedArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=20, unique=True, verbose_name='Identifier')),
+                ('name', models.CharField(blank=True, max_length=200, verbose_name='Name')),
+                ('type', models.CharField(choices=[('P', 'Prohibited'), ('R', 'Restricted'), ('D', 'Danger'), ('TRA', 'Temporary Reserved Area'), ('TSA', 'Temporary Segregated Area'), ('MOA', 'Military Operations Area')], default='R', max_length=3, verbose_name='Type')),
+                ('country', models.CharField(blank=True, max_length=100, verbose_name='Country')),
+                ('boundary', django.contrib.gis.db.models.fields.GeometryField(srid=4326, verbose_name='Boundary')),
+                ('lower_limit_fl', models.IntegerField(default=0, verbose_name='Lower Limit (FL)')),
+                ('upper_limit_fl', models.IntegerField(default=999, verbose_name='Upper Limit (FL)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Restricted Area',
+                'verbose_name_plural': 'Restricted Areas',
+                'db_table': 'restricted_areas',
+                'ordering': ['identifier'],
+                'indexes': [models.Index(fields=['type'], name='restricted__type_ebf112_idx'), models.Index(fields=['is_active'], name='restricted__is_acti_352e2d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestrictedAreaActivation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField(verbose_name='Starts At')),
+                ('ends_at', models.DateTimeField(verbose_name='Ends At')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activations', to='routes.restrictedarea')),
+            ],
+            options={
+                'verbose_name': 'Restricted Area Activation',
+                'verbose_name_plural': 'Restricted Area Activations',
+                'db_table': 'restricted_area_activations',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['starts_at', 'ends_at'], name='restricted__starts__8728f3_idx')],
+            },
+        ),
+    ]
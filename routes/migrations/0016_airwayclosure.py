@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0015_restrictedarea_restrictedareaactivation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirwayClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField(verbose_name='Starts At')),
+                ('ends_at', models.DateTimeField(verbose_name='Ends At')),
+                ('lower_limit_fl', models.IntegerField(default=0, verbose_name='Lower Limit (FL)')),
+                ('upper_limit_fl', models.IntegerField(default=999, verbose_name='Upper Limit (FL)')),
+                ('notam', models.CharField(blank=True, max_length=20, verbose_name='NOTAM Reference')),
+                ('reason', models.TextField(blank=True, verbose_name='Reason')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('airway', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='routes.airway', verbose_name='Airway')),
+                ('segment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='routes.airwaysegment', verbose_name='Segment')),
+            ],
+            options={
+                'verbose_name': 'Airway Closure',
+                'verbose_name_plural': 'Airway Closures',
+                'db_table': 'airway_closures',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['ends_at'], name='airway_clos_ends_at_7fae97_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('airway__isnull', False), ('segment__isnull', False), _connector='OR'), name='airway_closure_target')],
+            },
+        ),
+    ]
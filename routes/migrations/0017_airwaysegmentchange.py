@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0016_airwayclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirwaySegmentChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment_id', models.BigIntegerField(verbose_name='Segment ID')),
+                ('action', models.CharField(choices=[('I', 'Insert'), ('U', 'Update'), ('D', 'Delete')], max_length=1, verbose_name='Action')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Changed At')),
+            ],
+            options={
+                'verbose_name': 'Airway Segment Change',
+                'verbose_name_plural': 'Airway Segment Changes',
+                'db_table': 'airway_segment_changes',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0017_airwaysegmentchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airwaysegment',
+            name='direction',
+            field=models.CharField(choices=[('B', 'Both directions'), ('F', 'Forward only (from → to)')], default='B', max_length=1, verbose_name='Direction'),
+        ),
+    ]
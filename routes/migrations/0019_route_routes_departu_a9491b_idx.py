@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models.functions import Trim, Upper
+
+
+def normalise_route_codes(apps, schema_editor):
+    """
+    Store departure/arrival upper-case and trimmed
+
+    Active routes that become identical under unique_route_combination
+    (e.g. "oiii" and "OIII" with the same name and version) are resolved
+    first: the row already stored upper-case, otherwise the most recently
+    updated one, stays active and the others are deactivated.
+    """
+    Route = apps.get_model('routes', 'Route')
+    routes = Route.objects.using(schema_editor.connection.alias)
+
+    def normalise(code):
+        return (code or '').strip().upper()
+
+    rows = list(routes.order_by('-updated_at', '-id').values_list(
+        'id', 'departure', 'arrival', 'name', 'version', 'is_active'
+    ))
+    changed = [pk for pk, departure, arrival, *_ in rows
+               if departure != normalise(departure) or arrival != normalise(arrival)]
+    if not changed:
+        return
+
+    kept, duplicates = set(), []
+    active = [row for row in rows if row[5]]
+    active.sort(key=lambda row: row[1] != normalise(row[1]) or row[2] != normalise(row[2]))  # stable
+    for pk, departure, arrival, name, version, _ in active:
+        key = (normalise(departure), normalise(arrival), name, version)
+        if key in kept:
+            duplicates.append(pk)
+        else:
+            kept.add(key)
+
+    for start in range(0, len(duplicates), 1000):
+        routes.filter(id__in=duplicates[start:start + 1000]).update(is_active=False)
+    for start in range(0, len(changed), 1000):
+        routes.filter(id__in=changed[start:start + 1000]).update(
+            departure=Upper(Trim('departure')), arrival=Upper(Trim('arrival'))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0018_airwaysegment_direction'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalise_route_codes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['departure', 'arrival'], name='routes_departu_a9491b_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:05
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0019_route_routes_departu_a9491b_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='route',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='routes_name_5fcd87_gin', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0020_trigram_extension_route_name_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waypoint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At'),
+        ),
+    ]
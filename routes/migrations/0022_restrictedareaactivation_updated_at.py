@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0021_waypoint_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restrictedareaactivation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated At'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.gis.geos import LineString
@@ -49,6 +50,7 @@ class Waypoint(models.Model):
         verbose_name='Source'
     )
     is_active = models.BooleanField(default=True, verbose_name='Active')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At')
     
     class Meta:
         db_table = 'waypoints'
@@ -113,12 +115,18 @@ class AirwaySegment(models.Model):
     """
     Segment of an airway connecting two waypoints
     """
+    DIRECTIONS = [
+        ('B', 'Both directions'),
+        ('F', 'Forward only (from → to)'),
+    ]
+    
     airway = models.ForeignKey(Airway, on_delete=models.CASCADE, related_name='segments')
     from_waypoint = models.ForeignKey(Waypoint, related_name='segment_starts', on_delete=models.CASCADE)
     to_waypoint = models.ForeignKey(Waypoint, related_name='segment_ends', on_delete=models.CASCADE)
     sequence = models.IntegerField()
     distance = models.FloatField(verbose_name='Distance (NM)')
     base_altitude = models.IntegerField(default=19000, verbose_name='Base Altitude (ft)')
+    direction = models.CharField(max_length=1, choices=DIRECTIONS, default='B', verbose_name='Direction')
     
     class Meta:
         db_table = 'airway_segments'
@@ -185,6 +193,8 @@ class Route(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['version']),
             models.Index(fields=['is_active']),  # Added for soft delete filtering
+            models.Index(fields=['departure', 'arrival']),  # City-pair search (codes stored upper-case)
+            GinIndex(fields=['name'], name='routes_name_5fcd87_gin', opclasses=['gin_trgm_ops']),  # Suggestions fallback
         ]
         ordering = ['-created_at']
         constraints = [
@@ -262,6 +272,10 @@ class Route(models.Model):
     
     def save(self, *args, **kwargs):
         """Override save to auto-calculate fields"""
+        # Codes are stored upper-case so searches can use plain indexed lookups
+        self.departure = (self.departure or '').strip().upper()
+        self.arrival = (self.arrival or '').strip().upper()
+        
         # Set default name if not provided
         if not self.name:
             self.name = f"{self.departure}-{self.arrival}"
@@ -363,6 +377,7 @@ class FlightInformationRegion(models.Model):
     
     is_active = models.BooleanField(default=True, verbose_name='Active')
     notes = models.TextField(blank=True, verbose_name='Notes')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     class Meta:
         db_table = 'fir_regions'
@@ -398,3 +413,171 @@ class FlightInformationRegion(models.Model):
             if code == self.icao_region:
                 return name
         return self.icao_region
+
+class FIRIntersectionCache(models.Model):
+    """
+    FIRs crossed by a route geometry, precomputed per FIR dataset version
+    """
+    geometry_hash = models.CharField(max_length=40, verbose_name='Geometry Hash')
+    fir_version = models.CharField(max_length=40, verbose_name='FIR Dataset Version')
+    firs = models.JSONField(default=list, verbose_name='FIRs')
+    computed_at = models.DateTimeField(auto_now=True, verbose_name='Computed At')
+    
+    class Meta:
+        db_table = 'fir_intersection_cache'
+        verbose_name = 'FIR Intersection Cache'
+        verbose_name_plural = 'FIR Intersection Cache'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['geometry_hash', 'fir_version'],
+                name='unique_fir_intersection'
+            )
+        ]
+    
+    def __str__(self):
+        return f"{self.geometry_hash[:10]}@{self.fir_version}: {len(self.firs)} FIRs"
+
+class RestrictedArea(models.Model):
+    """
+    Restricted, prohibited or danger area (or temporary segregated airspace)
+    
+    An area with no activation windows is active whenever is_active is set;
+    otherwise it is only active inside one of its windows.
+    """
+    TYPES = [
+        ('P', 'Prohibited'),
+        ('R', 'Restricted'),
+        ('D', 'Danger'),
+        ('TRA', 'Temporary Reserved Area'),
+        ('TSA', 'Temporary Segregated Area'),
+        ('MOA', 'Military Operations Area'),
+    ]
+    
+    identifier = models.CharField(max_length=20, unique=True, verbose_name='Identifier')
+    name = models.CharField(max_length=200, verbose_name='Name', blank=True)
+    type = models.CharField(max_length=3, choices=TYPES, default='R', verbose_name='Type')
+    country = models.CharField(max_length=100, verbose_name='Country', blank=True)
+    
+    boundary = models.GeometryField(srid=4326, verbose_name='Boundary')
+    
+    lower_limit_fl = models.IntegerField(default=0, verbose_name='Lower Limit (FL)')
+    upper_limit_fl = models.IntegerField(default=999, verbose_name='Upper Limit (FL)')
+    
+    is_active = models.BooleanField(default=True, verbose_name='Active')
+    notes = models.TextField(blank=True, verbose_name='Notes')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        db_table = 'restricted_areas'
+        verbose_name = 'Restricted Area'
+        verbose_name_plural = 'Restricted Areas'
+        ordering = ['identifier']
+        indexes = [
+            models.Index(fields=['type']),
+            models.Index(fields=['is_active']),
+        ]
+    
+    def __str__(self):
+        return f"{self.identifier} ({self.get_type_display()})"
+    
+    def get_type_display(self):
+        """Get human-readable type name"""
+        for code, name in self.TYPES:
+            if code == self.type:
+                return name
+        return self.type
+    
+    def covers_level(self, flight_level):
+        """True if the flight level lies within the vertical limits"""
+        return self.lower_limit_fl <= flight_level <= self.upper_limit_fl
+
+
+class RestrictedAreaActivation(models.Model):
+    """
+    Activation time window of a restricted area (UTC)
+    """
+    area = models.ForeignKey(RestrictedArea, on_delete=models.CASCADE, related_name='activations')
+    starts_at = models.DateTimeField(verbose_name='Starts At')
+    ends_at = models.DateTimeField(verbose_name='Ends At')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        db_table = 'restricted_area_activations'
+        verbose_name = 'Restricted Area Activation'
+        verbose_name_plural = 'Restricted Area Activations'
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['starts_at', 'ends_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.area.identifier}: {self.starts_at:%Y-%m-%d %H:%M} - {self.ends_at:%Y-%m-%d %H:%M}"
+
+
+class AirwayClosure(models.Model):
+    """
+    Temporary closure of a whole airway or a single segment (NOTAM)
+    
+    The closure applies between starts_at and ends_at (UTC) to the flight
+    levels within its vertical limits.
+    """
+    airway = models.ForeignKey(
+        Airway, on_delete=models.CASCADE, related_name='closures',
+        null=True, blank=True, verbose_name='Airway'
+    )
+    segment = models.ForeignKey(
+        AirwaySegment, on_delete=models.CASCADE, related_name='closures',
+        null=True, blank=True, verbose_name='Segment'
+    )
+    starts_at = models.DateTimeField(verbose_name='Starts At')
+    ends_at = models.DateTimeField(verbose_name='Ends At')
+    lower_limit_fl = models.IntegerField(default=0, verbose_name='Lower Limit (FL)')
+    upper_limit_fl = models.IntegerField(default=999, verbose_name='Upper Limit (FL)')
+    
+    notam = models.CharField(max_length=20, blank=True, verbose_name='NOTAM Reference')
+    reason = models.TextField(blank=True, verbose_name='Reason')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        db_table = 'airway_closures'
+        verbose_name = 'Airway Closure'
+        verbose_name_plural = 'Airway Closures'
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['ends_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(airway__isnull=False) | Q(segment__isnull=False),
+                name='airway_closure_target'
+            )
+        ]
+    
+    def __str__(self):
+        target = self.segment if self.segment_id else self.airway.identifier
+        return f"{target} closed {self.starts_at:%Y-%m-%d %H:%M} - {self.ends_at:%Y-%m-%d %H:%M}"
+
+
+class AirwaySegmentChange(models.Model):
+    """
+    Change log of airway segments, consumed by cached airway routers to
+    patch their graphs in place
+    """
+    ACTIONS = [
+        ('I', 'Insert'),
+        ('U', 'Update'),
+        ('D', 'Delete'),
+    ]
+    
+    segment_id = models.BigIntegerField(verbose_name='Segment ID')
+    action = models.CharField(max_length=1, choices=ACTIONS, verbose_name='Action')
+    changed_at = models.DateTimeField(auto_now_add=True, verbose_name='Changed At')
+    
+    class Meta:
+        db_table = 'airway_segment_changes'
+        verbose_name = 'Airway Segment Change'
+        verbose_name_plural = 'Airway Segment Changes'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"#{self.id} {self.action} segment {self.segment_id}"
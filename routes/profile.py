@@ -0,0 +1,230 @@
+"""
+Vertical profile optimizer
+
+Chooses a cruise level for every leg of a route, with step climbs, by
+dynamic programming over (leg, flight level) states. Cruise cost for all
+legs at all candidate levels comes from one performance table lookup; the
+initial climb, step climbs and final descent are modelled as penalties
+relative to cruising the same distance. Weights used for the cost matrix
+come from the previous solution (a couple of fixed-point passes).
+"""
+import numpy as np
+
+from aircraft.performance import get_performance_table
+from .fuel import DEFAULT_MACH, MIN_GROUND_SPEED_KT, calculate_route_fuel
+from .geo import leg_distances_nm, initial_bearing_deg
+
+CLIMB_RATE_FPM = 2000.0         # Average initial climb rate
+STEP_CLIMB_RATE_FPM = 1000.0    # Rate for en-route step climbs
+CLIMB_SPEED_RATIO = 0.75        # Mean climb TAS relative to cruise TAS
+CLIMB_FUEL_FACTOR = 1.8         # Climb fuel flow relative to cruise at the same weight
+DESCENT_NM_PER_1000FT = 3.0
+DESCENT_SPEED_RATIO = 0.8
+DESCENT_FUEL_FACTOR = 0.3
+PROFILE_PASSES = 2
+
+EASTBOUND_LEVELS = np.arange(290, 420, 20)  # RVSM odd levels, track 000-179
+WESTBOUND_LEVELS = np.arange(300, 420, 20)  # RVSM even levels, track 180-359
+
+
+def semicircular_levels(track_deg, max_level=None):
+    """RVSM cruise levels for a track (true track stands in for magnetic)"""
+    levels = EASTBOUND_LEVELS if track_deg % 360.0 < 180.0 else WESTBOUND_LEVELS
+    if max_level is not None:
+        levels = levels[levels <= max_level]
+    return levels.astype(float)
+
+
+def _share_of_legs(cum_start, leg_nm, start_nm, end_nm):
+    """Fraction of the stretch [start_nm, end_nm] that falls in each leg"""
+    length = end_nm - start_nm
+    if length <= 0:
+        return np.zeros_like(leg_nm)
+    overlap = np.minimum(cum_start + leg_nm, end_nm) - np.maximum(cum_start, start_nm)
+    return np.clip(overlap, 0.0, None) / length
+
+
+def _climb(levels, fuel_flow, tas, wind_kt):
+    """Distance, time and fuel of climbing from the ground to each level"""
+    time_min = levels * 100.0 / CLIMB_RATE_FPM
+    distance = np.maximum(tas * CLIMB_SPEED_RATIO + wind_kt, MIN_GROUND_SPEED_KT) * time_min / 60.0
+    fuel = fuel_flow * CLIMB_FUEL_FACTOR * time_min / 60.0
+    return distance, time_min, fuel
+
+
+def _descent(levels, fuel_flow, tas, wind_kt):
+    """Distance, time and fuel of descending from each level to the ground"""
+    distance = levels * 100.0 / 1000.0 * DESCENT_NM_PER_1000FT
+    time_min = distance / np.maximum(tas * DESCENT_SPEED_RATIO + wind_kt, MIN_GROUND_SPEED_KT) * 60.0
+    fuel = fuel_flow * DESCENT_FUEL_FACTOR * time_min / 60.0
+    return distance, time_min, fuel
+
+
+def optimize_profile(table, leg_nm, takeoff_weight, levels, mach=DEFAULT_MACH,
+                     wind_kt=0.0, isa_deviation=0.0, cost_index=0.0):
+    """
+    Optimal level per leg
+
+    levels: allowed cruise flight levels. The objective is
+    fuel + cost_index * time (kg and minutes), so cost_index=0 minimises
+    fuel. Step climbs only go up. Returns a dict of per-leg arrays plus
+    the chosen step climbs, or raises ValueError if the route is too short
+    to reach any of the levels.
+    """
+    leg_nm = np.asarray(leg_nm, dtype=float)
+    levels = np.unique(np.asarray(levels, dtype=float))
+    leg_count = len(leg_nm)
+    if not leg_count or not len(levels):
+        raise ValueError('Route needs at least one leg and one allowed level')
+
+    cum_start = np.concatenate(([0.0], np.cumsum(leg_nm)[:-1]))
+    total_nm = float(leg_nm.sum())
+    wind = np.broadcast_to(np.asarray(wind_kt, dtype=float), leg_nm.shape)
+    level_columns = np.arange(len(levels))
+
+    # Step climb durations between any two levels (minutes), upward only
+    step_min = np.maximum(levels[None, :] - levels[:, None], 0.0) * 100.0 / STEP_CLIMB_RATE_FPM
+    downward = levels[None, :] < levels[:, None]
+
+    burned = np.zeros(leg_count)
+    for _ in range(PROFILE_PASSES):
+        weight = takeoff_weight - (np.cumsum(burned) - burned) - burned / 2.0
+        fuel_flow, tas = table.lookup(weight[:, None], levels[None, :], mach, isa_deviation)
+        ground_speed = np.maximum(tas + wind[:, None], MIN_GROUND_SPEED_KT)
+        time_min = leg_nm[:, None] / ground_speed * 60.0
+        fuel = fuel_flow * time_min / 60.0
+        cost = fuel + cost_index * time_min
+
+        # Climb/descent penalties relative to cruising the same distance
+        climb_nm, climb_min, climb_fuel = _climb(levels, fuel_flow[0], tas[0], wind[0])
+        descent_nm, descent_min, descent_fuel = _descent(levels, fuel_flow[-1], tas[-1], wind[-1])
+        cruise_rate_fuel = fuel_flow / ground_speed  # kg per NM
+        cruise_rate_min = 60.0 / ground_speed
+        climb_penalty = (climb_fuel - cruise_rate_fuel[0] * climb_nm) \
+            + cost_index * (climb_min - cruise_rate_min[0] * climb_nm)
+        descent_penalty = (descent_fuel - cruise_rate_fuel[-1] * descent_nm) \
+            + cost_index * (descent_min - cruise_rate_min[-1] * descent_nm)
+
+        reachable = climb_nm + descent_nm <= total_nm
+        if not reachable.any():
+            raise ValueError('Route is too short to reach any allowed flight level')
+
+        # Forward pass: best[k] = cheapest cost of flying legs 0..i ending at level k
+        step_fuel = fuel_flow[:, None, :] * (CLIMB_FUEL_FACTOR - 1.0) * step_min[None, :, :] / 60.0
+        step_cost = step_fuel.copy()  # TAS barely changes, so steps cost fuel only
+        step_cost[:, downward] = np.inf
+        best = np.where(reachable, climb_penalty + cost[0], np.inf)
+        back = np.zeros((leg_count, len(levels)), dtype=np.int64)
+        for i in range(1, leg_count):
+            total = best[:, None] + step_cost[i]
+            back[i] = total.argmin(axis=0)
+            best = total[back[i], level_columns] + cost[i]
+        # The descent must also fit: the final level obeys the same mask as the first
+        best = np.where(reachable, best + descent_penalty, np.inf)
+
+        # Backtrack
+        choice = np.empty(leg_count, dtype=np.int64)
+        choice[-1] = int(best.argmin())
+        for i in range(leg_count - 1, 0, -1):
+            choice[i - 1] = back[i, choice[i]]
+
+        rows = np.arange(leg_count)
+        leg_fuel = fuel[rows, choice].copy()
+        leg_time = time_min[rows, choice].copy()
+
+        first, last = choice[0], choice[-1]
+        climb_share = _share_of_legs(cum_start, leg_nm, 0.0, climb_nm[first])
+        descent_share = _share_of_legs(cum_start, leg_nm, total_nm - descent_nm[last], total_nm)
+        leg_fuel += climb_share * (climb_fuel[first] - cruise_rate_fuel[0, first] * climb_nm[first])
+        leg_time += climb_share * (climb_min[first] - cruise_rate_min[0, first] * climb_nm[first])
+        leg_fuel += descent_share * (descent_fuel[last] - cruise_rate_fuel[-1, last] * descent_nm[last])
+        leg_time += descent_share * (descent_min[last] - cruise_rate_min[-1, last] * descent_nm[last])
+
+        steps = np.flatnonzero(choice[1:] != choice[:-1]) + 1
+        leg_fuel[steps] += step_fuel[steps, choice[steps - 1], choice[steps]]
+        burned = leg_fuel
+
+    phase = np.full(leg_count, 'cruise', dtype=object)
+    phase[descent_share > 0] = 'descent'
+    phase[climb_share > 0] = 'climb'
+
+    return {
+        'legs': {
+            'distance_nm': leg_nm,
+            'flight_level': levels[choice],
+            'time_min': leg_time,
+            'fuel_kg': leg_fuel,
+            'start_weight_kg': takeoff_weight - (np.cumsum(leg_fuel) - leg_fuel),
+        },
+        'phase': phase.tolist(),
+        'top_of_climb_nm': float(climb_nm[first]),
+        'top_of_descent_nm': float(total_nm - descent_nm[last]),
+        'step_climbs': [
+            {
+                'leg': int(i),
+                'distance_nm': round(float(cum_start[i]), 1),
+                'from_level': int(levels[choice[i - 1]]),
+                'to_level': int(levels[choice[i]]),
+            }
+            for i in steps
+        ],
+    }
+
+
+def calculate_route_profile(coordinates, aircraft_type='GENERIC', takeoff_weight=None,
+                            zero_fuel_weight=None, levels=None, max_level=None,
+                            mach=DEFAULT_MACH, wind_kt=0.0, isa_deviation=0.0,
+                            cost_index=0.0, table=None):
+    """
+    Optimised vertical profile with totals for a [lon, lat] route
+
+    Allowed levels default to the RVSM levels for the direction of flight
+    (departure to arrival), up to max_level or the table's highest level.
+    With zero_fuel_weight only, the takeoff weight is estimated with the
+    constant-level fuel engine first.
+    """
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    leg_nm = leg_distances_nm(coords)
+    if not len(leg_nm):
+        raise ValueError('Route needs at least one leg')
+    if takeoff_weight is None and zero_fuel_weight is None:
+        raise ValueError('takeoff_weight or zero_fuel_weight is required')
+
+    table = table or get_performance_table(aircraft_type)
+    if levels is None:
+        track = initial_bearing_deg(coords[0, 0], coords[0, 1], coords[-1, 0], coords[-1, 1])
+        levels = semicircular_levels(float(track), max_level or float(table.flight_levels.max()))
+
+    if takeoff_weight is None:
+        estimate = calculate_route_fuel(
+            leg_nm=leg_nm, zero_fuel_weight=zero_fuel_weight, flight_level=float(np.median(levels)),
+            mach=mach, wind_kt=wind_kt, isa_deviation=isa_deviation, table=table
+        )
+        takeoff_weight = estimate['takeoff_weight_kg']
+
+    profile = optimize_profile(
+        table, leg_nm, float(takeoff_weight), levels, mach=mach, wind_kt=wind_kt,
+        isa_deviation=isa_deviation, cost_index=cost_index
+    )
+    legs = profile['legs']
+    trip_fuel = float(legs['fuel_kg'].sum())
+    total_time = float(legs['time_min'].sum())
+
+    return {
+        'aircraft_type': table.aircraft_type,
+        'leg_count': int(len(leg_nm)),
+        'total_distance_nm': round(float(leg_nm.sum()), 1),
+        'flight_time_min': round(total_time, 1),
+        'flight_time': f"{int(total_time // 60):02d}:{int(total_time % 60):02d}",
+        'takeoff_weight_kg': round(float(takeoff_weight), 0),
+        'landing_weight_kg': round(float(takeoff_weight) - trip_fuel, 0),
+        'trip_fuel_kg': round(trip_fuel, 1),
+        'allowed_levels': [int(level) for level in levels],
+        'initial_level': int(legs['flight_level'][0]),
+        'final_level': int(legs['flight_level'][-1]),
+        'top_of_climb_nm': round(profile['top_of_climb_nm'], 1),
+        'top_of_descent_nm': round(profile['top_of_descent_nm'], 1),
+        'step_climbs': profile['step_climbs'],
+        'legs': legs,
+        'phase': profile['phase'],
+    }
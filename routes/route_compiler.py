@@ -0,0 +1,241 @@
+"""
+Route string compiler
+
+Compiles ICAO item-15 style route strings ("OIII DCT RAGAS UL124 DENDA
+G208 ORSU OMDB") into resolved points and legs. Airway tokens are expanded
+into their fixes with the airway index and airports come from the
+in-process airport dictionary; other identifiers are resolved for a whole
+batch of strings at once (one Waypoint query) and remembered by the
+compiler, so compiling many strings costs a dictionary lookup per token
+and one vectorized distance computation per batch.
+"""
+import re
+
+import numpy as np
+
+from .models import Waypoint
+from .airport_codes import get_airport_directory
+from .airway_index import get_airway_index, AirwayExpansionError
+from .geo import haversine_nm
+
+SKIP_TOKENS = {'DCT', 'IFR', 'VFR', 'OAT', 'GAT'}
+SPEED_LEVEL = re.compile(r'^(?:[NK]\d{4}|M\d{3})(?:[FA]\d{3}|[SM]\d{4}|VFR)$')
+COORDINATE = re.compile(r'^(\d{2})(\d{2})?([NS])(\d{3})(\d{2})?([EW])$')
+AIRWAY = re.compile(r'^[ABGRULMNZWTVJQHKY]{1,2}\d{1,4}[A-Z]?$')
+PROCEDURE = re.compile(r'^[A-Z]{2,5}\d[A-Z]$')  # SID/STAR designators, e.g. RAGA1A
+
+
+class RouteCompileError(ValueError):
+    """A route string cannot be compiled"""
+
+    def __init__(self, message, token=None):
+        super().__init__(message)
+        self.token = token
+
+
+def tokenize(route_text):
+    """
+    Upper-cased route tokens with DCT, flight rules and speed/level groups
+    removed ("RAGAS/N0450F350" gives "RAGAS")
+    """
+    tokens = []
+    for token in route_text.upper().split():
+        token = token.split('/', 1)[0]
+        if not token or token in SKIP_TOKENS or SPEED_LEVEL.match(token):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def parse_coordinate(token):
+    """(lon, lat) of an ICAO coordinate token (5430N01230W, 54N012W) or None"""
+    match = COORDINATE.match(token)
+    if not match:
+        return None
+    lat_deg, lat_min, ns, lon_deg, lon_min, ew = match.groups()
+    lat = int(lat_deg) + int(lat_min or 0) / 60.0
+    lon = int(lon_deg) + int(lon_min or 0) / 60.0
+    if lat > 90 or lon > 180:
+        return None
+    return (-lon if ew == 'W' else lon, -lat if ns == 'S' else lat)
+
+
+class RouteCompiler:
+    """
+    Compiles route strings against one airway index
+
+    Waypoints looked up from the database are kept for the compiler's
+    lifetime, so a compiler is meant to serve one request or
+    one import run. With strict=False unknown tokens and airways that
+    cannot be expanded are reported and skipped (the route goes direct);
+    with strict=True they raise RouteCompileError.
+    """
+
+    def __init__(self, airway_index=None, strict=False, airports=None):
+        self.index = airway_index or get_airway_index()
+        self.strict = strict
+        self.airports = (airports or get_airport_directory()).points  # code -> (ICAO, lon, lat)
+        self.fixes = {}  # waypoint identifier -> (lon, lat), for fixes not on airways
+        self.looked_up = set()
+
+    def resolve(self, token_lists):
+        """
+        Look up every en-route identifier of the given token lists that is
+        not an airway, an airway fix or already known, with one Waypoint query
+        """
+        names = set()
+        for tokens in token_lists:
+            for token in tokens[1:-1]:
+                if (token in self.looked_up or token in self.index or token in self.index.positions
+                        or COORDINATE.match(token)):
+                    continue
+                names.add(token)
+        if not names:
+            return
+
+        for identifier, location in Waypoint.objects.filter(
+            identifier__in=list(names)
+        ).values_list('identifier', 'location'):
+            self.fixes[identifier] = (location.x, location.y)
+        self.looked_up |= names
+
+    def _fix(self, token):
+        """Position of an en-route point: airway fix, waypoint, coordinate, then airport"""
+        position = self.index.positions.get(token) or self.fixes.get(token) or parse_coordinate(token)
+        if position is None and token in self.airports:
+            position = self.airports[token][1:]
+        return position
+
+    def _fail(self, problems, message, token):
+        if self.strict:
+            raise RouteCompileError(message, token)
+        problems.append({'token': token, 'error': message})
+
+    def points(self, tokens):
+        """
+        Walk the tokens of one route
+
+        Returns (departure ICAO, arrival ICAO, points as (identifier, lon,
+        lat, via) where via is the airway flown to reach the point or
+        'DCT', problems).
+        """
+        if len(tokens) < 2:
+            raise RouteCompileError('A route needs a departure and an arrival')
+        problems = []
+        departure, arrival = tokens[0], tokens[-1]
+        points = []
+
+        airport = self.airports.get(departure)
+        if airport is not None:
+            departure = airport[0]
+            points.append((departure, airport[1], airport[2], 'DCT'))
+        else:
+            self._fail(problems, f'Unknown departure airport {departure}', departure)
+
+        body = tokens[1:-1]
+        position = 0
+        while position < len(body):
+            token = body[position]
+            position += 1
+
+            if token in self.index:
+                previous = points[-1][0] if points else None
+                following = body[position] if position < len(body) else arrival
+                if previous is None:
+                    self._fail(problems, f'Airway {token} has no entry fix', token)
+                    continue
+                try:
+                    fixes = self.index.expand(token, previous, following)
+                except AirwayExpansionError as e:
+                    self._fail(problems, str(e), token)
+                    continue
+                for fix in fixes[1:]:
+                    lon, lat = self.index.positions[fix]
+                    points.append((fix, lon, lat, token))
+                if position < len(body):
+                    position += 1  # the exit fix has been added by the expansion
+                continue
+
+            location = self._fix(token)
+            if location is not None:
+                points.append((token, location[0], location[1], 'DCT'))
+            elif PROCEDURE.match(token) and (position == 1 or position == len(body)):
+                continue
+            elif AIRWAY.match(token):
+                self._fail(problems, f'Unknown airway {token}', token)
+            else:
+                self._fail(problems, f'Unknown point {token}', token)
+
+        airport = self.airports.get(arrival)
+        if airport is not None:
+            arrival = airport[0]
+            if not points or points[-1][0] != arrival:
+                points.append((arrival, airport[1], airport[2], 'DCT'))
+        else:
+            self._fail(problems, f'Unknown arrival airport {arrival}', arrival)
+
+        return departure, arrival, points, problems
+
+    def compile(self, route_text):
+        """Compile one route string (see compile_many)"""
+        result = self.compile_many([route_text])[0]
+        if isinstance(result, RouteCompileError):
+            raise result
+        return result
+
+    def compile_many(self, route_texts):
+        """
+        Compile route strings in one batch
+
+        Returns one item per string: a dict with departure, arrival,
+        waypoints (en-route identifiers), coordinates, legs (from, to, via,
+        distance_nm), total_distance and problems, or the RouteCompileError
+        raised for that string. Identifiers are resolved for the whole
+        batch at once and leg distances computed in one vectorized call.
+        """
+        token_lists = [tokenize(text or '') for text in route_texts]
+        self.resolve([tokens for tokens in token_lists if tokens])
+
+        results = []
+        batches = []
+        for tokens in token_lists:
+            try:
+                departure, arrival, points, problems = self.points(tokens)
+                if len(points) < 2:
+                    raise RouteCompileError('Route has fewer than two known points')
+            except RouteCompileError as e:
+                results.append(e)
+                continue
+            results.append((departure, arrival, points, problems))
+            batches.append(points)
+
+        if batches:
+            coords = np.array([(p[1], p[2]) for points in batches for p in points], dtype=float)
+            distances = haversine_nm(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+        start = 0
+        for i, result in enumerate(results):
+            if isinstance(result, RouteCompileError):
+                continue
+            departure, arrival, points, problems = result
+            leg_distances = distances[start:start + len(points) - 1]
+            start += len(points)
+            legs = [
+                {
+                    'from': points[k][0],
+                    'to': points[k + 1][0],
+                    'via': points[k + 1][3],
+                    'distance_nm': round(float(leg_distances[k]), 1),
+                }
+                for k in range(len(points) - 1)
+            ]
+            results[i] = {
+                'departure': departure,
+                'arrival': arrival,
+                'waypoints': [p[0] for p in points if p[0] not in (departure, arrival)],
+                'coordinates': [[p[1], p[2]] for p in points],
+                'legs': legs,
+                'total_distance': float(leg_distances.sum()),
+                'problems': problems,
+            }
+        return results
@@ -0,0 +1,212 @@
+"""
+Bulk import of route strings (company route libraries)
+
+Input is plain text (one route string per line, optionally
+"name;route string") or NDJSON objects with a "route" key and optional
+"name", "version" and "description". Rows are compiled in batches with one
+RouteCompiler, so identifiers are looked up once per batch, and written
+with bulk_create; Route.save() is bypassed, its derived fields (name,
+waypoints, coordinates, distance, flight time) are filled in from the
+compiled route. Compiling the next batch overlaps with inserting the
+previous one. Every row that is not imported is reported with its line
+number and the reason.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.gis.geos import LineString
+from django.db import IntegrityError, connections, transaction
+
+from .models import Route
+from .route_compiler import RouteCompiler, RouteCompileError
+from .suggestions import invalidate_route_dataset_version
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+def read_route_rows(lines, fmt=None):
+    """
+    (line number, dict with route and optional name/version/description)
+    for every non-blank input line; fmt is 'text', 'ndjson' or None to
+    detect it from the first line. Unreadable lines give a dict with
+    'error' instead.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if fmt is None:
+            fmt = 'ndjson' if line.startswith('{') else 'text'
+
+        if fmt == 'ndjson':
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, {'error': f'Invalid JSON: {e}'}
+                continue
+            if not isinstance(row, dict) or not row.get('route'):
+                yield number, {'error': 'Missing "route"'}
+                continue
+            yield number, row
+        else:
+            name, _, route = line.rpartition(';')
+            yield number, {'route': route.strip(), 'name': name.strip()}
+
+
+class RouteImporter:
+    """
+    Compiles and inserts route rows in batches and collects a per-row report
+    """
+
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE, strict=False, dry_run=False):
+        self.user = user
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.compiler = RouteCompiler(strict=strict)
+        self.seen = set()  # (departure, arrival, name, version) imported in this run
+        self.total = 0
+        self.imported = 0
+        self.errors = []
+        self.warnings = []
+
+    def _fail(self, number, row, message, token=None):
+        self.errors.append({
+            'line': number,
+            'route': (row.get('route') or '')[:200],
+            'error': message,
+            'token': token,
+        })
+
+    def compile_batch(self, batch):
+        """Route instances ready for bulk_create, with their line numbers"""
+        valid = [(number, row) for number, row in batch if 'error' not in row]
+        for number, row in batch:
+            if 'error' in row:
+                self._fail(number, row, row['error'])
+
+        results = self.compiler.compile_many([str(row['route']) for _, row in valid])
+        candidates = []
+        for (number, row), result in zip(valid, results):
+            if isinstance(result, RouteCompileError):
+                self._fail(number, row, str(result), result.token)
+                continue
+            if result['problems']:
+                self.warnings.append({'line': number, 'problems': result['problems']})
+
+            departure, arrival = result['departure'], result['arrival']
+            if len(departure) > 4 or len(arrival) > 4:
+                self._fail(number, row, 'Departure and arrival must be airport codes')
+                continue
+            route = Route(
+                name=(row.get('name') or f'{departure}-{arrival}')[:100],
+                departure=departure,
+                arrival=arrival,
+                waypoints=[departure] + result['waypoints'] + [arrival],
+                coordinates=LineString(result['coordinates'], srid=4326),
+                total_distance=round(result['total_distance'], 2),
+                version=str(row.get('version') or '')[:50],
+                description=row.get('description') or '',
+                created_by=self.user,
+            )
+            route.flight_time = route.calculate_flight_time()
+            candidates.append((number, row, route))
+        return candidates
+
+    def insert(self, candidates):
+        """
+        Drop rows clashing with active routes (one query per batch) or with
+        earlier rows of this run, then bulk_create the rest
+        """
+        if not candidates:
+            return
+        names = {route.name for _, _, route in candidates}
+        existing = set(Route.objects.filter(is_active=True, name__in=names).values_list(
+            'departure', 'arrival', 'name', 'version'
+        ))
+
+        routes = []
+        for number, row, route in candidates:
+            key = (route.departure, route.arrival, route.name, route.version)
+            if key in existing or key in self.seen:
+                self._fail(number, row, f'Route {route.get_full_name()} already exists')
+                continue
+            self.seen.add(key)
+            routes.append((number, row, route))
+
+        if self.dry_run:
+            self.imported += len(routes)
+            return
+        self._write(routes)
+
+    def _write(self, routes):
+        """
+        bulk_create in a savepoint; when the database rejects it, each half
+        is retried, so only the conflicting rows are reported
+        """
+        if not routes:
+            return
+        try:
+            with transaction.atomic():
+                Route.objects.bulk_create([route for _, _, route in routes], batch_size=self.batch_size)
+        except IntegrityError as e:
+            if len(routes) == 1:
+                number, row, _ = routes[0]
+                self._fail(number, row, f'Rejected by the database: {e}')
+                return
+            middle = len(routes) // 2
+            self._write(routes[:middle])
+            self._write(routes[middle:])
+            return
+        self.imported += len(routes)
+
+    def run(self, rows):
+        """
+        Import (line number, row) pairs; returns the report dict
+        """
+        started = time.perf_counter()
+
+        def batches():
+            batch = []
+            for item in rows:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        # Compile batch N+1 while batch N is being written
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = None
+            for batch in batches():
+                self.total += len(batch)
+                compiled = pool.submit(self.compile_batch, batch)
+                if pending is not None:
+                    self.insert(pending.result())
+                pending = compiled
+            if pending is not None:
+                self.insert(pending.result())
+            pool.submit(connections.close_all).result()  # the worker thread's connection
+        if self.imported and not self.dry_run:
+            invalidate_route_dataset_version()  # bulk_create sends no signals
+
+        elapsed = time.perf_counter() - started
+        self.errors.sort(key=lambda error: error['line'])
+        return {
+            'total': self.total,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'dry_run': self.dry_run,
+            'elapsed_s': round(elapsed, 2),
+            'routes_per_second': round(self.total / elapsed, 1) if elapsed > 0 else None,
+            'errors': self.errors,
+            'warnings': self.warnings,
+        }
+
+
+def import_routes(lines, user, fmt=None, **options):
+    """Import route strings from an iterable of lines (see RouteImporter)"""
+    return RouteImporter(user, **options).run(read_route_rows(lines, fmt))
@@ -1,64 +1,776 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+
 import networkx as nx
-from .models import Waypoint, AirwaySegment
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Waypoint, AirwaySegment, AirwaySegmentChange
+from .fuel import MIN_GROUND_SPEED_KT
+from .geo import haversine_nm, initial_bearing_deg
 from django.contrib.gis.geos import LineString
 
+AIRWAY_VERSION_CACHE_KEY = 'routes:airway_network_version'
+AIRWAY_VERSION_TIMEOUT = 15  # ثانیه؛ workerها حداکثر ۱۵ ثانیه بعد به داده جدید می‌رسند
+PATCH_THRESHOLD = 500       # بیش از این تعداد تغییر: ساخت کامل گراف
+CHANGE_LOG_WINDOW = 1000    # شناسه‌های زیر آخرین موقعیت که دوباره خوانده می‌شوند (commit دیرهنگام)
+CHANGE_LOG_RETENTION = timedelta(hours=24)  # change log قدیمی‌تر حذف می‌شود
+PRUNE_EVERY = 100           # هر چند تغییر یک بار change log هرس شود
+COMPACT_THRESHOLD = 0.2     # سهم یال‌های حذف‌شده که بالاتر از آن آرایه‌ها فشرده می‌شوند
+PATCH_HISTORY = 64          # تعداد وصله‌های اخیر که Segmentها و Airwayهای لمس‌شده‌شان نگه داشته می‌شود
+
+SEGMENT_FIELDS = (
+    'id', 'airway_id',
+    'from_waypoint__identifier', 'to_waypoint__identifier',
+    'distance', 'airway__identifier',
+    'from_waypoint__location', 'to_waypoint__location', 'base_altitude', 'direction'
+)
+
+# باندهای سطح پروازی برای گراف لایه‌ای (FL)؛ باند b = [BOUNDS[b], BOUNDS[b+1])
+LEVEL_BAND_BOUNDS = np.array([0, 100, 200, 250, 290, 330, 370, 410, 510], dtype=float)
+LEVEL_CHANGE_MIN = 2.0      # جریمه زمانی هر تغییر باند (دقیقه)
+
+SPEED_BAND_KT = 20          # پهنای باند سرعت برای کلید کش هزینه‌ها
+MAX_TAILWIND_KT = 250.0     # برای heuristic قابل‌قبول در A*
+COST_CACHE_SIZE = 64        # تعداد کلیدهای (cycle, level, band, slot) نگه‌داشته‌شده
+
+
+def waypoint_dataset_version():
+    """
+    اثر انگشت Waypointها (تعداد، بیشترین id و آخرین updated_at) از خود
+    دیتابیس؛ تغییر موقعیت در هر worker یا پروسه‌ای در همه workerها دیده می‌شود
+    """
+    stats = Waypoint.objects.aggregate(count=Count('id'), max_id=Max('id'), last_update=Max('updated_at'))
+    raw = f"{stats['count']}:{stats['max_id']}:{stats['last_update']}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def airway_network_version():
+    """
+    اثر انگشت کوتاه شبکه Airway: اثر انگشت Waypointها، تعداد Segmentها،
+    تعداد ردیف‌ها و آخرین شناسه change log (تعداد ردیف‌ها تغییری را که با
+    شناسه کمتر دیرتر commit شده هم نشان می‌دهد)
+    """
+    version = cache.get(AIRWAY_VERSION_CACHE_KEY)
+    if version is None:
+        count = AirwaySegment.objects.count()
+        log = AirwaySegmentChange.objects.aggregate(count=Count('id'), last=Max('id'))
+        version = f"{waypoint_dataset_version()}:{count}:{log['count']}:{log['last'] or 0}"
+        cache.set(AIRWAY_VERSION_CACHE_KEY, version, AIRWAY_VERSION_TIMEOUT)
+    return version
+
+
+def level_band_of(flight_level):
+    """
+    اندیس باند سطح پروازی (LEVEL_BAND_BOUNDS) برای یک یا چند سطح
+    """
+    band = np.searchsorted(LEVEL_BAND_BOUNDS, flight_level, side='right') - 1
+    return np.clip(band, 0, len(LEVEL_BAND_BOUNDS) - 2).astype(np.int8)
+
+
+def one_way_flags(segments, u, v):
+    """
+    [u→v ممنوع، v→u ممنوع] برای یک یال؛ یک جهت فقط وقتی ممنوع است که
+    هیچ Segmentی روی یال آن را مجاز نکند
+    """
+    forward = any(seg[6] != 'F' or seg[5] == u for seg in segments)
+    backward = any(seg[6] != 'F' or seg[5] == v for seg in segments)
+    return [not forward, not backward]
+
+
+def record_segment_change(segment_id, action):
+    """
+    ثبت یک تغییر Segment در change log؛ workerها آن را درجا اعمال می‌کنند
+    
+    هر PRUNE_EVERY تغییر، ردیف‌های قدیمی‌تر از CHANGE_LOG_RETENTION حذف
+    می‌شوند؛ routerی که در این مدت همگام نشده باشد کامل ساخته می‌شود.
+    """
+    change = AirwaySegmentChange.objects.create(segment_id=segment_id, action=action)
+    if change.id % PRUNE_EVERY == 0:
+        AirwaySegmentChange.objects.filter(changed_at__lt=timezone.now() - CHANGE_LOG_RETENTION).delete()
+    cache.delete(AIRWAY_VERSION_CACHE_KEY)
+
+
+def invalidate_airway_network_version():
+    """
+    حذف نسخه کش‌شده در همین پروسه تا تغییر Waypoint فوراً دیده شود؛
+    سایر workerها آن را حداکثر پس از AIRWAY_VERSION_TIMEOUT از updated_at می‌بینند
+    """
+    cache.delete(AIRWAY_VERSION_CACHE_KEY)
+
+
+class WindCostCache:
+    """
+    کش هزینه زمانی یال‌ها (دقیقه) برای هر کلید
+    (forecast cycle, flight level, speed band, time slot)
+    
+    هزینه‌ها lazy محاسبه می‌شوند: فقط یال‌هایی که جست‌وجو به آن‌ها می‌رسد،
+    و برای هر گره همه یال‌های خروجی در یک فراخوانی برداری.
+    """
+    
+    def __init__(self, max_keys=COST_CACHE_SIZE):
+        self.max_keys = max_keys
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def costs_for(self, key, edge_count):
+        with self.lock:
+            costs = self.entries.get(key)
+            if costs is None:
+                costs = np.full(edge_count, np.nan)
+                self.entries[key] = costs
+                while len(self.entries) > self.max_keys:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+                if len(costs) < edge_count:
+                    # یال‌هایی که apply_changes اضافه کرده
+                    costs = np.concatenate((costs, np.full(edge_count - len(costs), np.nan)))
+                    self.entries[key] = costs
+        return costs
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
 
 class AirwayRouter:
     """
     مسیریاب مبتنی بر شبکه Airway
     فقط برای نقاطی که در شبکه Airway موجود باشند
+    
+    آرایه‌های یال فقط به انتها اضافه می‌شوند و حذف با علامت‌گذاری
+    (edge_removed) انجام می‌شود؛ بنابراین apply_changes می‌تواند گراف را
+    درجا به‌روز کند بدون اینکه جست‌وجوهای در حال اجرا را خراب کند.
+    هر آرایه نمایی از یک بافر با ظرفیت دو برابر شونده است، پس افزودن
+    هر یال به‌طور میانگین O(1) است نه O(تعداد یال‌ها).
     """
     
     def __init__(self):
         self.graph = nx.Graph()
+        self.version = airway_network_version()
+        self.cost_cache = WindCostCache()
+        self.lock = threading.Lock()
         self.build_graph()
     
     def build_graph(self):
         """
         ساخت گراف از Segmentهای Airway
+        (یک کوئری values_list، بدون ساخت شیء مدل برای هر Segment)
         """
-        segments = AirwaySegment.objects.select_related('from_waypoint', 'to_waypoint', 'airway')
-        for segment in segments:
+        # موقعیت در change log قبل از خواندن Segmentها؛ تغییرات هم‌زمان
+        # دوباره اعمال می‌شوند (apply_changes idempotent است)
+        recent = list(
+            AirwaySegmentChange.objects.order_by('-id').values_list('id', flat=True)[:CHANGE_LOG_WINDOW]
+        )
+        self.change_position = recent[0] if recent else 0
+        self.applied_changes = set(recent)  # شناسه‌های اعمال‌شده در پنجره CHANGE_LOG_WINDOW
+        self.synced_at = time.monotonic()
+        self.waypoint_version = waypoint_dataset_version()
+        
+        positions = {}
+        for row in AirwaySegment.objects.values_list(*SEGMENT_FIELDS):
+            (segment_id, airway_pk, from_id, to_id, distance, airway,
+             from_location, to_location, base_altitude, direction) = row
+            # چند Segment روی یک جفت Waypoint یک یال می‌شوند؛ همه ثبت می‌شوند
+            previous = self.graph.get_edge_data(from_id, to_id, {}).get('segments', [])
             self.graph.add_edge(
-                segment.from_waypoint.identifier,
-                segment.to_waypoint.identifier,
-                weight=segment.distance,
-                airway=segment.airway.identifier
+                from_id, to_id, weight=distance, airway=airway,
+                segments=previous + [
+                    (segment_id, airway_pk, airway, distance, base_altitude / 100.0, from_id, direction)
+                ]
             )
+            positions[from_id] = (from_location.x, from_location.y)
+            positions[to_id] = (to_location.x, to_location.y)
+        nx.set_node_attributes(self.graph, positions, 'position')
+        self.build_arrays()
     
-    def find_route(self, departure_iata, arrival_iata):
+    def build_arrays(self):
         """
-        پیدا کردن کوتاه‌ترین مسیر در شبکه Airway
+        نمایش CSR گراف جهت‌دار (هر یال در دو جهت) برای جست‌وجوی برداری:
+        offsets/targets برای همسایه‌ها و برای هر یال جهت‌دار مسافت،
+        نقطه میانی و جهت (track)؛ به‌علاوه نگاشت Segment و Airway به
+        اندیس یال‌های بدون جهت (برای بستن موقت مسیرها)
         """
-        try:
-            # بررسی وجود nodeها در گراف
-            if departure_iata not in self.graph or arrival_iata not in self.graph:
+        self.nodes = list(self.graph.nodes)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        position = np.array(
+            [self.graph.nodes[n].get('position', (0.0, 0.0)) for n in self.nodes], dtype=float
+        ).reshape(-1, 2)
+        self.positions = position
+        
+        sources, targets, distances, undirected, min_levels, wrong_way = [], [], [], [], [], []
+        self.segment_edge = {}
+        airway_edges = {}
+        for k, (u, v, data) in enumerate(self.graph.edges(data=True)):
+            i, j = self.node_index[u], self.node_index[v]
+            data['index'] = k
+            segments = data.get('segments', ())
+            for segment_id, airway_pk, *_ in segments:
+                self.segment_edge[segment_id] = k
+                airway_edges.setdefault(airway_pk, []).append(k)
+            min_levels.append(min((seg[4] for seg in segments), default=0.0))
+            wrong_way += one_way_flags(segments, u, v)
+            sources += [i, j]
+            targets += [j, i]
+            distances += [data['weight'], data['weight']]
+            undirected += [k, k]
+        self.edge_count = len(undirected) // 2
+        self.airway_edges = {
+            airway_pk: np.asarray(edges, dtype=np.int64) for airway_pk, edges in airway_edges.items()
+        }
+        
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        self.edge_source = sources[order]
+        self.edge_target = np.asarray(targets, dtype=np.int64)[order]
+        self.edge_distance = np.asarray(distances, dtype=float)[order]
+        self.edge_undirected = np.asarray(undirected, dtype=np.int64)[order]
+        self.offsets = np.searchsorted(self.edge_source, np.arange(len(self.nodes) + 1))
+        
+        # برای هر یال بدون جهت: دو سر آن و اندیس دو یال جهت‌دارش
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        self.edge_directed = inverse.reshape(-1, 2)
+        self.edge_endpoints = sources.reshape(-1, 2)
+        self.edge_removed = np.zeros(self.edge_count, dtype=bool)
+        # پایین‌ترین سطح مجاز هر یال (base_altitude) و اولین باند قابل استفاده؛
+        # گراف لایه‌ای ساخته نمی‌شود، فقط همین یک بایت برای هر یال
+        self.edge_min_level = np.asarray(min_levels, dtype=float)
+        self.edge_min_band = level_band_of(self.edge_min_level)
+        # یال جهت‌دار خلاف جهت مجاز (همه Segmentهای آن یک‌طرفه در جهت دیگر)
+        self.edge_wrong_way = np.asarray(wrong_way, dtype=bool)[order]
+        self.extra_out = {}  # یال‌های جهت‌دار اضافه‌شده پس از ساخت، برای هر گره
+        self.buffers = {}  # نام آرایه -> بافر با ظرفیت اضافه (_extend)
+        self.revision = 0
+        # (revision، Segmentها و Airwayهای لمس‌شده) برای هر وصله اخیر؛
+        # RestrictionIndex و ClosureOverlay فقط همین‌ها را دوباره حل می‌کنند
+        self.patches = deque(maxlen=PATCH_HISTORY)
+        
+        start = position[self.edge_source]
+        end = position[self.edge_target]
+        self.edge_track = initial_bearing_deg(start[:, 0], start[:, 1], end[:, 0], end[:, 1])
+        self.edge_mid_lon = start[:, 0] + ((end[:, 0] - start[:, 0] + 180.0) % 360.0 - 180.0) / 2.0
+        self.edge_mid_lat = (start[:, 1] + end[:, 1]) / 2.0
+        self.cost_cache.clear()
+    
+    def apply_changes(self, changes):
+        """
+        اعمال درجای change log (لیست (change_id, segment_id, action))
+        
+        هر Segment لمس‌شده حذف و در صورت وجود، از حالت فعلی دیتابیس دوباره
+        اضافه می‌شود؛ یک کوئری برای همه Segmentها. هزینه متناسب با تعداد
+        تغییرات است، نه اندازه شبکه.
+        """
+        if not changes:
+            return
+        segment_ids = {segment_id for _, segment_id, _ in changes}
+        rows = list(AirwaySegment.objects.filter(id__in=segment_ids).values_list(*SEGMENT_FIELDS))
+        
+        with self.lock:
+            airways = set()
+            for segment_id in segment_ids:
+                airways.update(self._remove_segment(segment_id))
+            for row in rows:
+                self._insert_segment(*row)
+                airways.add(row[1])
+            change_ids = [change_id for change_id, _, _ in changes]
+            self.change_position = max(self.change_position, max(change_ids))
+            floor = self.change_position - CHANGE_LOG_WINDOW
+            self.applied_changes = {i for i in self.applied_changes.union(change_ids) if i > floor}
+            self.revision += 1
+            self.patches.append((self.revision, frozenset(segment_ids), frozenset(airways)))
+            self.cost_cache.clear()
+    
+    def changes_since(self, revision):
+        """
+        (revision فعلی، Segmentها، Airwayها) لمس‌شده در وصله‌های بعد از
+        revision؛ None اگر آن وصله‌ها دیگر در patches نباشند
+        """
+        with self.lock:
+            patches = [patch for patch in self.patches if patch[0] > revision]
+            if len(patches) != self.revision - revision:
                 return None
+            segments, airways = set(), set()
+            for _, touched_segments, touched_airways in patches:
+                segments |= touched_segments
+                airways |= touched_airways
+            return self.revision, segments, airways
+    
+    def removed_share(self):
+        """سهم یال‌های بدون جهت حذف‌شده (علامت‌گذاری‌شده) از کل آرایه‌ها"""
+        return float(self.edge_removed.mean()) if self.edge_count else 0.0
+    
+    def compacted(self):
+        """
+        router جدید با آرایه‌های فشرده (بدون یال‌های حذف‌شده) از گراف فعلی،
+        بدون کوئری؛ router فعلی دست نمی‌خورد تا جست‌وجوهای در حال اجرا سالم بمانند
+        """
+        router = AirwayRouter.__new__(AirwayRouter)
+        with self.lock:
+            router.graph = self.graph.copy()
+            router.version = self.version
+            router.waypoint_version = self.waypoint_version
+            router.change_position = self.change_position
+            router.applied_changes = set(self.applied_changes)
+            router.synced_at = self.synced_at
+        router.cost_cache = WindCostCache()
+        router.lock = threading.Lock()
+        router.build_arrays()
+        return router
+    
+    def _extend(self, name, values):
+        """
+        افزودن values به انتهای آرایه name با ظرفیت دو برابر شونده؛ آرایه
+        جدید نمای دیگری از همان بافر است و نمایی که جست‌وجوی در حال اجرا
+        گرفته تغییر نمی‌کند
+        """
+        current = getattr(self, name)
+        values = np.asarray(values, dtype=current.dtype).reshape((-1,) + current.shape[1:])
+        size = len(current) + len(values)
+        buffer = self.buffers.get(name)
+        if buffer is None or current.base is not buffer or len(buffer) < size:
+            buffer = np.empty((max(2 * size, 16),) + current.shape[1:], dtype=current.dtype)
+            buffer[:len(current)] = current
+            self.buffers[name] = buffer
+        buffer[len(current):size] = values
+        setattr(self, name, buffer[:size])
+    
+    def _add_node(self, node, position):
+        # ترتیب مهم است: جست‌وجوهای هم‌زمان گره را فقط پس از ثبت در node_index می‌بینند
+        self._extend('positions', [position])
+        self._extend('offsets', [self.offsets[-1]])
+        self.graph.add_node(node, position=position)
+        self.nodes.append(node)
+        self.node_index[node] = len(self.nodes) - 1
+    
+    def _append_edge(self, i, j, distance, min_level):
+        k = self.edge_count
+        d = len(self.edge_target)
+        start = self.positions[[i, j]]
+        end = self.positions[[j, i]]
+        self._extend('edge_source', [i, j])
+        self._extend('edge_target', [j, i])
+        self._extend('edge_distance', [distance, distance])
+        self._extend('edge_undirected', [k, k])
+        self._extend('edge_track', initial_bearing_deg(start[:, 0], start[:, 1], end[:, 0], end[:, 1]))
+        self._extend(
+            'edge_mid_lon', start[:, 0] + ((end[:, 0] - start[:, 0] + 180.0) % 360.0 - 180.0) / 2.0
+        )
+        self._extend('edge_mid_lat', (start[:, 1] + end[:, 1]) / 2.0)
+        self._extend('edge_directed', [[d, d + 1]])
+        self._extend('edge_endpoints', [[i, j]])
+        self._extend('edge_removed', [False])
+        self._extend('edge_wrong_way', [False, False])
+        self._extend('edge_min_level', [min_level])
+        self._extend('edge_min_band', [level_band_of(min_level)])
+        self.edge_count = k + 1
+        # آخر از همه: از این لحظه یال برای جست‌وجوها قابل مشاهده است
+        for node, edge in ((i, d), (j, d + 1)):
+            self.extra_out[node] = np.append(self.extra_out.get(node, np.zeros(0, dtype=np.int64)), edge)
+        return k
+    
+    def _insert_segment(self, segment_id, airway_pk, from_id, to_id, distance, airway,
+                        from_location, to_location, base_altitude, direction):
+        for node, location in ((from_id, from_location), (to_id, to_location)):
+            if node not in self.node_index:
+                self._add_node(node, (location.x, location.y))
+        
+        min_level = base_altitude / 100.0
+        entry = (segment_id, airway_pk, airway, distance, min_level, from_id, direction)
+        data = self.graph.get_edge_data(from_id, to_id)
+        if data is None:
+            k = self._append_edge(self.node_index[from_id], self.node_index[to_id], distance, min_level)
+            self.graph.add_edge(from_id, to_id, weight=distance, airway=airway, segments=[entry], index=k)
+            self._refresh_edge(k, [entry])
+        else:
+            k = data['index']
+            data['segments'] = data['segments'] + [entry]
+            data['weight'], data['airway'] = distance, airway
+            self.edge_distance[self.edge_directed[k]] = distance
+            self._refresh_edge(k, data['segments'])
+        
+        self.segment_edge[segment_id] = k
+        self.airway_edges[airway_pk] = np.append(
+            self.airway_edges.get(airway_pk, np.zeros(0, dtype=np.int64)), k
+        )
+    
+    def _remove_segment(self, segment_id):
+        """حذف یک Segment از یال آن؛ خروجی: Airwayهای Segment حذف‌شده"""
+        k = self.segment_edge.pop(segment_id, None)
+        if k is None:
+            return []
+        u, v = (self.nodes[i] for i in self.edge_endpoints[k])
+        data = self.graph[u][v]
+        removed = [s for s in data['segments'] if s[0] == segment_id]
+        remaining = [s for s in data['segments'] if s[0] != segment_id]
+        
+        for _, airway_pk, *_ in removed:
+            if not any(s[1] == airway_pk for s in remaining):
+                edges = self.airway_edges.get(airway_pk)
+                if edges is not None:
+                    self.airway_edges[airway_pk] = edges[edges != k]
+        
+        if remaining:
+            _, _, airway, distance, *_ = remaining[-1]
+            data['segments'] = remaining
+            data['weight'], data['airway'] = distance, airway
+            self.edge_distance[self.edge_directed[k]] = distance
+            self._refresh_edge(k, remaining)
+        else:
+            self.edge_removed[k] = True
+            self.graph.remove_edge(u, v)
+        return [airway_pk for _, airway_pk, *_ in removed]
+    
+    def _refresh_edge(self, k, segments):
+        """به‌روزرسانی base_altitude و جهت مجاز یال k از Segmentهای آن"""
+        min_level = min(seg[4] for seg in segments)
+        self.edge_min_level[k] = min_level
+        self.edge_min_band[k] = level_band_of(min_level)
+        u, v = (self.nodes[i] for i in self.edge_endpoints[k])
+        self.edge_wrong_way[self.edge_directed[k]] = one_way_flags(segments, u, v)
+    
+    def edge_lines(self):
+        """
+        هندسه یال‌های بدون جهت (به ترتیب اندیس 'index' هر یال) به صورت
+        آرایه LineStringهای shapely؛ برای تقاطع با فضاهای محدود
+        """
+        import shapely
+        
+        return shapely.linestrings(self.positions[self.edge_endpoints])
+    
+    def find_route(self, departure_iata, arrival_iata, blocked_edges=None, flight_level=None):
+        """
+        پیدا کردن کوتاه‌ترین مسیر در شبکه Airway
+        blocked_edges: ماسک بولی یال‌های بدون جهت که نباید استفاده شوند
+        (مثلاً از RestrictionIndex.blocked_edges)
+        flight_level: اگر داده شود، Segmentهایی با base_altitude بالاتر حذف می‌شوند
+        
+        همان جست‌وجوی find_wind_optimal_route بدون باد است (زمان با TAS ثابت
+        متناسب با مسافت است) تا فقط روی آرایه‌ها کار کند.
+        """
+        route = self.find_wind_optimal_route(
+            departure_iata, arrival_iata,
+            flight_level=flight_level if flight_level is not None else LEVEL_BAND_BOUNDS[-1],
+            blocked_edges=blocked_edges
+        )
+        if not route:
+            return None
+        return {
+            'waypoints': route['waypoints'],
+            'total_distance': route['total_distance'],
+            'airways_used': route['airways_used'],
+            'segment_count': route['segment_count']
+        }
+    
+    def _usable(self, edges, blocked_edges, flight_level=None):
+        """
+        یال‌های جهت‌دار حذف‌نشده، در جهت مجاز، خارج از ماسک blocked_edges و
+        (اگر flight_level داده شود) با base_altitude کمتر یا برابر آن سطح
+        """
+        undirected = self.edge_undirected[edges]
+        usable = ~self.edge_removed[undirected] & ~self.edge_wrong_way[edges]
+        if flight_level is not None:
+            usable &= self.edge_min_level[undirected] <= flight_level
+        if blocked_edges is not None:
+            # یال‌های جدیدتر از ماسک، مسدود حساب نمی‌شوند
+            inside = undirected < len(blocked_edges)
+            usable[inside] &= ~blocked_edges[undirected[inside]]
+        return edges[usable]
+    
+    def find_wind_optimal_route(self, departure, arrival, flight_level=350, true_airspeed_kt=450,
+                                departure_time=None, wind_grid=None, blocked_edges=None):
+        """
+        مسیر با کمترین زمان پرواز در شبکه Airway با در نظر گرفتن باد
+        
+        هزینه هر یال = مسافت / (TAS + مؤلفه باد در امتداد یال) در سطح پروازی
+        و زمان تخمینی عبور؛ بدون wind_grid همان کوتاه‌ترین مسیر زمانی است.
+        جست‌وجو A* است (heuristic: فاصله دایره عظیمه با بیشترین باد پشت).
+        TAS به باند SPEED_BAND_KT گرد می‌شود تا کش هزینه‌ها مشترک بماند.
+        blocked_edges: ماسک بولی یال‌های بدون جهت (فضاهای محدود فعال)
+        Segmentهایی که base_altitude آن‌ها بالاتر از flight_level است استفاده نمی‌شوند.
+        """
+        if departure not in self.node_index or arrival not in self.node_index:
+            return None
+        
+        source = self.node_index[departure]
+        target = self.node_index[arrival]
+        band = max(int(round(true_airspeed_kt / SPEED_BAND_KT)) * SPEED_BAND_KT, SPEED_BAND_KT)
+        level = int(round(flight_level))
+        
+        start_epoch = None
+        if wind_grid is not None:
+            from .weather import to_epoch
+            start_epoch = to_epoch(departure_time) if departure_time is not None else float(wind_grid.times[0])
+        
+        # گره‌هایی که حین جست‌وجو اضافه شوند در نظر گرفته نمی‌شوند
+        node_count = len(self.offsets) - 1
+        positions = self.positions[:node_count]
+        target_lon, target_lat = positions[target]
+        remaining = haversine_nm(positions[:, 0], positions[:, 1], target_lon, target_lat)
+        heuristic = remaining / (band + MAX_TAILWIND_KT) * 60.0
+        
+        best = np.full(node_count, np.inf)
+        via = np.full(node_count, -1, dtype=np.int64)
+        done = np.zeros(node_count, dtype=bool)
+        best[source] = 0.0
+        heap = [(heuristic[source], 0.0, source)]
+        
+        while heap:
+            _, elapsed, node = heapq.heappop(heap)
+            if done[node]:
+                continue
+            done[node] = True
+            if node == target:
+                break
             
-            # پیدا کردن کوتاه‌ترین مسیر
-            path = nx.shortest_path(self.graph, departure_iata, arrival_iata, weight='weight')
+            edges = np.arange(self.offsets[node], self.offsets[node + 1])
+            extra = self.extra_out.get(node)
+            if extra is not None:
+                edges = np.concatenate((edges, extra))
+            edges = self._usable(edges, blocked_edges, level)
+            edges = edges[self.edge_target[edges] < node_count]
+            if not len(edges):
+                continue
+            when = start_epoch + elapsed * 60.0 if start_epoch is not None else None
+            arrive = elapsed + self._edge_costs(edges, level, band, wind_grid, when)
+            neighbours = self.edge_target[edges]
+            better = (arrive < best[neighbours]) & ~done[neighbours]
+            for edge, neighbour, time_min in zip(
+                edges[better].tolist(), neighbours[better].tolist(), arrive[better].tolist()
+            ):
+                if time_min < best[neighbour]:
+                    best[neighbour] = time_min
+                    via[neighbour] = edge
+                    heapq.heappush(heap, (time_min + heuristic[neighbour], time_min, neighbour))
+        
+        if not np.isfinite(best[target]):
+            return None
+        
+        path_edges = []
+        node = target
+        while node != source:
+            path_edges.append(int(via[node]))
+            node = int(self.edge_source[via[node]])
+        path_edges.reverse()
+        path, total_distance, airways_used = self._path_summary(departure, path_edges)
+        
+        total_time = float(best[target])
+        ground_speed = total_distance / total_time * 60.0 if total_time > 0 else float(band)
+        return {
+            'waypoints': path,
+            'total_distance': total_distance,
+            'total_time_min': round(total_time, 1),
+            'mean_wind_component_kt': round(ground_speed - band, 1),
+            'true_airspeed_kt': band,
+            'flight_level': level,
+            'wind_cycle': wind_grid.cycle if wind_grid is not None else None,
+            'airways_used': airways_used,
+            'segment_count': len(path) - 1
+        }
+    
+    def _path_summary(self, departure, path_edges):
+        """(لیست Waypointها، مسافت کل، Airwayهای استفاده‌شده) برای یال‌های جهت‌دار مسیر"""
+        path = [departure] + [self.nodes[i] for i in self.edge_target[path_edges]]
+        total_distance = float(self.edge_distance[path_edges].sum())
+        airways_used = []
+        for i in range(len(path) - 1):
+            edge_data = self.graph.get_edge_data(path[i], path[i + 1], {})
+            airway_id = edge_data.get('airway', 'UNKNOWN')
+            if airway_id not in airways_used:
+                airways_used.append(airway_id)
+        return path, total_distance, airways_used
+    
+    def find_layered_route(self, departure, arrival, min_level=None, max_level=None, ceiling_fl=None,
+                           true_airspeed_kt=450, departure_time=None, wind_grid=None, blocked_edges=None,
+                           band_blocked_edges=None):
+        """
+        مسیر با کمترین زمان روی گراف لایه‌ای (باند سطح پروازی × Waypoint)
+        
+        حالت‌ها (waypoint, band) هستند؛ یال Airway فقط در باندهایی که
+        بالاتر از base_altitude آن باشند قابل استفاده است و تغییر باند در هر
+        Waypoint با جریمه LEVEL_CHANGE_MIN ممکن است. گراف لایه‌ای ساخته
+        نمی‌شود: برای هر یال فقط edge_min_band نگه داشته می‌شود (حافظه خطی)
+        و جست‌وجو فقط باندهای بین min_level و min(max_level, ceiling_fl) را
+        می‌بیند، پس محدوده باریک‌تر سریع‌تر است. باد هر باند در سطح میانی
+        آن باند (محدود به بازه درخواستی) خوانده می‌شود.
+        
+        blocked_edges در همه باندها اعمال می‌شود؛ band_blocked_edges (اختیاری)
+        تابعی است که برای سطح پروازی هر باند ماسک یال‌های بسته در آن سطح را
+        می‌دهد (مثلاً بسته بودن یا فضای محدود فقط در سطوح پایین)، یک بار برای
+        هر باند در شروع جست‌وجو.
+        """
+        if departure not in self.node_index or arrival not in self.node_index:
+            return None
+        
+        top = float(LEVEL_BAND_BOUNDS[-1])
+        if max_level is not None:
+            top = min(top, float(max_level))
+        if ceiling_fl is not None:
+            top = min(top, float(ceiling_fl))
+        bottom = float(min_level) if min_level is not None else 0.0
+        if bottom > top:
+            raise ValueError('Minimum flight level is above the maximum level or ceiling')
+        
+        lo, hi = int(level_band_of(bottom)), int(level_band_of(top))
+        bands = hi - lo + 1
+        cruise_levels = np.clip(
+            (LEVEL_BAND_BOUNDS[lo:hi + 1] + LEVEL_BAND_BOUNDS[lo + 1:hi + 2]) / 2.0, bottom, top
+        ).round().astype(int).tolist()
+        
+        band_masks = [
+            band_blocked_edges(level) if band_blocked_edges is not None else None for level in cruise_levels
+        ]
+        
+        source = self.node_index[departure]
+        target = self.node_index[arrival]
+        speed = max(int(round(true_airspeed_kt / SPEED_BAND_KT)) * SPEED_BAND_KT, SPEED_BAND_KT)
+        
+        start_epoch = None
+        if wind_grid is not None:
+            from .weather import to_epoch
+            start_epoch = to_epoch(departure_time) if departure_time is not None else float(wind_grid.times[0])
+        
+        node_count = len(self.offsets) - 1
+        positions = self.positions[:node_count]
+        target_lon, target_lat = positions[target]
+        remaining = haversine_nm(positions[:, 0], positions[:, 1], target_lon, target_lat)
+        heuristic = (remaining / (speed + MAX_TAILWIND_KT) * 60.0).tolist()
+        
+        state_count = node_count * bands
+        best = np.full(state_count, np.inf)
+        via_edge = np.full(state_count, -1, dtype=np.int64)
+        via_state = np.full(state_count, -1, dtype=np.int64)
+        done = np.zeros(state_count, dtype=bool)
+        heap = []
+        for b in range(bands):
+            best[source * bands + b] = 0.0
+            heap.append((heuristic[source], 0.0, source * bands + b))
+        heapq.heapify(heap)
+        
+        adjacency = {}
+        final = -1
+        while heap:
+            _, elapsed, state = heapq.heappop(heap)
+            if done[state]:
+                continue
+            done[state] = True
+            node, b = divmod(state, bands)
+            if node == target:
+                final = state
+                break
             
-            # محاسبه مسافت کل
-            total_distance = 0
-            for i in range(len(path) - 1):
-                total_distance += self.graph[path[i]][path[i+1]]['weight']
+            # یال‌های خروجی هر گره یک بار در هر جست‌وجو فیلتر می‌شوند
+            adjacent = adjacency.get(node)
+            if adjacent is None:
+                edges = np.arange(self.offsets[node], self.offsets[node + 1])
+                extra = self.extra_out.get(node)
+                if extra is not None:
+                    edges = np.concatenate((edges, extra))
+                edges = self._usable(edges, blocked_edges)
+                min_band = self.edge_min_band[self.edge_undirected[edges]]
+                edges = edges[(self.edge_target[edges] < node_count) & (min_band <= hi)]
+                adjacent = adjacency[node] = (edges, self.edge_min_band[self.edge_undirected[edges]])
             
-            # جمع‌آوری اطلاعات Airwayهای استفاده شده
-            airways_used = []
-            for i in range(len(path) - 1):
-                edge_data = self.graph[path[i]][path[i+1]]
-                airway_id = edge_data.get('airway', 'UNKNOWN')
-                if airway_id not in airways_used:
-                    airways_used.append(airway_id)
+            edges, min_band = adjacent
+            edges = edges[min_band <= lo + b]
+            band_mask = band_masks[b]
+            if band_mask is not None and len(edges):
+                # یال‌های جدیدتر از ماسک، مسدود حساب نمی‌شوند
+                undirected = self.edge_undirected[edges]
+                inside = undirected < len(band_mask)
+                keep = np.ones(len(edges), dtype=bool)
+                keep[inside] = ~band_mask[undirected[inside]]
+                edges = edges[keep]
+            if len(edges):
+                when = start_epoch + elapsed * 60.0 if start_epoch is not None else None
+                arrive = elapsed + self._edge_costs(edges, cruise_levels[b], speed, wind_grid, when)
+                states = self.edge_target[edges] * bands + b
+                better = (arrive < best[states]) & ~done[states]
+                for edge, next_state, time_min in zip(
+                    edges[better].tolist(), states[better].tolist(), arrive[better].tolist()
+                ):
+                    if time_min < best[next_state]:
+                        best[next_state] = time_min
+                        via_edge[next_state] = edge
+                        via_state[next_state] = state
+                        heapq.heappush(heap, (time_min + heuristic[next_state // bands], time_min, next_state))
             
-            return {
-                'waypoints': path,
-                'total_distance': total_distance,
-                'airways_used': airways_used,
-                'segment_count': len(path) - 1
-            }
-        except (nx.NetworkXNoPath, nx.NodeNotFound):
+            # تغییر سطح در همین Waypoint
+            for next_b in (b - 1, b + 1):
+                if 0 <= next_b < bands:
+                    next_state = node * bands + next_b
+                    time_min = elapsed + LEVEL_CHANGE_MIN
+                    if not done[next_state] and time_min < best[next_state]:
+                        best[next_state] = time_min
+                        via_edge[next_state] = -1
+                        via_state[next_state] = state
+                        heapq.heappush(heap, (time_min + heuristic[node], time_min, next_state))
+        
+        if final < 0:
             return None
+        
+        path_edges, path_levels = [], []
+        level_changes = 0
+        state = final
+        while via_state[state] >= 0:
+            if via_edge[state] >= 0:
+                path_edges.append(int(via_edge[state]))
+                path_levels.append(cruise_levels[state % bands])
+            else:
+                level_changes += 1
+            state = int(via_state[state])
+        path_edges.reverse()
+        path_levels.reverse()
+        path, total_distance, airways_used = self._path_summary(departure, path_edges)
+        
+        total_time = float(best[final])
+        cruise_time = total_time - level_changes * LEVEL_CHANGE_MIN
+        ground_speed = total_distance / cruise_time * 60.0 if cruise_time > 0 else float(speed)
+        return {
+            'waypoints': path,
+            'total_distance': total_distance,
+            'total_time_min': round(total_time, 1),
+            'mean_wind_component_kt': round(ground_speed - speed, 1),
+            'true_airspeed_kt': speed,
+            'segment_levels': path_levels,
+            'level_changes': level_changes,
+            'level_range': [int(bottom), int(top)],
+            'level_bands': bands,
+            'wind_cycle': wind_grid.cycle if wind_grid is not None else None,
+            'airways_used': airways_used,
+            'segment_count': len(path) - 1
+        }
+    
+    def _edge_costs(self, edges, level, band, wind_grid, when):
+        """
+        زمان عبور (دقیقه) برای یال‌های جهت‌دار؛ فقط یال‌هایی که هنوز در کش
+        کلید (cycle, level, band, slot) نیستند محاسبه می‌شوند
+        """
+        if wind_grid is None:
+            key = (None, level, band, None)
+        else:
+            slot = int(np.abs(wind_grid.times - when).argmin())
+            key = (wind_grid.cycle, level, band, slot)
+        costs = self.cost_cache.costs_for(key, len(self.edge_distance))
+        
+        missing = edges[np.isnan(costs[edges])]
+        if len(missing):
+            if wind_grid is None:
+                tailwind = 0.0
+            else:
+                tailwind, _, _ = wind_grid.components(
+                    self.edge_mid_lon[missing], self.edge_mid_lat[missing],
+                    level, wind_grid.times[slot], self.edge_track[missing]
+                )
+            ground_speed = np.maximum(band + tailwind, MIN_GROUND_SPEED_KT)
+            costs[missing] = self.edge_distance[missing] / ground_speed * 60.0
+        return costs[edges]
 
 
 class FlightRouter:
@@ -330,11 +1042,19 @@ class FlightRouter:
         """
         اعتبارسنجی مسیر (بررسی وجود Waypointها)
         """
+        from .airway_index import get_airway_index
+        
         errors = []
         valid_waypoints = []
         
+        # Waypointهای روی Airwayها از ایندکس؛ بقیه با یک کوئری
+        known = get_airway_index().positions
+        unknown = {wp_id for wp_id in waypoint_ids if wp_id not in known}
+        if unknown:
+            unknown -= set(Waypoint.objects.filter(identifier__in=unknown).values_list('identifier', flat=True))
+        
         for wp_id in waypoint_ids:
-            if Waypoint.objects.filter(identifier=wp_id).exists():
+            if wp_id not in unknown:
                 valid_waypoints.append(wp_id)
             else:
                 errors.append(f"Waypoint '{wp_id}' پیدا نشد")
@@ -365,3 +1085,58 @@ def get_router():
     ایجاد instance از FlightRouter
     """
     return FlightRouter()
+
+
+_airway_router = None
+_airway_router_lock = threading.Lock()
+
+
+def get_airway_router():
+    """
+    AirwayRouter مشترک در کل پروسه؛ فقط وقتی نسخه شبکه Airway عوض شود
+    دوباره ساخته می‌شود (کش هزینه‌های باد هم همراه آن حفظ می‌شود)
+    """
+    global _airway_router
+    version = airway_network_version()
+    if _airway_router is None or _airway_router.version != version:
+        with _airway_router_lock:
+            if _airway_router is None or _airway_router.version != version:
+                if not (_airway_router is not None and _patch_airway_router(_airway_router, version)):
+                    _airway_router = AirwayRouter()
+                elif _airway_router.removed_share() > COMPACT_THRESHOLD:
+                    _airway_router = _airway_router.compacted()
+    return _airway_router
+
+
+def _patch_airway_router(router, version):
+    """
+    به‌روزرسانی درجای router از change log؛ False یعنی ساخت کامل لازم است
+    (تغییر Waypointها، تغییرات بیش از PATCH_THRESHOLD، routerی که بیش از
+    CHANGE_LOG_RETENTION همگام نشده، یا تغییری که در log ثبت نشده، مثلاً
+    bulk_create)
+    
+    CHANGE_LOG_WINDOW شناسه زیر آخرین موقعیت دوباره خوانده می‌شود و فقط
+    شناسه‌های اعمال‌نشده اعمال می‌شوند؛ پس تراکنشی که شناسه کمتری گرفته
+    ولی دیرتر commit شده جا نمی‌ماند.
+    """
+    waypoint_version, count, _, last_change = version.split(':')
+    if waypoint_version != router.waypoint_version:
+        return False
+    if time.monotonic() - router.synced_at > CHANGE_LOG_RETENTION.total_seconds():
+        return False
+    
+    limit = CHANGE_LOG_WINDOW + PATCH_THRESHOLD
+    rows = list(
+        AirwaySegmentChange.objects.filter(id__gt=router.change_position - CHANGE_LOG_WINDOW)
+        .order_by('id').values_list('id', 'segment_id', 'action')[:limit + 1]
+    )
+    changes = [row for row in rows if row[0] not in router.applied_changes]
+    if len(rows) > limit or len(changes) > PATCH_THRESHOLD:
+        return False
+    
+    router.apply_changes(changes)
+    if int(last_change) > router.change_position or int(count) != len(router.segment_edge):
+        return False
+    router.version = version
+    router.synced_at = time.monotonic()
+    return True
@@ -27,7 +27,7 @@ class AirwaySegmentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'airway', 'from_waypoint', 'from_waypoint_identifier',
             'to_waypoint', 'to_waypoint_identifier', 'sequence',
-            'distance', 'base_altitude'
+            'distance', 'base_altitude', 'direction'
         ]
 
 
@@ -45,7 +45,32 @@ class AirwaySerializer(serializers.ModelSerializer):
         ]
 
 
+class RouteListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of routes with one Waypoint query for all of them:
+    every identifier on the page is resolved up front and each waypoint is
+    serialized once, then shared by the rows that use it
+    """
+    
+    def to_representation(self, data):
+        routes = list(data.all() if hasattr(data, 'all') else data)
+        if 'waypoint_details' in self.child.fields:
+            identifiers = {identifier for route in routes for identifier in (route.waypoints or [])}
+            waypoints = Waypoint.objects.filter(identifier__in=identifiers) if identifiers else []
+            self.child.waypoint_map = {
+                item['identifier']: item for item in WaypointSerializer(waypoints, many=True).data
+            }
+        try:
+            return [self.child.to_representation(route) for route in routes]
+        finally:
+            self.child.waypoint_map = None
+
+
 class RouteSerializer(serializers.ModelSerializer):
+    """
+    Route with its waypoints' details; pass lite=True in the context (or
+    ?lite=1 on the request) to leave waypoint_details out
+    """
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
     updated_by_username = serializers.CharField(source='updated_by.username', allow_null=True, read_only=True)
     waypoint_count = serializers.SerializerMethodField()
@@ -63,17 +88,40 @@ class RouteSerializer(serializers.ModelSerializer):
             'updated_by', 'updated_by_username', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_by', 'updated_by', 'created_at', 'updated_at']
+        list_serializer_class = RouteListSerializer
+    
+    waypoint_map = None  # identifier -> serialized waypoint, set by RouteListSerializer
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        lite = self.context.get('lite') or (
+            request is not None
+            and getattr(request, 'query_params', request.GET).get('lite', '').lower() in ('1', 'true', 'yes')
+        )
+        if lite:
+            self.fields.pop('waypoint_details', None)
     
     def get_waypoint_count(self, obj):
         return len(obj.waypoints) if obj.waypoints else 0
     
     def get_waypoint_details(self, obj):
-        from .models import Waypoint
+        """Waypoints of the route in route order, each listed once"""
         if not obj.waypoints:
             return []
         
-        waypoints = Waypoint.objects.filter(identifier__in=obj.waypoints)
-        return WaypointSerializer(waypoints, many=True).data
+        waypoint_map = self.waypoint_map
+        if waypoint_map is None:
+            waypoints = Waypoint.objects.filter(identifier__in=obj.waypoints)
+            waypoint_map = {item['identifier']: item for item in WaypointSerializer(waypoints, many=True).data}
+        
+        details, seen = [], set()
+        for identifier in obj.waypoints:
+            item = waypoint_map.get(identifier)
+            if item is not None and identifier not in seen:
+                seen.add(identifier)
+                details.append(item)
+        return details
     
     def get_coordinates_geojson(self, obj):
         """تبدیل coordinates به GeoJSON"""
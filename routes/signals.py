@@ -0,0 +1,70 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from airports.models import Airport
+
+from .models import (
+    FlightInformationRegion, AirwaySegment, Waypoint, RestrictedArea, RestrictedAreaActivation,
+    AirwayClosure, Route
+)
+from .fir import invalidate_fir_dataset_version
+from .airport_codes import invalidate_airport_dataset_version
+from .airspace import invalidate_restriction_dataset_version
+from .closures import invalidate_airway_closure_version
+from .suggestions import invalidate_route_dataset_version
+from .routing import invalidate_airway_network_version, record_segment_change
+
+
+@receiver(post_save, sender=FlightInformationRegion)
+@receiver(post_delete, sender=FlightInformationRegion)
+def fir_dataset_changed(sender, **kwargs):
+    """Any FIR change bumps the dataset version used by cached lookups"""
+    invalidate_fir_dataset_version()
+
+
+@receiver(post_save, sender=AirwaySegment)
+def airway_segment_saved(sender, instance, created, **kwargs):
+    """Segment inserts/updates go to the change log and are patched in place"""
+    record_segment_change(instance.pk, 'I' if created else 'U')
+
+
+@receiver(post_delete, sender=AirwaySegment)
+def airway_segment_deleted(sender, instance, **kwargs):
+    record_segment_change(instance.pk, 'D')
+
+
+@receiver(post_save, sender=Waypoint)
+@receiver(post_delete, sender=Waypoint)
+def airway_network_changed(sender, **kwargs):
+    """Waypoint changes (positions) make cached airway routers rebuild"""
+    invalidate_airway_network_version()
+
+
+@receiver(post_save, sender=RestrictedArea)
+@receiver(post_delete, sender=RestrictedArea)
+@receiver(post_save, sender=RestrictedAreaActivation)
+@receiver(post_delete, sender=RestrictedAreaActivation)
+def restricted_airspace_changed(sender, **kwargs):
+    """Area or activation window changes rebuild the restriction index"""
+    invalidate_restriction_dataset_version()
+
+
+@receiver(post_save, sender=AirwayClosure)
+@receiver(post_delete, sender=AirwayClosure)
+def airway_closure_changed(sender, **kwargs):
+    """Closure changes are applied to the routing overlay without a graph rebuild"""
+    invalidate_airway_closure_version()
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+def airport_dataset_changed(sender, **kwargs):
+    """Airport changes reload the in-process airport code dictionary"""
+    invalidate_airport_dataset_version()
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def route_dataset_changed(sender, **kwargs):
+    """Route changes rebuild the search suggestion index"""
+    invalidate_route_dataset_version()
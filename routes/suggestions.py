@@ -0,0 +1,314 @@
+"""
+Type-ahead search suggestions
+
+Airports (IATA, ICAO, name, city), waypoint identifiers and active route
+names are held in a per-process index: a sorted term list searched by
+prefix with bisect, each term carrying a precomputed rank (match field
+plus an importance weight per entry), and trigram postings over airport
+and route names for misspelled queries. A lookup is two binary searches,
+a partial sort of the matching range and, when the prefix matches are
+not enough, one bincount over trigram postings.
+
+The index is rebuilt in a background thread when the airport, waypoint or
+route data changes. Until the first build of a process has finished,
+suggestions come from PostgreSQL (prefix lookups plus pg_trgm similarity).
+"""
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+import numpy as np
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Max, Q
+
+from airports.models import Airport
+from .models import Waypoint, Route
+from .airport_codes import get_airport_directory, airport_dataset_version
+from .routing import airway_network_version
+
+ROUTE_VERSION_CACHE_KEY = 'routes:route_dataset_version'
+ROUTE_VERSION_TIMEOUT = 60  # seconds
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MIN_SIMILARITY = 0.5
+
+# Rank offsets: lower ranks first
+CODE_MATCH, WORD_MATCH, SIMILAR_MATCH = 0.0, 0.3, 1.0
+AIRPORT_WEIGHTS = {'large_airport': 0.0, 'medium_airport': 0.2, 'small_airport': 0.4}
+ROUTE_WEIGHT = 0.4
+WAYPOINT_WEIGHT = 0.6
+
+
+def route_dataset_version():
+    """
+    Short fingerprint of the route table, cached for ROUTE_VERSION_TIMEOUT seconds
+    """
+    version = cache.get(ROUTE_VERSION_CACHE_KEY)
+    if version is None:
+        stats = Route.objects.aggregate(count=Count('id'), max_id=Max('id'), last_update=Max('updated_at'))
+        raw = f"{stats['count']}:{stats['max_id']}:{stats['last_update']}"
+        version = hashlib.sha1(raw.encode()).hexdigest()[:16]
+        cache.set(ROUTE_VERSION_CACHE_KEY, version, ROUTE_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_route_dataset_version():
+    """Drop the cached route version so the next lookup recomputes it"""
+    cache.delete(ROUTE_VERSION_CACHE_KEY)
+
+
+def suggestion_dataset_version():
+    return f"{airport_dataset_version()}|{airway_network_version()}|{route_dataset_version()}"
+
+
+def trigrams(text):
+    """pg_trgm style trigrams of the words of text (upper-cased)"""
+    grams = set()
+    for word in text.upper().split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SuggestionIndex:
+    """
+    Prefix and trigram index over suggestion entries for one dataset version
+    """
+
+    def __init__(self, version, entries):
+        """
+        entries: (type, value, label, detail, weight, terms, fuzzy text)
+        where terms are (upper-case term, match rank) pairs and fuzzy text
+        (or None) is indexed by trigrams
+        """
+        self.version = version
+        self.entries = []
+        terms, owners, ranks = [], [], []
+        postings = defaultdict(list)
+        gram_counts = []
+        for kind, value, label, detail, weight, entry_terms, fuzzy in entries:
+            position = len(self.entries)
+            self.entries.append({'type': kind, 'value': value, 'label': label, 'detail': detail})
+            for term, rank in entry_terms:
+                if term:
+                    terms.append(term)
+                    owners.append(position)
+                    ranks.append(rank + weight)
+            grams = trigrams(fuzzy) if fuzzy else ()
+            for gram in grams:
+                postings[gram].append(position)
+            gram_counts.append(len(grams))
+
+        order = sorted(range(len(terms)), key=terms.__getitem__)
+        self.terms = [terms[k] for k in order]
+        self.owners = np.asarray(owners, dtype=np.int64)[order] if terms else np.zeros(0, dtype=np.int64)
+        self.ranks = np.asarray(ranks, dtype=float)[order] if terms else np.zeros(0)
+        self.postings = {gram: np.asarray(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self.gram_counts = np.asarray(gram_counts, dtype=float)
+        self.types = np.array([entry['type'] for entry in self.entries], dtype=object)
+
+    @classmethod
+    def load(cls, version=None):
+        """Build the index from the airport dictionary and two values_list queries"""
+        version = version or suggestion_dataset_version()
+        return cls(version, cls._entries())
+
+    @staticmethod
+    def _entries():
+        seen = set()
+        directory = get_airport_directory()
+        for airport in list(directory.by_iata.values()) + list(directory.by_icao.values()):
+            if id(airport) in seen:
+                continue
+            seen.add(id(airport))
+            name = airport['name'] or ''
+            city = airport['city'] or ''
+            terms = [(airport['iata'], CODE_MATCH), (airport['icao'], CODE_MATCH)]
+            terms += [(word, WORD_MATCH) for word in set(f'{name} {city}'.upper().split())]
+            yield (
+                'airport', airport['icao'] or airport['iata'],
+                f"{name} ({'/'.join(c for c in (airport['iata'], airport['icao']) if c)})",
+                ', '.join(part for part in (city, airport['country']) if part),
+                AIRPORT_WEIGHTS.get(airport['type'], AIRPORT_WEIGHTS['small_airport']), terms, f'{name} {city}'
+            )
+
+        for identifier, name, waypoint_type in Waypoint.objects.values_list('identifier', 'name', 'type').iterator(chunk_size=5000):
+            terms = [(identifier.upper(), CODE_MATCH)]
+            if name and name.upper() != identifier.upper():
+                terms.append((name.upper(), WORD_MATCH))
+            yield 'waypoint', identifier, identifier, f'{waypoint_type} {name}'.strip(), WAYPOINT_WEIGHT, terms, None
+
+        for route_id, name, version, departure, arrival in Route.objects.filter(is_active=True).values_list(
+            'id', 'name', 'version', 'departure', 'arrival'
+        ).iterator(chunk_size=5000):
+            words = set(name.upper().replace('-', ' ').split())
+            terms = [(name.upper(), WORD_MATCH)] + [(word, WORD_MATCH) for word in words]
+            label = f'{name} - {version}' if version else name
+            yield 'route', route_id, label, f'{departure} → {arrival}', ROUTE_WEIGHT, terms, name
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix(self, query, types):
+        lo = bisect_left(self.terms, query)
+        hi = bisect_left(self.terms, query + '\uffff')
+        if lo == hi:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ranks = self.ranks[lo:hi].copy()
+        ranks[:bisect_right(self.terms, query, lo, hi) - lo] -= 0.5  # exact term matches first
+        owners = self.owners[lo:hi]
+        if types:
+            keep = np.isin(self.types[owners], list(types))
+            owners, ranks = owners[keep], ranks[keep]
+        return owners, ranks
+
+    def _similar(self, query, types):
+        grams = trigrams(query)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        # Share of the query's trigrams found in the name (like pg_trgm
+        # word_similarity), ties broken by similarity of the whole name
+        similarity = shared / len(grams)
+        overall = shared / (len(grams) + self.gram_counts[candidates] - shared)
+        keep = similarity >= MIN_SIMILARITY
+        if types:
+            keep &= np.isin(self.types[candidates], list(types))
+        return candidates[keep], SIMILAR_MATCH + (1.0 - similarity[keep]) + 0.1 * (1.0 - overall[keep])
+
+    def suggest(self, query, limit=DEFAULT_LIMIT, types=None):
+        """
+        Top `limit` suggestions for a query, best first: exact and prefix
+        matches on codes, then on words, then similar names (trigrams)
+        """
+        query = ' '.join(query.upper().split())
+        if not query:
+            return []
+        owners, ranks = self._prefix(query, types)
+        if len(query) >= 3 and len(np.unique(owners)) < limit:
+            similar_owners, similar_ranks = self._similar(query, types)
+            owners = np.concatenate((owners, similar_owners))
+            ranks = np.concatenate((ranks, similar_ranks))
+
+        pool = min(len(ranks), limit * 4)
+        if not pool:
+            return []
+        if pool < len(ranks):
+            picked = np.argpartition(ranks, pool - 1)[:pool]
+        else:
+            picked = np.arange(len(ranks))
+        picked = picked[np.argsort(ranks[picked], kind='stable')]
+
+        results, seen = [], set()
+        for k in picked:
+            owner = int(owners[k])
+            if owner in seen:
+                continue
+            seen.add(owner)
+            results.append(dict(self.entries[owner], score=round(float(ranks[k]), 2)))
+            if len(results) >= limit:
+                break
+        return results
+
+
+_index = None
+_building = None
+_index_lock = threading.Lock()
+
+
+def _build(version):
+    global _index, _building
+    try:
+        index = SuggestionIndex.load(version)
+        with _index_lock:
+            _index = index
+    finally:
+        with _index_lock:
+            _building = None
+        connections.close_all()
+
+
+def get_suggestion_index():
+    """
+    Process-wide SuggestionIndex, or None while the first build is running
+
+    When the data version changes the index is rebuilt in a background
+    thread and the previous index keeps answering until it is replaced.
+    """
+    global _building
+    version = suggestion_dataset_version()
+    with _index_lock:
+        index = _index
+        if (index is None or index.version != version) and _building != version:
+            _building = version
+            threading.Thread(target=_build, args=(version,), daemon=True).start()
+    return index
+
+
+def database_suggestions(query, limit=DEFAULT_LIMIT, types=None):
+    """
+    Suggestions from PostgreSQL for workers without an index yet: code
+    prefixes through varchar_pattern_ops B-tree indexes (the _like indexes
+    Django adds for the unique iata_code and identifier, and
+    airports_icao_code_like) and name similarity through the pg_trgm GIN
+    indexes
+    """
+    query = ' '.join(query.upper().split())
+    if not query:
+        return []
+    results = []
+
+    if not types or 'airport' in types:
+        name_match = Q(name__trigram_similar=query) | Q(city__trigram_similar=query) if len(query) >= 3 else Q()
+        airports = Airport.objects.filter(
+            Q(iata_code__startswith=query) | Q(icao_code__startswith=query) | name_match
+        ).annotate(similarity=TrigramSimilarity('name', query)).order_by('-similarity').values_list(
+            'iata_code', 'icao_code', 'name', 'city', 'country', 'similarity'
+        )[:limit]
+        for iata, icao, name, city, country, similarity in airports:
+            if query in (iata, icao):
+                score = CODE_MATCH - 0.5
+            elif (iata or '').startswith(query) or (icao or '').startswith(query):
+                score = CODE_MATCH
+            else:
+                score = SIMILAR_MATCH + 1.0 - (similarity or 0.0)
+            results.append({
+                'type': 'airport',
+                'value': icao or iata,
+                'label': f"{name} ({'/'.join(c for c in (iata, icao) if c)})",
+                'detail': ', '.join(part for part in (city, country) if part),
+                'score': round(score, 2),
+            })
+
+    if not types or 'waypoint' in types:
+        for identifier, name, waypoint_type in Waypoint.objects.filter(
+            identifier__startswith=query
+        ).order_by('identifier').values_list('identifier', 'name', 'type')[:limit]:
+            results.append({
+                'type': 'waypoint',
+                'value': identifier,
+                'label': identifier,
+                'detail': f'{waypoint_type} {name}'.strip(),
+                'score': round(WAYPOINT_WEIGHT + (CODE_MATCH - 0.5 if identifier == query else CODE_MATCH), 2),
+            })
+
+    if (not types or 'route' in types) and len(query) >= 3:
+        for route_id, name, version, departure, arrival, similarity in Route.objects.filter(
+            is_active=True, name__trigram_similar=query
+        ).annotate(similarity=TrigramSimilarity('name', query)).order_by('-similarity').values_list(
+            'id', 'name', 'version', 'departure', 'arrival', 'similarity'
+        )[:limit]:
+            results.append({
+                'type': 'route',
+                'value': route_id,
+                'label': f'{name} - {version}' if version else name,
+                'detail': f'{departure} → {arrival}',
+                'score': round(ROUTE_WEIGHT + SIMILAR_MATCH + 1.0 - (similarity or 0.0), 2),
+            })
+
+    results.sort(key=lambda item: item['score'])
+    return results[:limit]
@@ -7,7 +7,7 @@ from .views import (
     RouteViewSet, FlightInformationRegionViewSet,
     AirportGeoJSON, WaypointGeoJSON, FIRGeoJSON,
     CalculateRoute, SaveRouteAPI, SaveAsRouteAPI,
-    GetRoutesAPI, GetRouteDetailAPI, DeleteRouteAPI, ImportRouteAPI,
+    GetRoutesAPI, GetRouteDetailAPI, DeleteRouteAPI, ImportRouteAPI, BulkImportRoutesAPI,
     RouteSearchAPI, dashboard_view,
     EnhancedSaveRouteAPI, AdvancedDeleteRouteAPI, RestoreRouteAPI  # New APIs added
 )
@@ -53,6 +53,8 @@ urlpatterns = [
     
     # 3.4 Import API
     path('api/import-route/', ImportRouteAPI.as_view(), name='import_route'),
+    path('api/bulk-import-routes/', BulkImportRoutesAPI.as_view(), name='bulk_import_routes'),
+    path('api/compile-route/', RouteViewSet.as_view({'post': 'compile_route'}), name='compile_route'),
     
     # 4. Route Search APIs
     path('api/route-search/', RouteSearchAPI.as_view(), name='route_search'),
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import render
 from rest_framework import viewsets, filters, status
@@ -8,7 +9,6 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django.contrib.gis.geos import Point, LineString, Polygon
 from django.db.models import Q
 import json
-import re
 import math
 
 from .models import Waypoint, Airway, AirwaySegment, Route, FlightInformationRegion
@@ -17,6 +17,9 @@ from .serializers import (
     AirwaySegmentSerializer, RouteSerializer,
     FlightInformationRegionSerializer
 )
+from .fir import firs_for_route
+from .airport_codes import get_airport_directory
+from .encoding import ROUTE_RENDERERS
 from airports.models import Airport
 from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny
@@ -28,37 +31,9 @@ def get_icao_code(code, return_original_if_not_found=True):
     """
     Smart conversion of airport code to ICAO
     Converts IATA (3-letter) to ICAO (4-letter) when possible
+    Lookups use the in-process airport dictionary (no query per call)
     """
-    if not code:
-        return None
-    
-    code = code.upper().strip()
-    
-    # 1. If 4 letters and alphabetic: likely ICAO
-    if len(code) == 4 and code.isalpha():
-        # Check in airports database
-        airport = Airport.objects.filter(
-            Q(icao_code=code) | Q(iata_code=code)
-        ).first()
-        if airport:
-            return airport.icao_code
-        return code
-    
-    # 2. If 3 letters and alphabetic: IATA
-    elif len(code) == 3 and code.isalpha():
-        # Search in airports database
-        airport = Airport.objects.filter(iata_code=code).first()
-        if airport and airport.icao_code:
-            return airport.icao_code
-        
-        # If not found and flag is active, return original
-        if return_original_if_not_found:
-            return code
-        
-        return None
-    
-    # 3. For other cases
-    return code if return_original_if_not_found else None
+    return get_airport_directory().icao_for(code, return_original_if_not_found)
 
 def validate_airport_code(code):
     """
@@ -86,7 +61,8 @@ def validate_airport_code(code):
         }
     
     # Convert to ICAO
-    icao_code = get_icao_code(code)
+    directory = get_airport_directory()
+    icao_code = directory.icao_for(code)
     
     if not icao_code:
         return {
@@ -96,10 +72,8 @@ def validate_airport_code(code):
             'suggestion': 'Use valid IATA (THR) or ICAO (OIII) codes'
         }
     
-    # Find airport information
-    airport = Airport.objects.filter(
-        Q(icao_code=icao_code) | Q(iata_code=code)
-    ).first()
+    # Airport information (summary dict)
+    airport = directory.get(icao_code) or directory.get(code)
     
     return {
         'valid': True,
@@ -108,83 +82,76 @@ def validate_airport_code(code):
         'airport': airport
     }
 
+def routes_between(origin, destination, queryset=None):
+    """
+    Saved routes between two airports in both directions, in one query
+    Each code is expanded to every code of its airport (IATA and ICAO) and
+    matched with IN lookups on the upper-case departure/arrival columns,
+    so both directions use the (departure, arrival) index
+    
+    Returns:
+        tuple: (forward routes, reverse routes, queryset)
+    """
+    directory = get_airport_directory()
+    origin_codes = directory.codes_for(origin)
+    destination_codes = directory.codes_for(destination)
+    
+    if queryset is None:
+        queryset = Route.objects.all()
+    queryset = queryset.filter(
+        Q(departure__in=origin_codes, arrival__in=destination_codes) |
+        Q(departure__in=destination_codes, arrival__in=origin_codes)
+    )
+    
+    forward, reverse = [], []
+    for route in queryset:
+        (forward if route.departure in origin_codes else reverse).append(route)
+    return forward, reverse, queryset
+
+def airway_map_columns(rows):
+    """
+    Group airway segment rows into parallel per-airway arrays for the map
+    
+    rows: (airway id, identifier, name, type, direction, from fix, to fix,
+    from location, to location) ordered by airway and sequence
+    Each airway gets fixes, lon and lat arrays of its points in sequence
+    order; parts holds the index where each continuous piece starts and
+    one_way the index of every leg that is forward only.
+    """
+    airways = []
+    current = None
+    for airway_id, identifier, name, airway_type, direction, from_id, to_id, from_location, to_location in rows:
+        if current is None or current['id'] != airway_id:
+            current = {
+                'id': airway_id, 'identifier': identifier, 'name': name, 'type': airway_type,
+                'fixes': [], 'lon': [], 'lat': [], 'parts': [], 'one_way': []
+            }
+            airways.append(current)
+        fixes = current['fixes']
+        if not fixes or fixes[-1] != from_id:
+            current['parts'].append(len(fixes))
+            fixes.append(from_id)
+            current['lon'].append(round(from_location.x, 5))
+            current['lat'].append(round(from_location.y, 5))
+        if direction == 'F':
+            current['one_way'].append(len(fixes) - 1)
+        fixes.append(to_id)
+        current['lon'].append(round(to_location.x, 5))
+        current['lat'].append(round(to_location.y, 5))
+    return airways
+
 def parse_route_text(route_text):
     """
     Parse route text string into structured route data
-    Supports IATA, ICAO, waypoints, airways, SID/STAR
+    Supports IATA, ICAO, waypoints, coordinates, airways, SID/STAR
+    Airways are expanded into their fixes; see route_compiler
     """
+    from .route_compiler import RouteCompiler, RouteCompileError
+    
     try:
-        # Remove DCT (Direct) and clean parts
-        parts = [p for p in route_text.split() if p not in ['DCT']]
-        
-        if len(parts) < 2:
-            return None
-            
-        departure = parts[0]
-        arrival = parts[-1]
-        
-        waypoints = []
-        coordinates = []
-        
-        # Process each part of the route
-        for part in parts:
-            # Detect code type (IATA or ICAO)
-            is_airport = False
-            airport = None
-            
-            # If 3 letters (IATA)
-            if len(part) == 3 and part.isalpha():
-                airport = Airport.objects.filter(iata_code=part).first()
-                if airport:
-                    is_airport = True
-            
-            # If 4 letters (ICAO)  
-            if not airport and len(part) == 4 and part.isalpha():
-                airport = Airport.objects.filter(icao_code=part).first()
-                if airport:
-                    is_airport = True
-            
-            # If airport found
-            if is_airport and airport:
-                coordinates.append([airport.location.x, airport.location.y])
-                if part not in [departure, arrival]:
-                    waypoints.append(part)
-                continue
-                
-            # If waypoint
-            waypoint = Waypoint.objects.filter(identifier=part).first()
-            if waypoint:
-                coordinates.append([waypoint.location.x, waypoint.location.y])
-                waypoints.append(part)
-                continue
-                
-            # If airway - ignore in coordinates but track
-            if re.match(r'^[ABGRULMNZW]\d+', part):
-                continue
-                
-            # If SID/STAR - ignore
-            if re.match(r'.*[0-9][A-Z]$', part):
-                continue
-        
-        # If insufficient coordinates
-        if len(coordinates) < 2:
-            return None
-            
-        # Calculate total distance
-        total_distance = calculate_route_distance(coordinates)
-        
-        # Convert departure and arrival to ICAO
-        departure_icao = get_icao_code(departure)
-        arrival_icao = get_icao_code(arrival)
-        
-        return {
-            'departure': departure_icao,
-            'arrival': arrival_icao,
-            'waypoints': waypoints,
-            'coordinates': coordinates,
-            'total_distance': total_distance
-        }
-        
+        return RouteCompiler().compile(route_text)
+    except RouteCompileError:
+        return None
     except Exception as e:
         print(f"Parse error: {e}")
         return None
@@ -221,6 +188,7 @@ def calculate_distance_nm(coord1, coord2):
 def calculate_firs_for_route(coordinates):
     """
     Calculate which Flight Information Regions (FIRs) the route passes through
+    Results are cached per route geometry and FIR dataset version
     
     Returns:
         tuple: (count, list_of_firs)
@@ -229,28 +197,8 @@ def calculate_firs_for_route(coordinates):
         if not coordinates or len(coordinates) < 2:
             return 0, []
         
-        # Create LineString from route coordinates
-        route_line = LineString(coordinates, srid=4326)
-        
-        # Find intersecting FIRs
-        intersecting_firs = FlightInformationRegion.objects.filter(
-            boundary__intersects=route_line
-        ).order_by('identifier')
-        
-        fir_count = intersecting_firs.count()
-        
-        # Prepare FIR list with details
-        fir_list = []
-        for fir in intersecting_firs:
-            fir_list.append({
-                'identifier': fir.identifier,
-                'name': fir.name,
-                'country': fir.country,
-                'country_code': fir.country_code,
-                'icao_region': fir.icao_region
-            })
-        
-        return fir_count, fir_list
+        fir_list = firs_for_route(coordinates)
+        return len(fir_list), fir_list
         
     except Exception as e:
         print(f"Error calculating FIRs: {e}")
@@ -299,6 +247,35 @@ class AirwayViewSet(viewsets.ModelViewSet):
         segments = airway.segments.all()
         serializer = AirwaySegmentSerializer(segments, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['GET'])
+    def expand(self, request):
+        """
+        Fixes of an airway between two fixes, in flying order
+        Query params: airway, from, to
+        """
+        from .airway_index import get_airway_index, AirwayExpansionError
+        
+        params = request.query_params
+        airway = params.get('airway', '').strip().upper()
+        from_fix = params.get('from', '').strip().upper()
+        to_fix = params.get('to', '').strip().upper()
+        if not airway or not from_fix or not to_fix:
+            return Response({'error': 'airway, from and to are required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        index = get_airway_index()
+        try:
+            fixes = index.expand(airway, from_fix, to_fix)
+        except AirwayExpansionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'airway': airway,
+            'from': from_fix,
+            'to': to_fix,
+            'fixes': fixes,
+            'coordinates': [list(index.positions[fix]) for fix in fixes]
+        })
 
 class AirwaySegmentViewSet(viewsets.ModelViewSet):
     """
@@ -313,9 +290,10 @@ class RouteViewSet(viewsets.ModelViewSet):
     API endpoint for Flight Routes
     Provides full CRUD operations for routes
     """
-    queryset = Route.objects.all()
+    queryset = Route.objects.select_related('created_by', 'updated_by')
     serializer_class = RouteSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    renderer_classes = ROUTE_RENDERERS
     
     def create(self, request, *args, **kwargs):
         """
@@ -362,28 +340,47 @@ class RouteViewSet(viewsets.ModelViewSet):
     def map_data(self, request):
         """
         Get map data including waypoints and airways for frontend display
+        Airways come from one ordered segment query as parallel coordinate
+        arrays per airway (see airway_map_columns); waypoints as columns
+        
+        Query parameters:
+        - bbox: min_lon,min_lat,max_lon,max_lat to limit waypoints and airways
+        - limit: Maximum number of waypoints (default 500)
         """
-        waypoints = Waypoint.objects.filter(is_active=True)[:500]
-        airways = Airway.objects.all()
-        segments = AirwaySegment.objects.select_related('airway', 'from_waypoint', 'to_waypoint').all()
-        
-        waypoint_data = WaypointSerializer(waypoints, many=True).data
-        airway_data = []
-        
-        for airway in airways:
-            airway_segments = segments.filter(airway=airway)
-            if airway_segments:
-                airway_data.append({
-                    'id': airway.id,
-                    'identifier': airway.identifier,
-                    'name': airway.name,
-                    'type': airway.type,
-                    'segments': AirwaySegmentSerializer(airway_segments, many=True).data
-                })
+        bbox = None
+        if request.query_params.get('bbox'):
+            try:
+                bbox = Polygon.from_bbox([float(v) for v in request.query_params['bbox'].split(',')])
+                bbox.srid = 4326
+            except (ValueError, TypeError):
+                return Response({'error': 'bbox must be min_lon,min_lat,max_lon,max_lat'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(int(request.query_params.get('limit', 500)), 0)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        waypoints = Waypoint.objects.filter(is_active=True)
+        segments = AirwaySegment.objects.all()
+        if bbox is not None:
+            waypoints = waypoints.filter(location__within=bbox)
+            segments = segments.filter(Q(from_waypoint__location__within=bbox) | Q(to_waypoint__location__within=bbox))
+        
+        waypoint_columns = {'identifier': [], 'type': [], 'lon': [], 'lat': []}
+        for identifier, waypoint_type, location in waypoints.values_list('identifier', 'type', 'location')[:limit]:
+            waypoint_columns['identifier'].append(identifier)
+            waypoint_columns['type'].append(waypoint_type)
+            waypoint_columns['lon'].append(round(location.x, 5))
+            waypoint_columns['lat'].append(round(location.y, 5))
+        
+        rows = segments.order_by('airway__identifier', 'airway_id', 'sequence').values_list(
+            'airway_id', 'airway__identifier', 'airway__name', 'airway__type', 'direction',
+            'from_waypoint__identifier', 'to_waypoint__identifier',
+            'from_waypoint__location', 'to_waypoint__location'
+        )
         
         return Response({
-            'waypoints': waypoint_data,
-            'airways': airway_data
+            'waypoints': waypoint_columns,
+            'airways': airway_map_columns(rows)
         })
     
     @action(detail=False, methods=['GET'])
@@ -426,20 +423,15 @@ class RouteViewSet(viewsets.ModelViewSet):
                     'error': 'Origin and destination cannot be the same airport'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Search routes - search with both IATA and ICAO
-            routes = Route.objects.filter(
-                Q(departure__iexact=origin_icao) | Q(departure__iexact=origin),
-                Q(arrival__iexact=destination_icao) | Q(arrival__iexact=destination)
-            ).order_by('total_distance', '-created_at')
-            
-            # Bidirectional search
-            if not routes.exists():
-                routes = Route.objects.filter(
-                     Q(departure__iexact=destination_icao) | Q(departure__iexact=destination),
-                     Q(arrival__iexact=origin_icao) | Q(arrival__iexact=origin)
-                ).order_by('total_distance', '-created_at')
+            # Search routes in both directions (IATA and ICAO) with one query;
+            # reverse routes are returned only when there are no forward ones
+            forward, reverse, _ = routes_between(
+                origin, destination,
+                Route.objects.select_related('created_by', 'updated_by').order_by('total_distance', '-created_at')
+            )
+            routes = forward or reverse
             
-            if not routes.exists():
+            if not routes:
                 return Response({
                     'message': f'No saved routes found from {origin} ({origin_icao}) to {destination} ({destination_icao})',
                     'origin': origin,
@@ -450,24 +442,20 @@ class RouteViewSet(viewsets.ModelViewSet):
                     'routes': []
                 }, status=status.HTTP_200_OK)
             
-            serializer = RouteSerializer(routes, many=True)
+            serializer = RouteSerializer(routes, many=True, context=self.get_serializer_context())
             
-            origin_airport = Airport.objects.filter(
-                Q(icao_code=origin_icao) | Q(iata_code=origin)
-            ).first()
-            
-            destination_airport = Airport.objects.filter(
-                Q(icao_code=destination_icao) | Q(iata_code=destination)
-            ).first()
+            directory = get_airport_directory()
+            origin_airport = directory.get(origin_icao) or directory.get(origin)
+            destination_airport = directory.get(destination_icao) or directory.get(destination)
             
             return Response({
                 'message': f'Found {len(routes)} route(s) from {origin} to {destination}',
                 'origin': origin,
                 'origin_icao': origin_icao,
-                'origin_name': origin_airport.name if origin_airport else origin_icao,
+                'origin_name': origin_airport['name'] if origin_airport else origin_icao,
                 'destination': destination,
                 'destination_icao': destination_icao,
-                'destination_name': destination_airport.name if destination_airport else destination_icao,
+                'destination_name': destination_airport['name'] if destination_airport else destination_icao,
                 'count': len(routes),
                 'routes': serializer.data
             }, status=status.HTTP_200_OK)
@@ -503,18 +491,19 @@ class RouteViewSet(viewsets.ModelViewSet):
                     'suggestion': 'Use 3-letter IATA (e.g., THR) or 4-letter ICAO (e.g., OIII)'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            routes = Route.objects.filter(
-                Q(departure__iexact=airport_icao) | Q(arrival__iexact=airport_icao) |
-                Q(departure__iexact=airport_code) | Q(arrival__iexact=airport_code)
-            ).order_by('departure', 'arrival', 'total_distance')
+            directory = get_airport_directory()
+            airport = directory.get(airport_icao) or directory.get(airport_code)
+            airport_name = airport['name'] if airport else airport_icao
             
-            if not routes.exists():
-                airport = Airport.objects.filter(
-                    Q(icao_code=airport_icao) | Q(iata_code=airport_code)
-                ).first()
-                
-                airport_name = airport.name if airport else airport_icao
-                
+            # One indexed query over every code of the airport, split in memory
+            codes = directory.codes_for(airport_code)
+            if airport_icao not in codes:
+                codes.append(airport_icao)
+            routes = list(Route.objects.select_related('created_by', 'updated_by').filter(
+                Q(departure__in=codes) | Q(arrival__in=codes)
+            ).order_by('departure', 'arrival', 'total_distance'))
+            
+            if not routes:
                 return Response({
                     'message': f'No routes found for airport {airport_code} ({airport_name})',
                     'airport': airport_code,
@@ -524,25 +513,20 @@ class RouteViewSet(viewsets.ModelViewSet):
                     'routes': []
                 }, status=status.HTTP_200_OK)
             
-            departures = routes.filter(departure__iexact=airport_icao)
-            arrivals = routes.filter(arrival__iexact=airport_icao)
-            
-            departures_serializer = RouteSerializer(departures, many=True)
-            arrivals_serializer = RouteSerializer(arrivals, many=True)
-            
-            airport = Airport.objects.filter(
-                Q(icao_code=airport_icao) | Q(iata_code=airport_code)
-            ).first()
+            departures = [route for route in routes if route.departure in codes]
+            arrivals = [route for route in routes if route.arrival in codes]
             
-            airport_name = airport.name if airport else airport_icao
+            context = self.get_serializer_context()
+            departures_serializer = RouteSerializer(departures, many=True, context=context)
+            arrivals_serializer = RouteSerializer(arrivals, many=True, context=context)
             
             return Response({
                 'message': f'Found {len(routes)} route(s) for airport {airport_code} ({airport_name})',
                 'airport': airport_code,
                 'airport_icao': airport_icao,
                 'airport_name': airport_name,
-                'departures_count': departures.count(),
-                'arrivals_count': arrivals.count(),
+                'departures_count': len(departures),
+                'arrivals_count': len(arrivals),
                 'total_count': len(routes),
                 'departures': departures_serializer.data,
                 'arrivals': arrivals_serializer.data
@@ -569,23 +553,532 @@ class RouteViewSet(viewsets.ModelViewSet):
                 'example': '/api/routes/search_airport/?code=THR'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        airport = Airport.objects.filter(
-            Q(iata_code=code) | Q(icao_code=code)
-        ).first()
+        airport = get_airport_directory().get(code)
         
         if airport:
             return Response({
-                'iata': airport.iata_code,
-                'icao': airport.icao_code,
-                'name': airport.name,
-                'city': airport.city,
-                'country': airport.country
+                'iata': airport['iata'],
+                'icao': airport['icao'],
+                'name': airport['name'],
+                'city': airport['city'],
+                'country': airport['country']
             })
         else:
             return Response({
                 'error': f'Airport code {code} not found'
             }, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=False, methods=['GET'])
+    def search_suggestions(self, request):
+        """
+        Ranked type-ahead suggestions over airports, waypoints and routes
+        
+        Query parameters:
+        - q: Text typed so far
+        - limit: Number of suggestions (default 10, max 50)
+        - type: Comma-separated airport, waypoint, route (default: all)
+        """
+        from .suggestions import (
+            get_suggestion_index, database_suggestions, DEFAULT_LIMIT, MAX_LIMIT
+        )
+        
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'query': query, 'suggestions': []})
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        types = {t.strip().lower() for t in request.query_params.get('type', '').split(',') if t.strip()} or None
+        
+        index = get_suggestion_index()
+        if index is not None:
+            suggestions, source = index.suggest(query, limit, types), 'memory'
+        else:
+            suggestions, source = database_suggestions(query, limit, types), 'database'
+        
+        return Response({
+            'query': query,
+            'source': source,
+            'count': len(suggestions),
+            'suggestions': suggestions
+        })
+    
+    @action(detail=False, methods=['POST'])
+    def calculate_fuel(self, request):
+        """
+        Server-side fuel calculation over a route's legs
+        
+        Body (JSON):
+        - route_id or coordinates ([[lon, lat], ...])
+        - takeoff_weight or zero_fuel_weight (kg)
+        - aircraft_type (default GENERIC), flight_level (350), mach (0.78)
+        - wind_kt: mean tailwind component (negative for headwind)
+        - isa_deviation: temperature deviation from ISA in deg C (0)
+        - departure_time: ISO 8601 UTC; when set and a forecast is ingested,
+          per-leg wind and temperature come from the forecast instead
+        - contingency_pct (5), final_reserve_min (30), include_legs (true)
+        """
+        from .fuel import calculate_route_fuel, legs_to_list
+        from .weather import get_wind_grid
+        from aircraft.performance import mach_to_tas
+        
+        data = request.data
+        coordinates = data.get('coordinates')
+        route_id = data.get('route_id')
+        
+        if route_id:
+            route = Route.objects.filter(id=route_id).only('id', 'coordinates').first()
+            if not route:
+                return Response({'error': f'Route with ID {route_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+            coordinates = list(route.coordinates.coords) if route.coordinates else []
+        
+        if not coordinates or len(coordinates) < 2:
+            return Response({'error': 'Provide route_id or at least 2 coordinates'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        def number(key, default=None):
+            value = data.get(key)
+            return default if value in (None, '') else float(value)
+        
+        try:
+            flight_level = number('flight_level', 350)
+            mach = number('mach', 0.78)
+            wind_kt = number('wind_kt', 0.0)
+            isa_deviation = number('isa_deviation', 0.0)
+            
+            wind_grid = get_wind_grid() if data.get('departure_time') else None
+            if wind_grid is not None:
+                winds = wind_grid.route_winds(
+                    [coordinates], flight_level, data['departure_time'],
+                    float(mach_to_tas(mach, flight_level))
+                )[0]
+                wind_kt = winds['tailwind_kt']
+                isa_deviation = winds['isa_deviation']
+            
+            result = calculate_route_fuel(
+                coordinates=coordinates,
+                aircraft_type=data.get('aircraft_type', 'GENERIC'),
+                takeoff_weight=number('takeoff_weight'),
+                zero_fuel_weight=number('zero_fuel_weight'),
+                flight_level=flight_level,
+                mach=mach,
+                wind_kt=wind_kt,
+                contingency_pct=number('contingency_pct', 5.0),
+                final_reserve_min=number('final_reserve_min', 30.0),
+                isa_deviation=isa_deviation
+            )
+        except KeyError:
+            return Response({'error': f"Unknown aircraft type: {data.get('aircraft_type')}"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        legs = result.pop('legs')
+        result['wind_cycle'] = wind_grid.cycle if wind_grid is not None else None
+        if wind_grid is not None:
+            legs['tailwind_kt'] = wind_kt
+            legs['isa_deviation'] = isa_deviation
+        if str(data.get('include_legs', True)).lower() not in ('false', '0'):
+            result['legs'] = legs_to_list(legs)
+        if route_id:
+            result['route_id'] = route_id
+        
+        return Response(result)
+    
+    @action(detail=False, methods=['POST'])
+    def vertical_profile(self, request):
+        """
+        Climb/cruise/descent profile with optimal step climbs
+        
+        Body (JSON):
+        - route_id or coordinates ([[lon, lat], ...])
+        - takeoff_weight or zero_fuel_weight (kg), aircraft_type (default GENERIC)
+        - levels: allowed flight levels (default RVSM levels for the direction of flight)
+        - max_level, mach (0.78), wind_kt, isa_deviation
+        - cost_index: kg of fuel per minute of time (0 = minimum fuel)
+        """
+        from .profile import calculate_route_profile
+        from .fuel import legs_to_list
+        
+        data = request.data
+        coordinates = data.get('coordinates')
+        route_id = data.get('route_id')
+        
+        if route_id:
+            route = Route.objects.filter(id=route_id).only('id', 'coordinates').first()
+            if not route:
+                return Response({'error': f'Route with ID {route_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+            coordinates = list(route.coordinates.coords) if route.coordinates else []
+        
+        if not coordinates or len(coordinates) < 2:
+            return Response({'error': 'Provide route_id or at least 2 coordinates'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        def number(key, default=None):
+            value = data.get(key)
+            return default if value in (None, '') else float(value)
+        
+        try:
+            levels = data.get('levels')
+            result = calculate_route_profile(
+                coordinates,
+                aircraft_type=data.get('aircraft_type', 'GENERIC'),
+                takeoff_weight=number('takeoff_weight'),
+                zero_fuel_weight=number('zero_fuel_weight'),
+                levels=[float(level) for level in levels] if levels else None,
+                max_level=number('max_level'),
+                mach=number('mach', 0.78),
+                wind_kt=number('wind_kt', 0.0),
+                isa_deviation=number('isa_deviation', 0.0),
+                cost_index=number('cost_index', 0.0)
+            )
+        except KeyError:
+            return Response({'error': f"Unknown aircraft type: {data.get('aircraft_type')}"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        legs = legs_to_list(result.pop('legs'))
+        for leg, phase in zip(legs, result.pop('phase')):
+            leg['phase'] = phase
+        result['legs'] = legs
+        if route_id:
+            result['route_id'] = route_id
+        
+        return Response(result)
+    
+    @action(detail=False, methods=['POST'])
+    def wind_optimal_route(self, request):
+        """
+        Minimum-time route through the airway network using forecast winds
+        
+        Body (JSON):
+        - departure, arrival: waypoint identifiers in the airway network
+        - flight_level (350), mach (0.78) or true_airspeed_kt
+        - departure_time: ISO 8601 UTC (default: first forecast time)
+        - min_flight_level, max_flight_level, aircraft_type: search a level band
+          instead of a single level (layered graph, with level changes at waypoints;
+          the aircraft ceiling caps the band). Closures and restrictions are then
+          applied per level band, at the level flown in that band.
+        - avoid_restricted_airspace: true (default) skips airway edges crossing
+          restricted areas active at departure_time (default now) and flight_level
+        Airway closures active at departure_time and flight_level are always applied.
+        Segments are only used at or above their base altitude.
+        Without an ingested forecast the result is the minimum-time route in still air.
+        """
+        from .routing import get_airway_router
+        from .airspace import unavailable_edges
+        from .weather import get_wind_grid
+        from aircraft.models import AircraftType
+        from aircraft.performance import mach_to_tas
+        
+        data = request.data
+        departure = str(data.get('departure', '')).strip().upper()
+        arrival = str(data.get('arrival', '')).strip().upper()
+        if not departure or not arrival:
+            return Response({'error': 'Departure and arrival required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            flight_level = float(data.get('flight_level') or 350)
+            if data.get('true_airspeed_kt'):
+                true_airspeed = float(data['true_airspeed_kt'])
+            else:
+                true_airspeed = float(mach_to_tas(float(data.get('mach') or 0.78), flight_level))
+            
+            
+            ceiling = None
+            aircraft_type = str(data.get('aircraft_type') or '').strip().upper()
+            if aircraft_type:
+                ceiling = AircraftType.objects.filter(icao_code=aircraft_type).values_list(
+                    'ceiling_fl', flat=True
+                ).first()
+                if ceiling is None:
+                    return Response(
+                        {'error': f'Unknown aircraft type {aircraft_type}'}, status=status.HTTP_404_NOT_FOUND
+                    )
+            layered = ceiling is not None or data.get('min_flight_level') or data.get('max_flight_level')
+            
+            router = get_airway_router()
+            when = data.get('departure_time')
+            restrictions = str(data.get('avoid_restricted_airspace', True)).lower() not in ('false', '0', 'no')
+            
+            if layered:
+                avoided, closed = set(), set()
+                
+                def band_blocked_edges(level):
+                    mask, band_avoided, band_closed = unavailable_edges(router, when, level, restrictions)
+                    avoided.update(band_avoided)
+                    closed.update(band_closed)
+                    return mask
+                
+                route = router.find_layered_route(
+                    departure, arrival,
+                    min_level=float(data['min_flight_level']) if data.get('min_flight_level') else None,
+                    max_level=float(data['max_flight_level']) if data.get('max_flight_level') else None,
+                    ceiling_fl=ceiling,
+                    true_airspeed_kt=true_airspeed,
+                    departure_time=data.get('departure_time'),
+                    wind_grid=get_wind_grid(),
+                    band_blocked_edges=band_blocked_edges
+                )
+                avoided, closed = sorted(avoided), sorted(closed)
+            else:
+                blocked, avoided, closed = unavailable_edges(router, when, flight_level, restrictions)
+                route = router.find_wind_optimal_route(
+                    departure, arrival,
+                    flight_level=flight_level,
+                    true_airspeed_kt=true_airspeed,
+                    departure_time=data.get('departure_time'),
+                    wind_grid=get_wind_grid(),
+                    blocked_edges=blocked
+                )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not route:
+            return Response({'error': 'No route found'}, status=status.HTTP_404_NOT_FOUND)
+        route['restrictions_avoided'] = avoided
+        route['closures_applied'] = closed
+        return Response(route)
+    
+    @action(detail=False, methods=['GET'])
+    def airspace_restrictions(self, request):
+        """
+        Restricted areas active at a time and (optionally) flight level
+        
+        Query params:
+        - time: ISO 8601 UTC (default now)
+        - flight_level: only areas whose vertical limits cover this level
+        - geometry: include boundaries as GeoJSON (default true)
+        """
+        from .airspace import get_restriction_index
+        
+        params = request.query_params
+        when = params.get('time') or timezone.now()
+        try:
+            flight_level = float(params['flight_level']) if params.get('flight_level') else None
+            restrictions = get_restriction_index()
+            active = restrictions.active(when, flight_level)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        include_geometry = params.get('geometry', 'true').lower() not in ('false', '0', 'no')
+        areas = restrictions.describe(active, include_geometry=include_geometry)
+        return Response({
+            'time': when if isinstance(when, str) else when.isoformat(),
+            'flight_level': flight_level,
+            'restriction_version': restrictions.version,
+            'count': len(areas),
+            'blocked_edges': int(restrictions.blocked_edges(active).sum()),
+            'restrictions': areas
+        })
+    
+    @action(detail=False, methods=['POST'])
+    def optimize_route(self, request):
+        """
+        Free-route (off-airway) minimum-time trajectory over a great-circle lattice
+        
+        Body (JSON):
+        - departure, arrival: airport (ICAO/IATA) or waypoint identifiers,
+          or origin/destination as [lon, lat]
+        - flight_level (350), mach (0.78) or true_airspeed_kt
+        - departure_time: ISO 8601 UTC (forecast winds when a cycle is ingested)
+        - excluded_areas: list of GeoJSON polygons to avoid
+        - max_deviation_nm (300, at most 1000), layer_spacing_nm (100, at
+          least 10), lateral_points (21, at most 201),
+          budget: maximum transition evaluations (200000, at most 2000000)
+        """
+        import shapely
+        from shapely.errors import ShapelyError
+        from shapely.geometry import shape
+        from .free_route import (
+            FreeRouteOptimizer, DEFAULT_BUDGET, DEFAULT_LAYER_SPACING_NM,
+            DEFAULT_LATERAL_POINTS, DEFAULT_MAX_DEVIATION_NM
+        )
+        from .weather import get_wind_grid
+        from aircraft.performance import mach_to_tas
+        
+        data = request.data
+        
+        def resolve(code, coords):
+            if coords:
+                return [float(coords[0]), float(coords[1])]
+            code = str(code or '').strip().upper()
+            if not code:
+                return None
+            position = get_airport_directory().position(code)
+            if position:
+                return list(position)
+            waypoint = Waypoint.objects.filter(identifier=code).only('location').first()
+            return [waypoint.location.x, waypoint.location.y] if waypoint else None
+        
+        try:
+            origin = resolve(data.get('departure'), data.get('origin'))
+            destination = resolve(data.get('arrival'), data.get('destination'))
+            if origin is None or destination is None:
+                return Response({'error': 'Departure and arrival not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            flight_level = float(data.get('flight_level') or 350)
+            if data.get('true_airspeed_kt'):
+                true_airspeed = float(data['true_airspeed_kt'])
+            else:
+                true_airspeed = float(mach_to_tas(float(data.get('mach') or 0.78), flight_level))
+            
+            excluded = [shapely.make_valid(shape(area)) for area in data.get('excluded_areas') or []]
+            optimizer = FreeRouteOptimizer(
+                true_airspeed,
+                flight_level=flight_level,
+                wind_grid=get_wind_grid(),
+                departure_time=data.get('departure_time'),
+                excluded_areas=excluded,
+                budget=int(data.get('budget') or DEFAULT_BUDGET),
+                layer_spacing_nm=float(data.get('layer_spacing_nm') or DEFAULT_LAYER_SPACING_NM),
+                lateral_points=int(data.get('lateral_points') or DEFAULT_LATERAL_POINTS),
+                max_deviation_nm=float(data.get('max_deviation_nm') or DEFAULT_MAX_DEVIATION_NM)
+            )
+            result = optimizer.optimize(origin, destination)
+        except (TypeError, ValueError, KeyError, AttributeError, ShapelyError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result['true_airspeed_kt'] = round(true_airspeed, 1)
+        result['flight_level'] = int(flight_level)
+        return Response(result)
+    
+    @action(detail=False, methods=['POST'])
+    def fuel_matrix(self, request):
+        """
+        Fuel for every aircraft type in the fleet on every stored route,
+        streamed as NDJSON (default) or CSV
+        
+        Body (JSON):
+        - route_ids: optional, default all active routes
+        - aircraft_types: optional ICAO codes, default every type with performance data
+        - format: ndjson or csv
+        - payload_kg, flight_level (350), mach (type default), wind_kt, isa_deviation
+        - contingency_pct (5), final_reserve_min (30)
+        """
+        from django.http import StreamingHttpResponse
+        from .fleet import (
+            load_fleet, matrix_routes, iter_fuel_matrix, matrix_csv_lines, matrix_ndjson_lines
+        )
+        
+        data = request.data
+        output = str(data.get('format', 'ndjson')).lower()
+        if output not in ('ndjson', 'csv'):
+            return Response({'error': 'format must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    
+        def number(key, default=None):
+            value = data.get(key)
+            return default if value in (None, '') else float(value)
+        
+        try:
+            fleet, skipped = load_fleet(
+                codes=data.get('aircraft_types'),
+                payload_kg=number('payload_kg'),
+                flight_level=number('flight_level', 350),
+                mach=number('mach')
+            )
+            options = {
+                'wind_kt': number('wind_kt', 0.0),
+                'isa_deviation': number('isa_deviation', 0.0),
+                'contingency_pct': number('contingency_pct', 5.0),
+                'final_reserve_min': number('final_reserve_min', 30.0),
+            }
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not fleet:
+            return Response(
+                {'error': 'No aircraft types with performance data', 'skipped': skipped},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = iter_fuel_matrix(matrix_routes(data.get('route_ids')), fleet, **options)
+        if output == 'csv':
+            response = StreamingHttpResponse(matrix_csv_lines(rows), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="fuel_matrix.csv"'
+        else:
+            response = StreamingHttpResponse(matrix_ndjson_lines(rows), content_type='application/x-ndjson')
+        if skipped:
+            response['X-Skipped-Aircraft-Types'] = ','.join(skipped)
+        return response
+    
+    @action(detail=False, methods=['POST'])
+    def fir_intersections(self, request):
+        """
+        Ordered FIR traversal with entry/exit points, distances and times
+        
+        Body (JSON):
+        - route_ids: list of stored route IDs, or
+        - coordinates: [[lon, lat], ...] for an unsaved route
+        - ground_speed_kt: optional, default 450
+        """
+        from .fir_index import get_fir_index, DEFAULT_GROUND_SPEED_KT
+        
+        try:
+            ground_speed = float(request.data.get('ground_speed_kt') or DEFAULT_GROUND_SPEED_KT)
+            if ground_speed <= 0:
+                raise ValueError('ground_speed_kt must be positive')
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        index = get_fir_index()
+        route_ids = request.data.get('route_ids')
+        coordinates = request.data.get('coordinates')
+        
+        if route_ids:
+            routes = Route.objects.filter(id__in=route_ids).only('id', 'name', 'coordinates')
+            results = []
+            for route in routes:
+                coords = list(route.coordinates.coords) if route.coordinates else []
+                results.append({
+                    'route_id': route.id,
+                    'name': route.name,
+                    'firs': index.traverse(coords, ground_speed)
+                })
+            return Response({
+                'fir_version': index.version,
+                'ground_speed_kt': ground_speed,
+                'count': len(results),
+                'routes': results
+            })
+        
+        if coordinates and len(coordinates) >= 2:
+            return Response({
+                'fir_version': index.version,
+                'ground_speed_kt': ground_speed,
+                'firs': index.traverse(coordinates, ground_speed)
+            })
+        
+        return Response(
+            {'error': 'Provide route_ids or at least 2 coordinates'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    @action(detail=False, methods=['POST'])
+    def compile_route(self, request):
+        """
+        Compile ICAO route strings into points and legs, expanding airways
+        Body: {"route_text": "..."} or {"route_texts": ["...", ...]},
+        optional "strict" to reject unknown tokens instead of skipping them
+        """
+        from .route_compiler import RouteCompiler, RouteCompileError
+        
+        texts = request.data.get('route_texts')
+        single = texts is None
+        if single:
+            texts = [request.data.get('route_text', '')]
+        if not isinstance(texts, list) or not any(texts):
+            return Response({'error': 'route_text or route_texts is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        compiler = RouteCompiler(strict=bool(request.data.get('strict', False)))
+        results = [
+            {'error': str(result), 'token': result.token} if isinstance(result, RouteCompileError) else result
+            for result in compiler.compile_many(texts)
+        ]
+        if single:
+            if 'error' in results[0]:
+                return Response(results[0], status=status.HTTP_400_BAD_REQUEST)
+            return Response(results[0])
+        return Response({'count': len(results), 'routes': results})
+    
     def calculate_routes(self, departure, arrival):
         """
         Calculate different route options between two points
@@ -624,13 +1117,27 @@ class RouteViewSet(viewsets.ModelViewSet):
     
     def calculate_airway_route(self, departure, arrival):
         """
-        Calculate route using published airways (not yet implemented)
+        Calculate route using published airways (shared airway graph),
+        skipping segments closed by NOTAM right now
         """
+        from .routing import get_airway_router
+        from .airspace import unavailable_edges
+        
+        router = get_airway_router()
+        blocked, _, _ = unavailable_edges(router, restrictions=False)
+        route = router.find_route(departure, arrival, blocked_edges=blocked)
+        if not route:
+            return {
+                'type': 'AIRWAY',
+                'waypoints': [],
+                'distance': 0,
+                'description': f'No airway route from {departure} to {arrival}'
+            }
         return {
             'type': 'AIRWAY',
-            'waypoints': [],
-            'distance': 0,
-            'description': 'Airway route calculation not implemented yet'
+            'waypoints': route['waypoints'],
+            'distance': round(route['total_distance'], 2),
+            'description': f"Route via airways {', '.join(route['airways_used'])}"
         }
     
     def calculate_via_waypoints(self, departure, arrival):
@@ -689,6 +1196,44 @@ class FlightInformationRegionViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['identifier', 'name', 'country']
     ordering_fields = ['identifier', 'name', 'country']
+    
+    @action(detail=False, methods=['GET', 'POST'])
+    def locate(self, request):
+        """
+        Which FIR contains each point (answered from the FIR cell index when
+        it is built for the current FIRs, otherwise the in-memory FIR index)
+        
+        GET:  ?lat=35.69&lon=51.39
+        POST: {"points": [[lon, lat], ...]}
+        """
+        from .fir_index import get_fir_index
+        from .fir_cells import locate_firs
+        
+        try:
+            if request.method == 'POST':
+                points = request.data.get('points') or []
+                lons = [float(p[0]) for p in points]
+                lats = [float(p[1]) for p in points]
+            else:
+                lons = [float(request.query_params['lon'])]
+                lats = [float(request.query_params['lat'])]
+        except (KeyError, TypeError, ValueError, IndexError):
+            return Response({
+                'error': 'Provide lat/lon query parameters or a points list of [lon, lat]',
+                'example': '/api/fir/locate/?lat=35.69&lon=51.39'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        index = get_fir_index()
+        firs = locate_firs(lons, lats, index).tolist()
+        
+        if request.method == 'GET':
+            return Response({'lat': lats[0], 'lon': lons[0], 'fir': firs[0], 'fir_version': index.version})
+        
+        return Response({
+            'fir_version': index.version,
+            'count': len(firs),
+            'firs': firs
+        })
 
 # ==================== UTILITY APIs ====================
 
@@ -832,9 +1377,20 @@ class CalculateRoute(APIView):
             if not departure or not arrival:
                 return JsonResponse({'error': 'Departure and arrival required'}, status=400)
             
-            from .routing import AirwayRouter
-            router = AirwayRouter()
-            route = router.find_route(departure, arrival)
+            from .routing import get_airway_router
+            router = get_airway_router()
+            
+            # Airway closures at departure_time / flight_level (default: now, any level);
+            # restricted areas only on request
+            from .airspace import unavailable_edges
+            flight_level = request.data.get('flight_level')
+            blocked, _, _ = unavailable_edges(
+                router, request.data.get('departure_time'),
+                float(flight_level) if flight_level not in (None, '') else None,
+                restrictions=bool(request.data.get('avoid_restricted_airspace'))
+            )
+            
+            route = router.find_route(departure, arrival, blocked_edges=blocked)
             
             if route:
                 return JsonResponse(route)
@@ -1280,10 +1836,15 @@ class SaveAsRouteAPI(APIView):
 class GetRoutesAPI(APIView):
     """
     API endpoint to get all saved routes
+
+    Coordinates can be requested as encoded polylines (?format=polyline) or
+    MessagePack float32 arrays (?format=msgpack), see routes.encoding.
     """
+    renderer_classes = ROUTE_RENDERERS
+    
     def get(self, request):
         try:
-            routes = Route.objects.all().order_by('-created_at')
+            routes = Route.objects.select_related('created_by').order_by('-created_at')
             
             routes_data = []
             for route in routes:
@@ -1310,13 +1871,13 @@ class GetRoutesAPI(APIView):
                     'created_at': route.created_at.strftime('%Y-%m-%d %H:%M'),
                 })
             
-            return JsonResponse({
+            return Response({
                 'status': 'success',
                 'routes': routes_data
             })
             
         except Exception as e:
-            return JsonResponse({
+            return Response({
                 'status': 'error',
                 'message': str(e)
             }, status=400)
@@ -1327,6 +1888,7 @@ class GetRouteDetailAPI(APIView):
     API for getting complete details of a specific route
     """
     permission_classes = [AllowAny]
+    renderer_classes = ROUTE_RENDERERS
     
     def get(self, request, route_id):
         try:
@@ -1336,7 +1898,7 @@ class GetRouteDetailAPI(APIView):
             try:
                 route = Route.objects.get(id=route_id)
             except Route.DoesNotExist:
-                return JsonResponse({
+                return Response({
                     'status': 'error',
                     'message': f'Route with ID {route_id} not found'
                 }, status=404)
@@ -1377,7 +1939,7 @@ class GetRouteDetailAPI(APIView):
                 'fir_list': fir_list,
             }
             
-            return JsonResponse({
+            return Response({
                 'status': 'success',
                 'route': route_data
             })
@@ -1387,7 +1949,7 @@ class GetRouteDetailAPI(APIView):
             print(f"❌ GetRouteDetailAPI Error: {str(e)}")
             print(traceback.format_exc())
             
-            return JsonResponse({
+            return Response({
                 'status': 'error',
                 'message': f'Error getting route details: {str(e)}'
             }, status=500)
@@ -1661,6 +2223,53 @@ class ImportRouteAPI(APIView):
                 'message': str(e)
             }, status=400)
 
+# ==================== BULK IMPORT API ====================
+class BulkImportRoutesAPI(APIView):
+    """
+    Bulk import of route strings
+    Accepts an uploaded file ("file"), a raw text or NDJSON body
+    (text/plain, application/x-ndjson) or JSON {"routes": [...]} whose
+    items are route strings or objects with route/name/version/description
+    Query params: input_format (text|ndjson, default: detect), strict, dry_run
+    (not "format", which DRF reserves for choosing the response renderer)
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    
+    def post(self, request):
+        from .route_import import import_routes
+        
+        params = request.query_params
+        fmt = params.get('input_format') or None
+        if fmt not in (None, 'text', 'ndjson'):
+            return Response(
+                {'error': 'input_format must be text or ndjson'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content_type = (request.content_type or '').split(';')[0].strip()
+        if content_type in ('text/plain', 'application/x-ndjson'):
+            lines = request.body.decode('utf-8', errors='replace').splitlines()
+            if content_type == 'application/x-ndjson':
+                fmt = 'ndjson'
+        elif 'file' in request.FILES:
+            lines = request.FILES['file']
+        else:
+            routes = request.data.get('routes')
+            if not isinstance(routes, list) or not routes:
+                return Response(
+                    {'error': 'Upload a file, send text/NDJSON, or post {"routes": [...]}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            lines = [json.dumps(item if isinstance(item, dict) else {'route': item}) for item in routes]
+            fmt = 'ndjson'
+        
+        truthy = ('1', 'true', 'yes')
+        report = import_routes(
+            lines, request.user, fmt=fmt,
+            strict=params.get('strict', '').lower() in truthy,
+            dry_run=params.get('dry_run', '').lower() in truthy
+        )
+        return Response(report, status=status.HTTP_201_CREATED if report['imported'] else status.HTTP_200_OK)
+
 # ==================== ROUTE SEARCH API ====================
 class RouteSearchAPI(APIView):
     """
@@ -1668,6 +2277,7 @@ class RouteSearchAPI(APIView):
     """
     
     permission_classes = [IsAuthenticatedOrReadOnly]
+    renderer_classes = ROUTE_RENDERERS
     
     def get(self, request):
         try:
@@ -1678,7 +2288,7 @@ class RouteSearchAPI(APIView):
             print(f"🔍 RouteSearchAPI: Searching {origin} → {destination}")
             
             if not origin or not destination:
-                return JsonResponse({
+                return Response({
                     'status': 'error',
                     'message': 'Both origin and destination airport codes are required'
                 }, status=400)
@@ -1689,69 +2299,11 @@ class RouteSearchAPI(APIView):
             
             print(f"🔍 Code conversion: {origin}→{origin_icao}, {destination}→{destination_icao}")
             
-            # Prepare all possible search combinations
-            all_routes = []
-            seen_ids = set()
-            
-            # List all possible search pairs
-            search_pairs = []
-            
-            # Combination 1: ICAO vs ICAO (primary)
-            if origin_icao and destination_icao:
-                search_pairs.append((origin_icao, destination_icao))
-            
-            # Combination 2: IATA vs IATA
-            if len(origin) == 3 and len(destination) == 3:
-                search_pairs.append((origin, destination))
-            
-            # Combination 3: ICAO vs IATA (mixed)
-            if origin_icao and len(destination) == 3:
-                search_pairs.append((origin_icao, destination))
-            if len(origin) == 3 and destination_icao:
-                search_pairs.append((origin, destination_icao))
-            
-            # Combination 4: IATA vs ICAO (reverse mixed)
-            if len(origin) == 4 and destination_icao:
-                search_pairs.append((origin, destination_icao))
-            if origin_icao and len(destination) == 4:
-                search_pairs.append((origin_icao, destination))
-            
-            # Remove duplicates
-            search_pairs = list(set(search_pairs))
-            
-            print(f"🔍 Search pairs to try: {search_pairs}")
-            
-            # Search in all combinations
-            for dep, arr in search_pairs:
-                print(f"  🔍 Searching: {dep} → {arr}")
-                
-                # Use __iexact for case-insensitive search
-                routes = Route.objects.filter(
-                    departure__iexact=dep,
-                    arrival__iexact=arr
-                )
-                
-                for route in routes:
-                    if route.id not in seen_ids:
-                        seen_ids.add(route.id)
-                        all_routes.append(route)
-                        print(f"    ✅ Found: {route.departure}→{route.arrival} ({route.name})")
-            
-            # Bidirectional search (reverse)
-            reverse_search_pairs = [(arr, dep) for dep, arr in search_pairs if dep != arr]
-            for dep, arr in reverse_search_pairs:
-                print(f"  🔍 Reverse searching: {dep} → {arr}")
-                
-                routes = Route.objects.filter(
-                    departure__iexact=dep,
-                    arrival__iexact=arr
-                )
-                
-                for route in routes:
-                    if route.id not in seen_ids:
-                        seen_ids.add(route.id)
-                        all_routes.append(route)
-                        print(f"    ✅ Found (reverse): {route.departure}→{route.arrival} ({route.name})")
+            # Both directions and every IATA/ICAO combination in one query
+            forward, reverse, queryset = routes_between(
+                origin, destination, Route.objects.select_related('created_by')
+            )
+            all_routes = forward + reverse
             
             print(f"✅ Total unique routes found: {len(all_routes)}")
             
@@ -1784,28 +2336,24 @@ class RouteSearchAPI(APIView):
                 routes_list.append(route_data)
             
             # Airport information for display
-            origin_airport = Airport.objects.filter(
-                Q(iata_code=origin) | Q(icao_code=origin) | Q(icao_code=origin_icao)
-            ).first()
-            
-            destination_airport = Airport.objects.filter(
-                Q(iata_code=destination) | Q(icao_code=destination) | Q(icao_code=destination_icao)
-            ).first()
+            directory = get_airport_directory()
+            origin_airport = directory.get(origin) or directory.get(origin_icao)
+            destination_airport = directory.get(destination) or directory.get(destination_icao)
             
             origin_info = {
                 'code': origin,
                 'icao': origin_icao,
-                'name': origin_airport.name if origin_airport else origin,
-                'city': origin_airport.city if origin_airport else 'N/A',
-                'country': origin_airport.country if origin_airport else 'N/A'
+                'name': origin_airport['name'] if origin_airport else origin,
+                'city': origin_airport['city'] if origin_airport else 'N/A',
+                'country': origin_airport['country'] if origin_airport else 'N/A'
             }
             
             destination_info = {
                 'code': destination,
                 'icao': destination_icao,
-                'name': destination_airport.name if destination_airport else destination,
-                'city': destination_airport.city if destination_airport else 'N/A',
-                'country': destination_airport.country if destination_airport else 'N/A'
+                'name': destination_airport['name'] if destination_airport else destination,
+                'city': destination_airport['city'] if destination_airport else 'N/A',
+                'country': destination_airport['country'] if destination_airport else 'N/A'
             }
             
             response_data = {
@@ -1825,14 +2373,18 @@ class RouteSearchAPI(APIView):
                 'routes': routes_list
             }
             
-            return JsonResponse(response_data, status=200)
+            # Query plan for index checks (?explain=1, DEBUG only)
+            if request.GET.get('explain') and settings.DEBUG:
+                response_data['query_plan'] = queryset.explain()
+            
+            return Response(response_data, status=200)
             
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
             print(f"❌ RouteSearchAPI Error: {str(e)}")
             
-            return JsonResponse({
+            return Response({
                 'status': 'error',
                 'message': f'Search failed: {str(e)}',
                 'detail': str(e)
@@ -0,0 +1,326 @@
+"""
+Gridded upper-air wind and temperature forecasts
+
+A forecast cycle is one array of shape (valid time, level, lat, lon, 3)
+holding the eastward wind u (kt), northward wind v (kt) and temperature
+(K), stored as fields.npy next to a JSON manifest with the axes:
+
+    <WIND_DATA_DIR>/<cycle>/fields.npy
+    <WIND_DATA_DIR>/<cycle>/manifest.json
+    <WIND_DATA_DIR>/CURRENT             name of the active cycle
+
+Pressure levels are converted to pressure-altitude flight levels when a
+cycle is ingested, so every axis increases and lookups are a plain
+quadrilinear interpolation on the memory-mapped array. Everything works
+from files on disk; nothing is downloaded.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+from aircraft.performance import GridInterpolator, isa_temperature_k
+from .fuel import MIN_GROUND_SPEED_KT
+from .geo import leg_distances_nm, initial_bearing_deg
+
+FIELDS = ('u', 'v', 'temperature')
+MS_TO_KT = 1.943844
+GRID_FILE = 'fields.npy'
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+
+
+def pressure_to_flight_level(pressure_hpa):
+    """ISA pressure altitude (FL) for a pressure level"""
+    p = np.asarray(pressure_hpa, dtype=float)
+    troposphere = (1.0 - (p / 1013.25) ** (1.0 / 5.2559)) / 6.8756e-6
+    stratosphere = 36089.0 - 20806.0 * np.log(p / 226.32)
+    return np.where(p > 226.32, troposphere, stratosphere) / 100.0
+
+
+def to_epoch(value):
+    """Seconds since 1970 for a datetime, ISO 8601 string or number (UTC assumed)"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def wind_directory():
+    return str(getattr(settings, 'WIND_DATA_DIR', os.path.join(settings.BASE_DIR, 'data', 'wind')))
+
+
+class WindGrid:
+    """
+    One forecast cycle, interpolated in time, flight level, lat and lon
+    """
+
+    def __init__(self, cycle, times, flight_levels, lats, lons, values):
+        self.cycle = cycle
+        self.times = np.asarray(times, dtype=float)
+        self.flight_levels = np.asarray(flight_levels, dtype=float)
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.values = values
+        self.interpolator = GridInterpolator(
+            [self.times, self.flight_levels, self.lats, self.lons], values
+        )
+
+    @classmethod
+    def from_fields(cls, cycle, times, pressure_levels, lats, lons, u, v, temperature):
+        """
+        Build a grid from (time, level, lat, lon) arrays; u/v in kt. Axes
+        are sorted ascending and a global grid gets a wrap-around column.
+        """
+        times = np.asarray([to_epoch(t) for t in times], dtype=float)
+        flight_levels = pressure_to_flight_level(pressure_levels)
+        lats = np.asarray(lats, dtype=float)
+        lons = (np.asarray(lons, dtype=float) + 180.0) % 360.0 - 180.0
+        values = np.stack([np.asarray(f, dtype=np.float32) for f in (u, v, temperature)], axis=-1)
+
+        for axis, coords in enumerate((times, flight_levels, lats, lons)):
+            order = np.argsort(coords, kind='stable')
+            values = values.take(order, axis=axis)
+        times, flight_levels, lats, lons = (np.sort(a) for a in (times, flight_levels, lats, lons))
+
+        spacing = np.diff(lons)
+        if len(lons) > 2 and np.allclose(spacing, spacing[0]) and np.isclose(lons[-1] + spacing[0] - lons[0], 360.0):
+            values = np.concatenate([values, values[:, :, :, :1]], axis=3)
+            lons = np.append(lons, lons[0] + 360.0)
+
+        return cls(cycle, times, flight_levels, lats, lons, np.ascontiguousarray(values))
+
+    @classmethod
+    def open(cls, directory):
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        return cls(
+            manifest['cycle'], manifest['times'], manifest['flight_levels'],
+            manifest['lats'], manifest['lons'],
+            np.load(os.path.join(directory, GRID_FILE), mmap_mode='r')
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, GRID_FILE), self.values)
+        with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'cycle': self.cycle,
+                'times': self.times.tolist(),
+                'flight_levels': self.flight_levels.tolist(),
+                'lats': self.lats.tolist(),
+                'lons': self.lons.tolist(),
+                'fields': list(FIELDS),
+            }, f)
+
+    def sample(self, lon, lat, flight_level, when):
+        """
+        (u, v, temperature) at arrays of points; when is epoch seconds.
+        Points outside the grid take the nearest edge value.
+        """
+        lon = np.asarray(lon, dtype=float)
+        if self.lons[-1] - self.lons[0] >= 360.0 - 1e-6:
+            lon = (lon - self.lons[0]) % 360.0 + self.lons[0]
+        else:
+            lon = (lon + 180.0) % 360.0 - 180.0
+        points = np.broadcast_arrays(
+            np.asarray(when, dtype=float), np.asarray(flight_level, dtype=float),
+            np.asarray(lat, dtype=float), lon
+        )
+        result = self.interpolator(*points)
+        shape = points[0].shape
+        return tuple(result[:, k].reshape(shape) for k in range(3))
+
+    def components(self, lon, lat, flight_level, when, track_deg):
+        """
+        Tailwind (positive) / headwind (negative) and crosswind (positive
+        pushing right of track) in kt, plus ISA deviation in deg C
+        """
+        u, v, temperature = self.sample(lon, lat, flight_level, when)
+        track = np.radians(track_deg)
+        tailwind = u * np.sin(track) + v * np.cos(track)
+        crosswind = u * np.cos(track) - v * np.sin(track)
+        return tailwind, crosswind, temperature - isa_temperature_k(flight_level)
+
+    def route_winds(self, coordinate_lists, flight_level, departure_time, true_airspeed_kt):
+        """
+        Wind along every leg of many routes in one interpolation call
+
+        Each leg is sampled at its midpoint at the estimated time over
+        (departure + distance / ground speed, refined once with the wind
+        from a first pass). flight_level may be a scalar or one value per
+        route. Returns one dict of per-leg arrays per route.
+        """
+        legs = [np.asarray(c, dtype=float).reshape(-1, 2) for c in coordinate_lists]
+        leg_counts = np.array([max(len(c) - 1, 0) for c in legs])
+        if not leg_counts.sum():
+            return [self._empty_winds() for _ in legs]
+
+        starts = np.concatenate([c[:-1] for c in legs if len(c) > 1])
+        ends = np.concatenate([c[1:] for c in legs if len(c) > 1])
+        distance = np.concatenate([leg_distances_nm(c) for c in legs if len(c) > 1])
+        track = initial_bearing_deg(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+        mid_lon, mid_lat = self._midpoints(starts, ends)
+
+        route_of_leg = np.repeat(np.arange(len(legs)), leg_counts)
+        levels = np.broadcast_to(np.asarray(flight_level, dtype=float), (len(legs),))[route_of_leg]
+        departure = np.broadcast_to(
+            np.asarray([to_epoch(t) for t in np.atleast_1d(departure_time)], dtype=float), (len(legs),)
+        )[route_of_leg]
+
+        offsets = np.concatenate(([0], np.cumsum(leg_counts)[:-1]))
+        tailwind = np.zeros(len(distance))
+        for _ in range(2):
+            leg_hours = distance / np.maximum(true_airspeed_kt + tailwind, MIN_GROUND_SPEED_KT)
+            elapsed = np.cumsum(leg_hours) - leg_hours / 2.0
+            # Restart the clock at each route's first leg
+            elapsed -= np.repeat(np.concatenate(([0.0], np.cumsum(leg_hours)))[offsets], leg_counts)
+            tailwind, crosswind, isa_deviation = self.components(
+                mid_lon, mid_lat, levels, departure + elapsed * 3600.0, track
+            )
+
+        results = []
+        for offset, count in zip(offsets, leg_counts):
+            part = slice(offset, offset + count)
+            results.append({
+                'distance_nm': distance[part],
+                'track_deg': track[part],
+                'tailwind_kt': tailwind[part],
+                'crosswind_kt': crosswind[part],
+                'isa_deviation': isa_deviation[part],
+                'elapsed_min': elapsed[part] * 60.0,
+            })
+        return results
+
+    @staticmethod
+    def _midpoints(starts, ends):
+        lon = starts[:, 0] + ((ends[:, 0] - starts[:, 0] + 180.0) % 360.0 - 180.0) / 2.0
+        return lon, (starts[:, 1] + ends[:, 1]) / 2.0
+
+    @staticmethod
+    def _empty_winds():
+        empty = np.zeros(0)
+        return {key: empty for key in (
+            'distance_nm', 'track_deg', 'tailwind_kt', 'crosswind_kt', 'isa_deviation', 'elapsed_min')}
+
+
+def grid_from_rows(cycle, rows, wind_units='ms'):
+    """
+    Build a grid from long-format rows (valid_time, pressure_hpa, lat, lon,
+    u, v and optional temperature_k). The rows must cover every
+    combination of the distinct axis values; a missing temperature is
+    filled with the ISA value.
+    """
+    columns = {key: [] for key in ('valid_time', 'pressure_hpa', 'lat', 'lon', 'u', 'v', 'temperature_k')}
+    for row in rows:
+        columns['valid_time'].append(to_epoch(row['valid_time']))
+        for key in ('pressure_hpa', 'lat', 'lon', 'u', 'v'):
+            columns[key].append(float(row[key]))
+        temperature = row.get('temperature_k')
+        columns['temperature_k'].append(np.nan if temperature in (None, '') else float(temperature))
+
+    data = {key: np.asarray(values, dtype=float) for key, values in columns.items()}
+    if not len(data['u']):
+        raise ValueError('No wind rows')
+    data['lon'] = (data['lon'] + 180.0) % 360.0 - 180.0
+
+    keys = ('valid_time', 'pressure_hpa', 'lat', 'lon')
+    axes, positions = [], []
+    for key in keys:
+        axis, inverse = np.unique(data[key], return_inverse=True)
+        axes.append(axis)
+        positions.append(inverse)
+
+    shape = tuple(len(a) for a in axes)
+    flat_index = np.ravel_multi_index(positions, shape)
+    if len(np.unique(flat_index)) != len(flat_index):
+        raise ValueError('Duplicate grid points in wind data')
+    if len(flat_index) != int(np.prod(shape)):
+        raise ValueError(f'Incomplete grid: {len(flat_index)} rows for {int(np.prod(shape))} grid points {shape}')
+
+    missing = np.isnan(data['temperature_k'])
+    data['temperature_k'][missing] = isa_temperature_k(pressure_to_flight_level(data['pressure_hpa'][missing]))
+
+    scale = MS_TO_KT if wind_units == 'ms' else 1.0
+    fields = []
+    for key, factor in (('u', scale), ('v', scale), ('temperature_k', 1.0)):
+        field = np.empty(int(np.prod(shape)))
+        field[flat_index] = data[key] * factor
+        fields.append(field.reshape(shape))
+
+    return WindGrid.from_fields(cycle, *axes, *fields)
+
+
+def grid_from_dataset(cycle, path, u='u', v='v', temperature='t', wind_units='ms'):
+    """
+    Build a grid from a NetCDF file with (time, level, latitude, longitude)
+    variables. Needs xarray (and a NetCDF backend) installed.
+    """
+    try:
+        import xarray
+    except ImportError:
+        raise ImportError('xarray is required to read gridded forecast files')
+
+    with xarray.open_dataset(path) as dataset:
+        field = dataset[u]
+        time_dim, level_dim, lat_dim, lon_dim = field.dims
+        scale = MS_TO_KT if wind_units == 'ms' else 1.0
+        times = [str(t)[:19] for t in dataset[time_dim].values.astype('datetime64[s]')]
+        return WindGrid.from_fields(
+            cycle,
+            times,
+            dataset[level_dim].values,
+            dataset[lat_dim].values,
+            dataset[lon_dim].values,
+            dataset[u].transpose(time_dim, level_dim, lat_dim, lon_dim).values * scale,
+            dataset[v].transpose(time_dim, level_dim, lat_dim, lon_dim).values * scale,
+            dataset[temperature].transpose(time_dim, level_dim, lat_dim, lon_dim).values,
+        )
+
+
+def activate_cycle(cycle, root=None):
+    """Point CURRENT at a saved cycle (atomic replace)"""
+    root = root or wind_directory()
+    pointer = os.path.join(root, CURRENT_FILE)
+    with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(cycle)
+    os.replace(pointer + '.tmp', pointer)
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def current_cycle(root=None):
+    try:
+        with open(os.path.join(root or wind_directory(), CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def get_wind_grid():
+    """
+    Process-wide WindGrid for the active cycle, or None when no forecast
+    has been ingested
+    """
+    global _grid
+    cycle = current_cycle()
+    if cycle is None:
+        return None
+    if _grid is not None and _grid.cycle == cycle:
+        return _grid
+
+    with _grid_lock:
+        if _grid is None or _grid.cycle != cycle:
+            try:
+                _grid = WindGrid.open(os.path.join(wind_directory(), cycle))
+            except (OSError, ValueError, KeyError):
+                return None
+    return _grid